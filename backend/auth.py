@@ -1,11 +1,14 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Optional
 import database, models
+from utils import auth_cache
 
 # Secret key should be in env vars
 SECRET_KEY = "supersecretkey_nexor_alturas_change_me_in_prod"
@@ -31,20 +34,49 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.document_id == username).first()
+        raise _credentials_exception()
+    if username is None:
+        raise _credentials_exception()
+    return username
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    credentials_exception = _credentials_exception()
+    username = _token_subject(token)
+    # Hot path: attach the cached principal to this session without a SELECT
+    cached_user = auth_cache.get(username)
+    if cached_user is not None:
+        return db.merge(cached_user, load=False)
+
+    user = db.query(models.User).filter(models.User.document_id == username, models.User.deleted_at.is_(None)).first()
     if user is None:
         raise credentials_exception
+    auth_cache.put(username, user)
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
+    """
+    get_current_user for routes running on the async session.
+    """
+    username = _token_subject(token)
+    cached_user = auth_cache.get(username)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+
+    result = await db.execute(select(models.User).where(models.User.document_id == username, models.User.deleted_at.is_(None)))
+    user = result.scalars().first()
+    if user is None:
+        raise _credentials_exception()
+    auth_cache.put(username, user)
     return user
@@ -0,0 +1,103 @@
+"""
+Sync (psycopg2 + anyio worker threads) vs async (asyncpg) database paths under the same load.
+
+Each simulated request runs the query of one of the ported read paths. The sync
+side goes through anyio.to_thread like a `def` FastAPI route (40 worker threads
+by default), the async side awaits an AsyncSession like an `async def` route.
+Both engines get the same pool size so the thread pool is the only difference.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmark_db_paths.py --requests 2000 --concurrency 200 --latency-ms 5
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+import anyio
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import database, models
+from routers.courses import _catalog_select
+from utils import certificate_validation, progress_buffer
+
+def _paths():
+    user_id, course_id = uuid.uuid4(), uuid.uuid4()
+    return {
+        "validation": certificate_validation._codes_query(["BENCH-CODE"]),
+        "enrollment": progress_buffer._enrollment_query(user_id, course_id),
+        "progress": select(models.ModuleProgress)
+            .join(models.Module, models.Module.id == models.ModuleProgress.module_id)
+            .where(models.ModuleProgress.user_id == user_id, models.Module.course_id == course_id),
+        "alerts": select(models.EmergencyAlert).where(models.EmergencyAlert.status == models.EmergencyStatus.OPEN),
+        "catalog": _catalog_select(),
+    }
+
+def _summary(label: str, latencies: list, elapsed: float) -> str:
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (f"{label:<22} {len(latencies) / elapsed:>9.1f} req/s   "
+            f"p50 {statistics.median(latencies) * 1000:>7.1f} ms   p95 {p95 * 1000:>7.1f} ms")
+
+async def _drive(requests: int, concurrency: int, call) -> tuple:
+    latencies = []
+    limiter = anyio.Semaphore(concurrency)
+
+    async def one():
+        async with limiter:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(requests):
+            tg.start_soon(one)
+    return latencies, time.perf_counter() - started
+
+async def main(args):
+    pool = {"pool_size": args.pool_size, "max_overflow": 0}
+    sync_engine = create_engine(database.SQLALCHEMY_DATABASE_URL, **pool)
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    async_engine = create_async_engine(database.ASYNC_DATABASE_URL, **pool)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    # Server-side wait standing in for network / slower queries (the I/O-bound part)
+    delay = text("SELECT pg_sleep(:s)").bindparams(s=args.latency_ms / 1000)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, pool {args.pool_size}, "
+          f"+{args.latency_ms} ms per request\n")
+    for name, stmt in _paths().items():
+        def sync_call():
+            with SyncSession() as db:
+                if args.latency_ms:
+                    db.execute(delay)
+                db.execute(stmt).all()
+
+        async def async_call():
+            async with AsyncSession() as db:
+                if args.latency_ms:
+                    await db.execute(delay)
+                (await db.execute(stmt)).all()
+
+        async def threaded_call():
+            await anyio.to_thread.run_sync(sync_call)
+
+        # Warm-up fills the pool; disposing after each run keeps a single pool
+        # open at a time (both together could exceed max_connections)
+        await _drive(args.pool_size, args.pool_size, threaded_call)
+        print(_summary(f"{name} sync", *await _drive(args.requests, args.concurrency, threaded_call)))
+        sync_engine.dispose()
+
+        await _drive(args.pool_size, args.pool_size, async_call)
+        print(_summary(f"{name} async", *await _drive(args.requests, args.concurrency, async_call)))
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=database.ASYNC_POOL_SIZE + database.ASYNC_MAX_OVERFLOW)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    anyio.run(main, parser.parse_args())
@@ -1,7 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import auth, documents, courses, practices, corporate, inventory, certificates, payments, quality, simulator, emergencies, reports, audit, sgc_documents, attendance, modules
+from fastapi.responses import JSONResponse
+from sqlalchemy import exc as sa_exc
+from database import engine, async_engine
+import database
+from routers import auth, documents, courses, practices, corporate, inventory, certificates, payments, quality, simulator, emergencies, reports, audit, sgc_documents, attendance, modules, system, renders, curricula
+
+from utils import bulk_import, progress_buffer, signature_store, pdf_renderer, expiry_digest, schema_migrations, audit_partitions, purge, audit as audit_log
 
 from fastapi.staticfiles import StaticFiles
 import os
@@ -9,8 +14,8 @@ import os
 # Create uploads directory if not exists
 os.makedirs("uploads", exist_ok=True)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Single schema-version query; pending migrations are applied (or refused) here
+schema_migrations.ensure_current(engine)
 
 app = FastAPI(
     title="NexorAlturas API",
@@ -25,13 +30,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Quiz-Session"],
 )
 
-# Create uploads directory if not exists
-os.makedirs("uploads", exist_ok=True)
+# Pool exhaustion / statement timeouts: fail fast and tell clients when to retry
+def _database_busy() -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry shortly"},
+        headers={"Retry-After": str(database.RETRY_AFTER_SECONDS)}
+    )
+
+@app.exception_handler(sa_exc.TimeoutError)
+async def pool_timeout_handler(request: Request, exc: sa_exc.TimeoutError):
+    return _database_busy()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@app.exception_handler(sa_exc.DBAPIError)
+async def statement_timeout_handler(request: Request, exc: sa_exc.DBAPIError):
+    if not database.is_statement_timeout(exc):
+        raise exc
+    return _database_busy()
 
 # Include Routers
 app.include_router(auth.router)
@@ -50,6 +68,33 @@ app.include_router(audit.router)
 app.include_router(sgc_documents.router)
 app.include_router(attendance.router)
 app.include_router(modules.router)
+app.include_router(system.router)
+app.include_router(renders.router)
+app.include_router(curricula.router)
+
+@app.on_event("startup")
+def start_workers():
+    progress_buffer.start()
+    audit_log.start()
+    pdf_renderer.start()
+    expiry_digest.start()
+    audit_partitions.start()
+    purge.start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    progress_buffer.stop()
+    bulk_import.shutdown_hash_pool()
+    signature_store.shutdown()
+    pdf_renderer.stop()
+    expiry_digest.stop()
+    audit_partitions.stop()
+    purge.stop()
+    audit_log.stop() # last: the other workers may still log
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,50 @@
+import argparse
+from database import engine
+from utils import schema_migrations
+
+# Usage:
+#   python migrate.py upgrade [--target 0005]
+#   python migrate.py status
+#   python migrate.py new add_some_index [--online]
+TEMPLATE = '''"""
+{description}
+"""
+from sqlalchemy import text
+{imports}
+def upgrade(conn):
+{body}
+'''
+
+def new_migration(name: str, online: bool):
+    latest = schema_migrations.head() or "0000"
+    version = f"{int(latest) + 1:04d}"
+    path = f"{schema_migrations.MIGRATIONS_DIR}/{version}_{name}.py"
+    if online:
+        imports = "from utils.schema_migrations import create_index_concurrently\n\nTRANSACTIONAL = False\n"
+        body = '    create_index_concurrently(conn, "ix_table_column", "table", "column")'
+    else:
+        imports = ""
+        body = '    conn.execute(text("ALTER TABLE ... ADD COLUMN IF NOT EXISTS ..."))'
+    with open(path, "x") as f:
+        f.write(TEMPLATE.format(description=name.replace("_", " ").capitalize(), imports=imports, body=body))
+    print(f"Created {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versioned schema migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("upgrade")
+    up.add_argument("--target", help="stop after this version")
+    sub.add_parser("status")
+    new = sub.add_parser("new")
+    new.add_argument("name")
+    new.add_argument("--online", action="store_true", help="non-transactional (CREATE INDEX CONCURRENTLY)")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = schema_migrations.upgrade(engine, target=args.target)
+        print(f"Applied {len(applied)} migration(s). Schema at {schema_migrations.current_version(engine)}.")
+    elif args.command == "status":
+        for version, name, applied in schema_migrations.status(engine):
+            print(f"{'[x]' if applied else '[ ]'} {version}_{name}")
+    else:
+        new_migration(args.name, args.online)
@@ -0,0 +1,10 @@
+"""
+Creates every table/enum/index of the current models that does not exist yet.
+Fresh databases get the full schema here; databases created by the old
+create_all-at-startup only get the tables they were missing.
+"""
+from database import Base
+import models # noqa: F401 (registers the tables)
+
+def upgrade(conn):
+    Base.metadata.create_all(bind=conn, checkfirst=True)
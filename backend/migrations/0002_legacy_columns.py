@@ -0,0 +1,39 @@
+"""
+Columns added over time by the ad-hoc scripts (migrate_users.py, migrate_license_col.py,
+migrate_module_desc.py, migrate_quiz.py, add_duration_column.py, add_course_code_migration.py,
+add_trainer_to_courses.py, migrate_courses_physical.py, migrate_emergencies.py,
+migrate_payments.py, migrate_docs_to_enrollments.py, migrate_sessions_nullable.py).
+"""
+from sqlalchemy import text
+
+COLUMNS = [
+    ("users", "phone", "VARCHAR"),
+    ("users", "address", "VARCHAR"),
+    ("users", "city", "VARCHAR"),
+    ("users", "birth_date", "TIMESTAMP"),
+    ("users", "rh_blood_type", "VARCHAR"),
+    ("users", "gender", "VARCHAR"),
+    ("users", "eps", "VARCHAR"),
+    ("users", "arl", "VARCHAR"),
+    ("users", "emergency_contact_name", "VARCHAR"),
+    ("users", "emergency_contact_phone", "VARCHAR"),
+    ("users", "license_expiration", "TIMESTAMP WITHOUT TIME ZONE"),
+    ("modules", "description", "VARCHAR"),
+    ("modules", "has_quiz", "BOOLEAN DEFAULT FALSE"),
+    ("modules", "passing_score", "INTEGER DEFAULT 80"),
+    ("courses", "code", "VARCHAR"),
+    ("courses", "duration_days", "INTEGER DEFAULT 1"),
+    ("courses", "trainer_id", "UUID REFERENCES users(id)"),
+    ("courses", "required_documents", "VARCHAR"),
+    ("courses", "start_date", "TIMESTAMP"),
+    ("courses", "location", "VARCHAR"),
+    ("courses", "capacity", "INTEGER DEFAULT 20"),
+    ("equipment", "is_rescue", "BOOLEAN DEFAULT FALSE"),
+    ("payments", "invoice_url", "VARCHAR"),
+    ("documents", "enrollment_id", "UUID REFERENCES enrollments(id)"),
+]
+
+def upgrade(conn):
+    for table, column, definition in COLUMNS:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}"))
+    conn.execute(text("ALTER TABLE practice_sessions ALTER COLUMN trainer_id DROP NOT NULL"))
@@ -0,0 +1,13 @@
+"""
+Document types added after the documenttype enum was created (patch_db_enum.py).
+ALTER TYPE ... ADD VALUE cannot run inside a transaction block on older Postgres.
+"""
+from sqlalchemy import text
+
+TRANSACTIONAL = False
+
+VALUES = ["HEIGHTS_BASIC_CERT", "HEIGHTS_ADVANCED_CERT", "RESCUE_CERT", "CV", "SST_LICENSE", "TRAINER_CERT"]
+
+def upgrade(conn):
+    for value in VALUES:
+        conn.execute(text(f"ALTER TYPE documenttype ADD VALUE IF NOT EXISTS '{value}'"))
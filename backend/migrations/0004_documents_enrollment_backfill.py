@@ -0,0 +1,17 @@
+"""
+Links documents without an enrollment to the user's most recent enrollment
+(set-based version of migrate_docs_to_enrollments.py).
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("""
+        UPDATE documents d
+        SET enrollment_id = (
+            SELECT e.id FROM enrollments e
+            WHERE e.user_id = d.user_id
+            ORDER BY e.created_at DESC
+            LIMIT 1
+        )
+        WHERE d.enrollment_id IS NULL
+    """))
@@ -0,0 +1,20 @@
+"""
+One attendance record per enrollment and day (migrate_attendance_unique.py).
+Keeps the latest record of each duplicate group before adding the constraint.
+"""
+from sqlalchemy import text
+from utils.schema_migrations import constraint_exists
+
+def upgrade(conn):
+    if constraint_exists(conn, "uq_attendance_enrollment_date"):
+        return
+    conn.execute(text("""
+        DELETE FROM attendance_records a
+        USING attendance_records b
+        WHERE a.enrollment_id = b.enrollment_id
+          AND a.date = b.date
+          AND (a.created_at, a.id) < (b.created_at, b.id)
+    """))
+    conn.execute(text(
+        "ALTER TABLE attendance_records ADD CONSTRAINT uq_attendance_enrollment_date UNIQUE (enrollment_id, date)"
+    ))
@@ -0,0 +1,9 @@
+"""
+Columns of the render queue batches and signed certificates
+(migrate_render_batches.py, migrate_certificate_signing.py).
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE render_jobs ADD COLUMN IF NOT EXISTS batch_id UUID"))
+    conn.execute(text("ALTER TABLE certifications ADD COLUMN IF NOT EXISTS signed_payload VARCHAR"))
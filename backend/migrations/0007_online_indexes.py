@@ -0,0 +1,16 @@
+"""
+Indexes for existing tables, built online (add_course_code_migration.py,
+migrate_render_batches.py, migrate_expiry_digests.py).
+"""
+from utils.schema_migrations import create_index_concurrently, unique_index_on
+
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    if not unique_index_on(conn, "courses", "code"):
+        create_index_concurrently(conn, "ix_courses_code", "courses", "code", unique=True)
+    create_index_concurrently(conn, "ix_render_jobs_batch_id", "render_jobs", "batch_id")
+    create_index_concurrently(conn, "ix_certifications_expiration_date", "certifications", "expiration_date")
+    create_index_concurrently(
+        conn, "ix_certificate_expiration_matrix_expiration_date", "certificate_expiration_matrix", "expiration_date"
+    )
@@ -0,0 +1,25 @@
+"""
+Backfills the read models and signatures of certificates created before them
+(migrate_expiration_matrix.py, migrate_certificate_validations.py,
+migrate_certificate_signing.py).
+"""
+from sqlalchemy.orm import Session
+import models
+from utils import expiration_matrix, certificate_validation, certificate_signing
+
+def upgrade(conn):
+    # The session joins the migration transaction; the runner commits it
+    with Session(bind=conn) as db:
+        expiration_matrix.rebuild_company(db)
+        certificate_validation.rebuild(db)
+
+        # Existing PDFs keep the old layout until re-rendered
+        rows = db.query(models.Certification, models.User.document_id, models.Course.name)\
+            .join(models.User, models.User.id == models.Certification.user_id)\
+            .join(models.Course, models.Course.id == models.Certification.course_id)\
+            .filter(models.Certification.signed_payload.is_(None)).all()
+        for cert, document_id, course_name in rows:
+            cert.signed_payload = certificate_signing.sign_certificate(
+                cert.certificate_code, document_id, course_name, cert.issue_date, cert.expiration_date
+            )
+        db.flush()
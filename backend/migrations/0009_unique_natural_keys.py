@@ -0,0 +1,79 @@
+"""
+Unique keys the code already assumed: one enrollment per user and course, one
+progress row per user and module, one confirmed booking per student and session.
+Duplicates left by past races are merged first. Every step is idempotent, so an
+interrupted run is simply repeated.
+"""
+from sqlalchemy import text
+from utils.schema_migrations import add_unique_constraint_online, create_index_concurrently
+
+TRANSACTIONAL = False
+
+def _merge_duplicate_enrollments(conn):
+    # Keeper per (user, course): the most advanced enrollment, then the oldest
+    conn.execute(text("DROP TABLE IF EXISTS enrollment_duplicates"))
+    conn.execute(text("""
+        CREATE TEMP TABLE enrollment_duplicates AS
+        SELECT id, keeper FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY user_id, course_id
+                ORDER BY CASE status WHEN 'COMPLETED' THEN 0 WHEN 'IN_PROGRESS' THEN 1 ELSE 2 END,
+                         progress_percent DESC NULLS LAST, created_at, id
+            ) AS keeper
+            FROM enrollments
+        ) ranked
+        WHERE id <> keeper
+    """))
+    conn.execute(text("""
+        UPDATE documents d SET enrollment_id = m.keeper
+        FROM enrollment_duplicates m WHERE d.enrollment_id = m.id
+    """))
+    # Attendance moves to the keeper unless it already has that day (latest record wins)
+    conn.execute(text("""
+        UPDATE attendance_records a SET enrollment_id = m.keeper
+        FROM enrollment_duplicates m
+        WHERE a.enrollment_id = m.id
+          AND a.id IN (
+              SELECT DISTINCT ON (m2.keeper, a2.date) a2.id
+              FROM attendance_records a2 JOIN enrollment_duplicates m2 ON m2.id = a2.enrollment_id
+              ORDER BY m2.keeper, a2.date, a2.created_at DESC, a2.id DESC
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM attendance_records k WHERE k.enrollment_id = m.keeper AND k.date = a.date
+          )
+    """))
+    conn.execute(text("DELETE FROM attendance_records a USING enrollment_duplicates m WHERE a.enrollment_id = m.id"))
+    conn.execute(text("DELETE FROM enrollments e USING enrollment_duplicates m WHERE e.id = m.id"))
+    conn.execute(text("DROP TABLE enrollment_duplicates"))
+
+def upgrade(conn):
+    _merge_duplicate_enrollments(conn)
+    add_unique_constraint_online(conn, "uq_enrollments_user_course", "enrollments", "user_id, course_id")
+
+    # Keeps the completed / furthest row of each (user, module)
+    conn.execute(text("""
+        DELETE FROM module_progress p
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id, module_id
+                ORDER BY (status = 'COMPLETED') DESC, seconds_spent DESC NULLS LAST, last_updated DESC NULLS LAST, id
+            ) AS rn
+            FROM module_progress
+        ) ranked
+        WHERE p.id = ranked.id AND ranked.rn > 1
+    """))
+    add_unique_constraint_online(conn, "uq_module_progress_user_module", "module_progress", "user_id, module_id")
+
+    # Extra confirmed seats are cancelled, the first booking stays
+    conn.execute(text("""
+        UPDATE practice_bookings b SET status = 'CANCELLED'
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY session_id, student_id ORDER BY booking_date, id) AS rn
+            FROM practice_bookings WHERE status = 'CONFIRMED'
+        ) ranked
+        WHERE b.id = ranked.id AND ranked.rn > 1
+    """))
+    create_index_concurrently(
+        conn, "uq_practice_bookings_confirmed", "practice_bookings", "session_id, student_id",
+        unique=True, where="status = 'CONFIRMED'"
+    )
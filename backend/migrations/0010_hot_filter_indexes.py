@@ -0,0 +1,42 @@
+"""
+Indexes for the columns the routers filter, join and sort on (declared in models.py).
+Built online; test_query_plans.py checks the endpoint plans against them.
+"""
+from utils.schema_migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_users_company_id", "users", "company_id"),
+    ("ix_documents_user_id", "documents", "user_id"),
+    ("ix_documents_enrollment_id", "documents", "enrollment_id"),
+    ("ix_documents_status", "documents", "status"),
+    ("ix_courses_trainer_id", "courses", "trainer_id"),
+    ("ix_modules_course_order", "modules", "course_id, order_index"),
+    ("ix_questions_module_id", "questions", "module_id"),
+    ("ix_quiz_attempts_user_id", "quiz_attempts", "user_id"),
+    ("ix_quiz_attempts_module_id", "quiz_attempts", "module_id"),
+    ("ix_module_progress_module_id", "module_progress", "module_id"),
+    ("ix_enrollments_course_status", "enrollments", "course_id, status"),
+    ("ix_payments_user_id", "payments", "user_id"),
+    ("ix_practice_sessions_course_id", "practice_sessions", "course_id"),
+    ("ix_practice_bookings_student_id", "practice_bookings", "student_id"),
+    ("ix_practice_bookings_session_status", "practice_bookings", "session_id, status"),
+    ("ix_certifications_user_course", "certifications", "user_id, course_id"),
+    ("ix_certifications_course_id", "certifications", "course_id"),
+    ("ix_certificate_revocations_certification_id", "certificate_revocations", "certification_id"),
+    ("ix_inspections_equipment_id", "inspections", "equipment_id"),
+    ("ix_inspections_inspector_id", "inspections", "inspector_id"),
+    ("ix_emergency_alerts_user_id", "emergency_alerts", "user_id"),
+    ("ix_emergency_alerts_status", "emergency_alerts", "status"),
+    ("ix_audit_logs_user_id", "audit_logs", "user_id"),
+    ("ix_audit_logs_timestamp", "audit_logs", "timestamp"),
+    ("ix_pqrsf_user_id", "pqrsf", "user_id"),
+    ("ix_surveys_user_id", "surveys", "user_id"),
+    ("ix_surveys_course_id", "surveys", "course_id"),
+    ("ix_work_permits_user_id", "work_permits", "user_id"),
+]
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index_concurrently(conn, name, table, columns)
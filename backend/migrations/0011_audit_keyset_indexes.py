@@ -0,0 +1,14 @@
+"""
+Audit log indexes for keyset pagination and filtered reads. They replace the
+single-column timestamp and user_id indexes from 0010.
+"""
+from utils.schema_migrations import create_index_concurrently, drop_index_concurrently
+
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    create_index_concurrently(conn, "ix_audit_logs_timestamp_id", "audit_logs", "timestamp, id")
+    create_index_concurrently(conn, "ix_audit_logs_user_timestamp", "audit_logs", "user_id, timestamp")
+    create_index_concurrently(conn, "ix_audit_logs_resource_timestamp", "audit_logs", "resource_type, resource_id, timestamp")
+    drop_index_concurrently(conn, "ix_audit_logs_timestamp")
+    drop_index_concurrently(conn, "ix_audit_logs_user_id")
@@ -0,0 +1,45 @@
+"""
+Monthly range partitioning of audit_logs (utils/audit_partitions).
+A plain table is rebuilt: renamed aside, the partitioned table created from the
+model, one partition per month of existing data, rows copied, old table dropped.
+The user_id FK goes away with it (audit rows outlive deleted users).
+Fresh databases already have the partitioned table from the baseline and only
+get their partitions here.
+"""
+from sqlalchemy import text
+import models
+from utils import audit_partitions
+
+def upgrade(conn):
+    models.AuditArchive.__table__.create(bind=conn, checkfirst=True)
+    partitioned = conn.execute(text("SELECT relkind = 'p' FROM pg_class WHERE relname = 'audit_logs'")).scalar()
+    if partitioned:
+        audit_partitions.ensure_partitions(conn)
+        return
+
+    # Writers queue in utils/audit and retry, so a short exclusive lock is acceptable
+    conn.execute(text("LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned"))
+    conn.execute(text("ALTER TABLE audit_logs_unpartitioned DROP CONSTRAINT IF EXISTS audit_logs_user_id_fkey"))
+    conn.execute(text("ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey"))
+    for index in ("ix_audit_logs_timestamp_id", "ix_audit_logs_user_timestamp", "ix_audit_logs_resource_timestamp"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+    # checkfirst: the enum types already exist
+    models.AuditLog.__table__.create(bind=conn, checkfirst=True)
+
+    # Every month holding data (rows without timestamp go to the current one)
+    oldest, newest = conn.execute(text("SELECT min(timestamp), max(timestamp) FROM audit_logs_unpartitioned")).first()
+    month = audit_partitions.month_start(oldest) if oldest else None
+    while month and month <= newest:
+        audit_partitions.create_partition(conn, month)
+        month = audit_partitions.add_months(month, 1)
+    audit_partitions.ensure_partitions(conn)
+
+    conn.execute(text("""
+        INSERT INTO audit_logs (id, user_id, action, resource_type, resource_id, details, timestamp)
+        SELECT id, user_id, action, resource_type, resource_id, details,
+               coalesce(timestamp, now() at time zone 'utc')
+        FROM audit_logs_unpartitioned
+    """))
+    conn.execute(text("DROP TABLE audit_logs_unpartitioned"))
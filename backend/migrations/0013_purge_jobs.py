@@ -0,0 +1,10 @@
+"""
+Tombstone columns of users/courses and the purge_jobs queue (utils/purge).
+"""
+from sqlalchemy import text
+import models
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITHOUT TIME ZONE"))
+    conn.execute(text("ALTER TABLE courses ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITHOUT TIME ZONE"))
+    models.PurgeJob.__table__.create(bind=conn, checkfirst=True)
@@ -0,0 +1,7 @@
+"""
+Open quiz sessions (utils/quiz_engine).
+"""
+import models
+
+def upgrade(conn):
+    models.QuizSession.__table__.create(bind=conn, checkfirst=True)
@@ -0,0 +1,49 @@
+"""
+Curriculum templates (utils/curriculum), seeded with the Res. 4272/2021 module
+lists that courses.create_course used to hard-code. Templates already present
+(by name) are left as they are.
+"""
+from sqlalchemy import text
+import uuid
+import models
+
+ADVANCED_TOPICS = [
+    ("Marco Legal (Res. 4272/2021)", "Análisis de la resolución, obligaciones empleador/trabajador, roles y responsabilidades."),
+    ("Identificación de Peligros", "Peligros y riesgos asociados al trabajo en alturas. Medidas de prevención y protección."),
+    ("Permisos de Trabajo", "Diligenciamiento del permiso, listas de chequeo y análisis de riesgo (ARO/ATS)."),
+    ("Equipos de Protección Personal (EPP)", "Selección, uso, inspección y mantenimiento de arneses, cascos y eslingas."),
+    ("Sistemas de Ingeniería", "Líneas de vida, puntos de anclaje, barandas y redes de seguridad."),
+    ("Procedimientos de Rescate", "Plan de emergencias, autorescate y rescate asistido básico."),
+    ("Primeros Auxilios Básicos", "Atención inicial a trauma por suspensión y lesiones comunes.")
+]
+
+BASIC_TOPICS = [
+    ("Introducción a la Normativa", "Aspectos generales de la Resolución 4272 de 2021."),
+    ("Responsabilidad Civil y Penal", " implicaciones legales de los accidentes de trabajo."),
+    ("Gestión de Riesgos", "Conceptos básicos de identificación y control de riesgos.")
+]
+
+# (name, match_keywords, priority, is_fallback, topics): same precedence as the old name checks
+TEMPLATES = [
+    ("Trabajo en Alturas - Avanzado", "AVANZADO,ENTRENAMIENTO,COORDINADOR", 10, False, ADVANCED_TOPICS),
+    ("Trabajo en Alturas - Básico Administrativo", "ADMINISTRATIVO,BASICO,BÁSICO", 20, False, BASIC_TOPICS),
+    ("Trabajo en Alturas - General", None, 100, True, ADVANCED_TOPICS[:4]),
+]
+
+def upgrade(conn):
+    for model in (models.CurriculumTemplate, models.TemplateModule, models.TemplateQuestion):
+        model.__table__.create(bind=conn, checkfirst=True)
+
+    for name, keywords, priority, is_fallback, topics in TEMPLATES:
+        exists = conn.execute(text("SELECT 1 FROM curriculum_templates WHERE name = :n"), {"n": name}).first()
+        if exists:
+            continue
+        template_id = uuid.uuid4()
+        conn.execute(models.CurriculumTemplate.__table__.insert().values(
+            id=template_id, name=name, match_keywords=keywords, priority=priority, is_fallback=is_fallback
+        ))
+        conn.execute(models.TemplateModule.__table__.insert(), [
+            {"id": uuid.uuid4(), "template_id": template_id, "title": title, "description": description,
+             "order_index": index + 1, "min_duration_seconds": 0, "has_quiz": False, "passing_score": 80}
+            for index, (title, description) in enumerate(topics)
+        ])
@@ -0,0 +1,10 @@
+"""
+Hash, size and type of uploaded files (utils/upload_store).
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    for table in ("documents", "sgc_documents"):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS file_sha256 VARCHAR"))
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS file_size INTEGER"))
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS file_content_type VARCHAR"))
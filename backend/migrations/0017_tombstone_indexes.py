@@ -0,0 +1,11 @@
+"""
+Partial indexes over tombstoned users and courses (declared in models.py), used
+by the read models to hide rows the purge worker has not removed yet.
+"""
+from utils.schema_migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    create_index_concurrently(conn, "ix_users_tombstoned", "users", "id", where="deleted_at IS NOT NULL")
+    create_index_concurrently(conn, "ix_courses_tombstoned", "courses", "id", where="deleted_at IS NOT NULL")
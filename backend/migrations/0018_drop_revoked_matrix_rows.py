@@ -0,0 +1,12 @@
+"""
+Removes expiration matrix rows of certificates revoked before revoke_certificate
+deleted them (the rebuild no longer recreates them).
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("""
+        DELETE FROM certificate_expiration_matrix m
+        USING certificate_revocations r
+        WHERE r.certification_id = m.certification_id
+    """))
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Enum, Integer
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Enum, Integer, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
@@ -21,9 +21,10 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.STUDENT)
-    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=True)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=True, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True) # Tombstone: hidden from reads until utils/purge removes the row
 
     # Compliance Fields (MinTrabajo / SENA)
     phone = Column(String, nullable=True)
@@ -44,6 +45,11 @@ class User(Base):
     documents = relationship("Document", back_populates="user")
     enrollments = relationship("Enrollment", back_populates="user")
 
+    __table_args__ = (
+        # Tombstones pending purge: read models anti-join against this (small) index
+        Index("ix_users_tombstoned", "id", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
+
 class DocumentType(str, enum.Enum):
     ID_CARD = "ID_CARD"
     SOCIAL_SECURITY = "SOCIAL_SECURITY"
@@ -65,11 +71,15 @@ class Document(Base):
     __tablename__ = "documents"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    enrollment_id = Column(UUID(as_uuid=True), ForeignKey("enrollments.id"), nullable=True) # Linked to specific enrollment
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    enrollment_id = Column(UUID(as_uuid=True), ForeignKey("enrollments.id"), nullable=True, index=True) # Linked to specific enrollment
     type = Column(Enum(DocumentType), nullable=False)
     file_url = Column(String, nullable=False)
-    status = Column(Enum(DocumentStatus), default=DocumentStatus.PENDING)
+    # Stored object as written by utils/upload_store (null for older uploads)
+    file_sha256 = Column(String, nullable=True)
+    file_size = Column(Integer, nullable=True)
+    file_content_type = Column(String, nullable=True)
+    status = Column(Enum(DocumentStatus), default=DocumentStatus.PENDING, index=True) # review queue
     expiration_date = Column(DateTime, nullable=True)
     rejection_reason = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -99,14 +109,19 @@ class Course(Base):
     duration_days = Column(Integer, default=1) # Duration in days for attendance
     location = Column(String, nullable=True)
     capacity = Column(Integer, default=20)
-    trainer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True) # Assigned Trainer
+    trainer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True) # Assigned Trainer
     
     created_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True) # Tombstone: hidden from reads until utils/purge removes the row
 
     modules = relationship("Module", back_populates="course")
     enrollments = relationship("Enrollment", back_populates="course")
     trainer = relationship("User", foreign_keys=[trainer_id])
 
+    __table_args__ = (
+        Index("ix_courses_tombstoned", "id", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
+
     @property
     def trainer_name(self):
         return self.trainer.full_name if self.trainer else None
@@ -127,11 +142,15 @@ class Module(Base):
     has_quiz = Column(Boolean, default=False)
     passing_score = Column(Integer, default=80)
 
+    __table_args__ = (
+        Index("ix_modules_course_order", "course_id", "order_index"),
+    )
+
 class Question(Base):
     __tablename__ = "questions"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False)
+    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False, index=True)
     text = Column(String, nullable=False)
     options = Column(String, nullable=False) # Stored as JSON string for simplicity in SQLite/Generic
     correct_option_index = Column(Integer, nullable=False)
@@ -142,8 +161,8 @@ class QuizAttempt(Base):
     __tablename__ = "quiz_attempts"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False, index=True)
     score = Column(Integer, nullable=False)
     passed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -151,12 +170,73 @@ class QuizAttempt(Base):
     user = relationship("User")
     module = relationship("Module")
 
+# Open quiz of a user for a module: the question ids served, in order (utils/quiz_engine).
+# Replaced when the quiz is requested again, deleted when it is submitted.
+class QuizSession(Base):
+    __tablename__ = "quiz_sessions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False, index=True)
+    question_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "module_id", name="uq_quiz_sessions_user_module"),
+    )
+
+# Stored curricula (utils/curriculum): modules and question banks copied into
+# new courses, or captured from an existing one.
+class CurriculumTemplate(Base):
+    __tablename__ = "curriculum_templates"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = Column(String, nullable=False, unique=True)
+    description = Column(String, nullable=True)
+    match_keywords = Column(String, nullable=True) # Comma separated; a course whose name contains one gets this template
+    priority = Column(Integer, default=100) # Lowest first when several templates match
+    is_fallback = Column(Boolean, default=False) # Used when no template matches
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    modules = relationship("TemplateModule", back_populates="template", order_by="TemplateModule.order_index")
+
+class TemplateModule(Base):
+    __tablename__ = "curriculum_template_modules"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    template_id = Column(UUID(as_uuid=True), ForeignKey("curriculum_templates.id"), nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    content_url = Column(String, nullable=True)
+    min_duration_seconds = Column(Integer, default=0)
+    order_index = Column(Integer, default=0)
+    has_quiz = Column(Boolean, default=False)
+    passing_score = Column(Integer, default=80)
+
+    template = relationship("CurriculumTemplate", back_populates="modules")
+    questions = relationship("TemplateQuestion", back_populates="module")
+
+    __table_args__ = (
+        Index("ix_curriculum_template_modules_template_order", "template_id", "order_index"),
+    )
+
+class TemplateQuestion(Base):
+    __tablename__ = "curriculum_template_questions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    template_module_id = Column(UUID(as_uuid=True), ForeignKey("curriculum_template_modules.id"), nullable=False, index=True)
+    text = Column(String, nullable=False)
+    options = Column(String, nullable=False) # JSON string, as in questions
+    correct_option_index = Column(Integer, nullable=False)
+
+    module = relationship("TemplateModule", back_populates="questions")
+
 class ModuleProgress(Base):
     __tablename__ = "module_progress"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False)
+    module_id = Column(UUID(as_uuid=True), ForeignKey("modules.id"), nullable=False, index=True)
     status = Column(String, default="LOCKED") # LOCKED, IN_PROGRESS, COMPLETED
     seconds_spent = Column(Integer, default=0)
     last_updated = Column(DateTime, default=datetime.utcnow)
@@ -164,6 +244,11 @@ class ModuleProgress(Base):
     user = relationship("User")
     module = relationship("Module")
 
+    __table_args__ = (
+        # One row per user and module (utils/progress_buffer upserts on it)
+        UniqueConstraint("user_id", "module_id", name="uq_module_progress_user_module"),
+    )
+
 class EnrollmentStatus(str, enum.Enum):
     ENROLLED = "ENROLLED"
     IN_PROGRESS = "IN_PROGRESS"
@@ -184,6 +269,12 @@ class Enrollment(Base):
     documents = relationship("Document", back_populates="enrollment")
     attendance_records = relationship("AttendanceRecord", back_populates="enrollment")
 
+    __table_args__ = (
+        # Enrolling is idempotent: one enrollment per user and course
+        UniqueConstraint("user_id", "course_id", name="uq_enrollments_user_course"),
+        Index("ix_enrollments_course_status", "course_id", "status"),
+    )
+
 class PaymentStatus(str, enum.Enum):
     PENDING = "PENDING"
     APPROVED = "APPROVED"
@@ -193,7 +284,7 @@ class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     amount = Column(Integer, nullable=False)
     status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING)
     provider = Column(String, default="WOMPI")
@@ -210,7 +301,7 @@ class PracticeSession(Base):
     __tablename__ = "practice_sessions"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=False)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=False, index=True)
     trainer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     date = Column(DateTime, nullable=False)
     location = Column(String, nullable=False)
@@ -232,25 +323,92 @@ class PracticeBooking(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey("practice_sessions.id"), nullable=False)
-    student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     booking_date = Column(DateTime, default=datetime.utcnow)
     status = Column(Enum(BookingStatus), default=BookingStatus.CONFIRMED)
 
     session = relationship("PracticeSession", back_populates="bookings")
     student = relationship("User")
 
+    __table_args__ = (
+        Index("ix_practice_bookings_session_status", "session_id", "status"),
+        # A student holds at most one confirmed seat per session
+        Index(
+            "uq_practice_bookings_confirmed", "session_id", "student_id",
+            unique=True, postgresql_where=text("status = 'CONFIRMED'")
+        ),
+    )
+
 class Certification(Base):
     __tablename__ = "certifications"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=False)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=False, index=True)
     issue_date = Column(DateTime, default=datetime.utcnow)
-    expiration_date = Column(DateTime, nullable=False)
+    expiration_date = Column(DateTime, nullable=False, index=True)
     certificate_code = Column(String, unique=True, nullable=False)
     pdf_url = Column(String, nullable=True)
+    signed_payload = Column(String, nullable=True) # Ed25519 token printed in the QR (utils/certificate_signing)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    user = relationship("User")
+    course = relationship("Course")
+
+    __table_args__ = (
+        # Not unique: recertification issues a new certificate for the same course
+        Index("ix_certifications_user_course", "user_id", "course_id"),
+    )
+
+# Revoked certificate codes, published as a signed snapshot for offline verifiers.
+# Keyed by code (no FK) so revocations survive deleting the certificate itself.
+class CertificateRevocation(Base):
+    __tablename__ = "certificate_revocations"
+
+    certificate_code = Column(String, primary_key=True)
+    certification_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    reason = Column(String, nullable=True)
+    revoked_by = Column(UUID(as_uuid=True), nullable=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# Materialized corporate expiration matrix: one denormalized row per certificate
+# of a company employee, refreshed by utils/expiration_matrix on writes.
+class CertificateExpirationEntry(Base):
+    __tablename__ = "certificate_expiration_matrix"
+
+    certification_id = Column(UUID(as_uuid=True), ForeignKey("certifications.id"), primary_key=True)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=False, index=True)
+    employee_name = Column(String, nullable=False)
+    document_id = Column(String, nullable=False)
+    course_name = Column(String, nullable=False)
+    issue_date = Column(DateTime, nullable=True)
+    expiration_date = Column(DateTime, nullable=False, index=True) # cross-company digest windows
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_cert_expiration_company_expiry", "company_id", "expiration_date"),
+    )
+
+# Public validation read model: everything /certificates/validate returns, one row
+# per certificate, maintained by utils/certificate_validation on writes.
+class CertificateValidation(Base):
+    __tablename__ = "certificate_validations"
+
+    certification_id = Column(UUID(as_uuid=True), ForeignKey("certifications.id"), primary_key=True)
+    certificate_code = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=False, index=True)
+    document_id = Column(String, nullable=False, index=True)
+    student_name = Column(String, nullable=False)
+    course_name = Column(String, nullable=False)
+    issue_date = Column(DateTime, nullable=True)
+    expiration_date = Column(DateTime, nullable=False)
+    pdf_url = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=True) # certification.created_at
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
 class Company(Base):
     __tablename__ = "companies"
 
@@ -263,6 +421,119 @@ class Company(Base):
 
     employees = relationship("User", back_populates="company")
 
+class ImportJobStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    filename = Column(String, nullable=True)
+    status = Column(Enum(ImportJobStatus), default=ImportJobStatus.PENDING)
+    processed_rows = Column(Integer, default=0)
+    created_count = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    errors = Column(String, nullable=True) # JSON list of row errors (capped)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class RenderKind(str, enum.Enum):
+    INVOICE = "INVOICE"
+    PERMIT = "PERMIT"
+    CERTIFICATE = "CERTIFICATE"
+
+class RenderJobStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+# Persistent PDF rendering queue consumed by utils/pdf_renderer.
+# payload is a JSON snapshot of everything the template needs, so workers never query the DB.
+class RenderJob(Base):
+    __tablename__ = "render_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(Enum(RenderKind), nullable=False)
+    resource_id = Column(UUID(as_uuid=True), nullable=False, index=True) # payment / permit / certification id
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    batch_id = Column(UUID(as_uuid=True), nullable=True, index=True) # Groups the jobs of a cohort issuance
+    status = Column(Enum(RenderJobStatus), default=RenderJobStatus.PENDING)
+    payload = Column(String, nullable=False)
+    output_path = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_render_jobs_status_created", "status", "created_at"),
+    )
+
+class PurgeEntity(str, enum.Enum):
+    USER = "USER"
+    COURSE = "COURSE"
+
+class PurgeJobStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+# Background cascade delete of a tombstoned user/course, run by utils/purge.
+# step is the index of the next step of the entity's plan: committed with every
+# batch, so a restarted worker resumes where the previous one stopped.
+class PurgeJob(Base):
+    __tablename__ = "purge_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    entity = Column(Enum(PurgeEntity), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    label = Column(String, nullable=True) # Name of the entity, kept after it is gone
+    status = Column(Enum(PurgeJobStatus), default=PurgeJobStatus.PENDING)
+    step = Column(Integer, default=0)
+    deleted_rows = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    requested_by = Column(UUID(as_uuid=True), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_purge_jobs_status_created", "status", "created_at"),
+    )
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+# Outgoing e-mail, written in the same transaction as the data it reports on and
+# delivered asynchronously by utils/mailer. dedup_key makes scheduled jobs idempotent.
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False) # e.g. EXPIRY_DIGEST
+    dedup_key = Column(String, unique=True, nullable=False)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, index=True)
+    attempts = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
 class EquipmentType(str, enum.Enum):
     HARNESS = "HARNESS"
     HELMET = "HELMET"
@@ -299,8 +570,8 @@ class Inspection(Base):
     __tablename__ = "inspections"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    equipment_id = Column(UUID(as_uuid=True), ForeignKey("equipment.id"), nullable=False)
-    inspector_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    equipment_id = Column(UUID(as_uuid=True), ForeignKey("equipment.id"), nullable=False, index=True)
+    inspector_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     date = Column(DateTime, default=datetime.utcnow)
     result = Column(Enum(InspectionResult), nullable=False)
     notes = Column(String, nullable=True)
@@ -322,11 +593,11 @@ class EmergencyAlert(Base):
     __tablename__ = "emergency_alerts"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     location = Column(String, nullable=False)
     type = Column(Enum(EmergencyType), nullable=False)
     description = Column(String, nullable=True)
-    status = Column(Enum(EmergencyStatus), default=EmergencyStatus.OPEN)
+    status = Column(Enum(EmergencyStatus), default=EmergencyStatus.OPEN, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User")
@@ -345,18 +616,43 @@ class AuditResourceType(str, enum.Enum):
     REPORT = "REPORT"
     SYSTEM = "SYSTEM"
 
+# Range-partitioned by month on timestamp: utils/audit_partitions creates the
+# upcoming partitions and archives the expired ones. The partition key must be
+# part of the primary key. No FK on user_id: the trail outlives deleted users.
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    user_id = Column(UUID(as_uuid=True), nullable=True)
     action = Column(Enum(AuditAction), nullable=False)
     resource_type = Column(Enum(AuditResourceType), nullable=False)
     resource_id = Column(String, nullable=True)
     details = Column(String, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-
-    user = relationship("User")
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    user = relationship("User", primaryjoin="foreign(AuditLog.user_id) == User.id", viewonly=True)
+
+    __table_args__ = (
+        # Keyset pagination (timestamp DESC, id DESC) and the filters of routers/audit
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_timestamp", "user_id", "timestamp"),
+        Index("ix_audit_logs_resource_timestamp", "resource_type", "resource_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+# One row per audit_logs partition moved out of the database: a gzip CSV with
+# the export columns, newest first.
+class AuditArchive(Base):
+    __tablename__ = "audit_archives"
+
+    partition = Column(String, primary_key=True)
+    range_start = Column(DateTime, nullable=False, index=True)
+    range_end = Column(DateTime, nullable=False)
+    path = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    sha256 = Column(String, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
 
 class SGCDocumentType(str, enum.Enum):
     POLICY = "POLICY"
@@ -373,6 +669,9 @@ class SGCDocument(Base):
     version = Column(String, default="1.0")
     type = Column(Enum(SGCDocumentType), nullable=False)
     url = Column(String, nullable=False)
+    file_sha256 = Column(String, nullable=True) # utils/upload_store, as in documents
+    file_size = Column(Integer, nullable=True)
+    file_content_type = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -393,7 +692,7 @@ class PQRSF(Base):
     __tablename__ = "pqrsf"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     type = Column(Enum(PQRSFType), nullable=False)
     subject = Column(String, nullable=False)
     description = Column(String, nullable=False)
@@ -407,8 +706,8 @@ class Survey(Base):
     __tablename__ = "surveys"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=True) # Optional, can be general
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id"), nullable=True, index=True) # Optional, can be general
     rating = Column(Integer, nullable=False) # 1-5
     comments = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -424,7 +723,7 @@ class WorkPermit(Base):
     __tablename__ = "work_permits"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     location = Column(String, nullable=False)
     task_description = Column(String, nullable=False)
     hazards = Column(String, nullable=True) # Stored as JSON string or comma-separated
@@ -453,3 +752,7 @@ class AttendanceRecord(Base):
 
     enrollment = relationship("Enrollment", back_populates="attendance_records")
     trainer = relationship("User")
+
+    __table_args__ = (
+        UniqueConstraint("enrollment_id", "date", name="uq_attendance_enrollment_date"),
+    )
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
-from datetime import date as date_type, datetime
+from datetime import date as date_type, datetime, timedelta
 from pydantic import BaseModel
 import models, database, auth
 import uuid
+from utils import signature_store
 
 router = APIRouter(
     prefix="/attendance",
@@ -15,12 +18,30 @@ class AttendanceUpdate(BaseModel):
     enrollment_id: str
     status: str
     signature_url: Optional[str] = None
+    date: Optional[date_type] = None # Overrides the batch date/range for this record
 
 class BatchAttendanceRequest(BaseModel):
     course_id: str
     date: date_type
+    end_date: Optional[date_type] = None # Inclusive, to submit a whole week in one call
     records: List[AttendanceUpdate]
 
+MAX_BATCH_DAYS = 31
+
+def _upsert_attendance(db: Session, values: List[dict]):
+    # Single set-based upsert on the (enrollment_id, date) unique constraint
+    stmt = pg_insert(models.AttendanceRecord).values(values)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_attendance_enrollment_date",
+        set_={
+            "status": stmt.excluded.status,
+            "trainer_id": stmt.excluded.trainer_id,
+            # Keep the stored signature unless a new one is sent
+            "signature_url": func.coalesce(stmt.excluded.signature_url, models.AttendanceRecord.signature_url)
+        }
+    )
+    db.execute(stmt)
+
 @router.get("/{course_id}")
 def get_attendance(
     course_id: str,
@@ -74,51 +95,131 @@ def save_attendance(
 ):
     if current_user.role not in [models.UserRole.TRAINER, models.UserRole.ADMIN]:
         raise HTTPException(status_code=403, detail="Not authorized")
-        
-    saved_count = 0
-    
-    # Timestamp for the record
-    record_date = datetime.combine(req.date, datetime.min.time()) # Store as midnight
-    
+
+    end_date = req.end_date or req.date
+    if end_date < req.date:
+        raise HTTPException(status_code=400, detail="end_date must be on or after date")
+    if (end_date - req.date).days >= MAX_BATCH_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_BATCH_DAYS} days")
+
+    batch_days = [req.date + timedelta(days=i) for i in range((end_date - req.date).days + 1)]
+    valid_statuses = {s.value for s in models.AttendanceStatus}
+
+    # Expand records over their days (Stored as midnight)
+    results = []
+    rows = {}
     for item in req.records:
-        # Check if exists
-        existing = db.query(models.AttendanceRecord).filter(
-            models.AttendanceRecord.enrollment_id == item.enrollment_id,
-            models.AttendanceRecord.date == record_date
-        ).first()
-        
-        if existing:
-            existing.status = item.status
-            if item.signature_url:
-                existing.signature_url = item.signature_url
-            existing.trainer_id = current_user.id
+        days = [item.date] if item.date else batch_days
+        for day in days:
+            outcome = {"enrollment_id": item.enrollment_id, "date": day.isoformat()}
+            try:
+                enrollment_id = uuid.UUID(item.enrollment_id)
+            except ValueError:
+                results.append({**outcome, "outcome": "error", "detail": "Invalid enrollment_id"})
+                continue
+            if item.status not in valid_statuses:
+                results.append({**outcome, "outcome": "error", "detail": f"Invalid status {item.status}"})
+                continue
+            record_date = datetime.combine(day, datetime.min.time())
+            # Last entry wins if the same enrollment/day is sent twice
+            rows[(enrollment_id, record_date)] = (outcome, item)
+
+    enrollment_ids = {key[0] for key in rows}
+    record_dates = {key[1] for key in rows}
+
+    # One lookup for the course enrollments and one for the existing records
+    course_enrollments = set()
+    existing = set()
+    if enrollment_ids:
+        course_enrollments = {e.id for e in db.query(models.Enrollment.id).filter(
+            models.Enrollment.course_id == req.course_id,
+            models.Enrollment.id.in_(enrollment_ids)
+        )}
+        existing = {(r.enrollment_id, r.date) for r in db.query(
+            models.AttendanceRecord.enrollment_id,
+            models.AttendanceRecord.date
+        ).filter(
+            models.AttendanceRecord.enrollment_id.in_(enrollment_ids),
+            models.AttendanceRecord.date.in_(record_dates)
+        )}
+
+    values = []
+    saved_count = 0
+    updated_count = 0
+    for (enrollment_id, record_date), (outcome, item) in rows.items():
+        if enrollment_id not in course_enrollments:
+            results.append({**outcome, "outcome": "error", "detail": "Enrollment not found in this course"})
+            continue
+        values.append({
+            "id": uuid.uuid4(),
+            "enrollment_id": enrollment_id,
+            "trainer_id": current_user.id,
+            "date": record_date,
+            "status": item.status,
+            "signature_url": item.signature_url,
+            "created_at": datetime.utcnow()
+        })
+        if (enrollment_id, record_date) in existing:
+            updated_count += 1
+            results.append({**outcome, "outcome": "updated"})
         else:
-            new_record = models.AttendanceRecord(
-                id=uuid.uuid4(),
-                enrollment_id=item.enrollment_id,
-                trainer_id=current_user.id,
-                date=record_date,
-                status=item.status,
-                signature_url=item.signature_url
-            )
-            db.add(new_record)
             saved_count += 1
-            
-    db.commit()
-    return {"message": "Attendance saved", "new_records": saved_count}
+            results.append({**outcome, "outcome": "created"})
 
-import base64
-import os
+    if values:
+        _upsert_attendance(db, values)
+        db.commit()
 
-# Ensure signatures directory exists
-SIGNATURE_DIR = "uploads/signatures"
-os.makedirs(SIGNATURE_DIR, exist_ok=True)
+    return {
+        "message": "Attendance saved",
+        "new_records": saved_count,
+        "updated_records": updated_count,
+        "results": results
+    }
 
 class SignatureUploadRequest(BaseModel):
     enrollment_id: str
     date: date_type
     signature_base64: str
 
+class SignatureItem(BaseModel):
+    enrollment_id: str
+    signature_base64: str
+
+class BatchSignatureRequest(BaseModel):
+    course_id: str
+    date: date_type
+    signatures: List[SignatureItem]
+
+MAX_BATCH_SIGNATURES = 200
+
+def _upsert_signatures(db: Session, values: List[dict]):
+    stmt = pg_insert(models.AttendanceRecord).values(values)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_attendance_enrollment_date",
+        set_={
+            "signature_url": stmt.excluded.signature_url,
+            "trainer_id": stmt.excluded.trainer_id,
+            # Ensure status is at least present if signing
+            "status": case(
+                (models.AttendanceRecord.status == models.AttendanceStatus.ABSENT, models.AttendanceStatus.PRESENT),
+                else_=models.AttendanceRecord.status
+            )
+        }
+    )
+    db.execute(stmt)
+
+def _signature_row(enrollment_id: uuid.UUID, trainer_id: uuid.UUID, day: date_type, url: str) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "enrollment_id": enrollment_id,
+        "trainer_id": trainer_id,
+        "date": datetime.combine(day, datetime.min.time()), # Store as midnight
+        "status": models.AttendanceStatus.PRESENT,
+        "signature_url": url,
+        "created_at": datetime.utcnow()
+    }
+
 @router.post("/sign")
 def upload_signature(
     req: SignatureUploadRequest,
@@ -128,53 +229,84 @@ def upload_signature(
     if current_user.role not in [models.UserRole.TRAINER, models.UserRole.ADMIN]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # 1. Decode Image
     try:
-        # Expected format: "data:image/png;base64,iVBORw0KGgo..."
-        if "," in req.signature_base64:
-            header, encoded = req.signature_base64.split(",", 1)
-        else:
-            encoded = req.signature_base64
-        
-        data = base64.b64decode(encoded)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid base64 signature")
+        enrollment_id = uuid.UUID(req.enrollment_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid enrollment_id")
 
-    # 2. Save File
-    filename = f"{req.enrollment_id}_{req.date.isoformat()}.png"
-    file_path = os.path.join(SIGNATURE_DIR, filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(data)
-        
-    url = f"/uploads/signatures/{filename}"
-    
-    # 3. Update/Create Record
-    # Timestamp for the record
-    record_date = datetime.combine(req.date, datetime.min.time()) # Store as midnight
-    
-    existing = db.query(models.AttendanceRecord).filter(
-        models.AttendanceRecord.enrollment_id == req.enrollment_id,
-        models.AttendanceRecord.date == record_date
-    ).first()
-    
-    if existing:
-        existing.signature_url = url
-        existing.trainer_id = current_user.id
-        # Ensure status is at least present if signing
-        if existing.status == models.AttendanceStatus.ABSENT:
-             existing.status = models.AttendanceStatus.PRESENT
-    else:
-        new_record = models.AttendanceRecord(
-            id=uuid.uuid4(),
-            enrollment_id=req.enrollment_id,
-            trainer_id=current_user.id,
-            date=record_date,
-            status=models.AttendanceStatus.PRESENT,
-            signature_url=url
-        )
-        db.add(new_record)
-        
+    # 1. Decode image (hashed while decoding)
+    try:
+        signature = signature_store.decode(req.signature_base64)
+    except signature_store.SignatureError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not db.query(models.Enrollment.id).filter(models.Enrollment.id == enrollment_id).first():
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+
+    # 2. Content addressed file, on disk before the row points at it (identical signatures are stored once)
+    try:
+        url = signature_store.store(signature)
+    except signature_store.SignatureStorageError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # 3. Update/Create record
+    _upsert_signatures(db, [_signature_row(enrollment_id, current_user.id, req.date, url)])
     db.commit()
-    
+
     return {"message": "Signature saved", "url": url}
+
+@router.post("/sign/batch")
+def upload_signatures_batch(
+    req: BatchSignatureRequest,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role not in [models.UserRole.TRAINER, models.UserRole.ADMIN]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if len(req.signatures) > MAX_BATCH_SIGNATURES:
+        raise HTTPException(status_code=400, detail=f"Cannot submit more than {MAX_BATCH_SIGNATURES} signatures at once")
+
+    results = []
+    decoded = {}
+    for item in req.signatures:
+        try:
+            enrollment_id = uuid.UUID(item.enrollment_id)
+        except ValueError:
+            results.append({"enrollment_id": item.enrollment_id, "outcome": "error", "detail": "Invalid enrollment_id"})
+            continue
+        try:
+            decoded[enrollment_id] = signature_store.decode(item.signature_base64)
+        except signature_store.SignatureError as e:
+            results.append({"enrollment_id": item.enrollment_id, "outcome": "error", "detail": str(e)})
+
+    # One lookup for the course enrollments
+    course_enrollments = set()
+    if decoded:
+        course_enrollments = {e.id for e in db.query(models.Enrollment.id).filter(
+            models.Enrollment.course_id == req.course_id,
+            models.Enrollment.id.in_(decoded.keys())
+        )}
+
+    # Writes run in parallel; only signatures whose file is on disk are saved
+    pending = {}
+    for enrollment_id, signature in decoded.items():
+        if enrollment_id not in course_enrollments:
+            results.append({"enrollment_id": str(enrollment_id), "outcome": "error", "detail": "Enrollment not found in this course"})
+            continue
+        pending[enrollment_id] = signature_store.submit(signature)
+
+    values = []
+    for enrollment_id, write in pending.items():
+        try:
+            url = write.result()
+        except signature_store.SignatureStorageError as e:
+            results.append({"enrollment_id": str(enrollment_id), "outcome": "error", "detail": str(e)})
+            continue
+        values.append(_signature_row(enrollment_id, current_user.id, req.date, url))
+        results.append({"enrollment_id": str(enrollment_id), "outcome": "saved", "url": url})
+
+    if values:
+        _upsert_signatures(db, values)
+        db.commit()
+
+    return {"message": "Signatures saved", "saved": len(values), "results": results}
@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
 from typing import List, Optional
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
 import models, database, auth
+from utils import audit as audit_log, audit_partitions
+from itertools import islice
+import base64
+import binascii
+import csv
+import io
+import json
+
+# Exports read a whole date range; like the regulatory reports they may run long
+EXPORT_STATEMENT_TIMEOUT_MS = 300000
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_COLUMNS = ["id", "timestamp", "user_id", "user_name", "action", "resource_type", "resource_id", "details"]
 
 router = APIRouter(
     prefix="/audit",
@@ -20,37 +34,211 @@ class AuditLogResponse(BaseModel):
     details: Optional[str]
     timestamp: datetime
     user_name: Optional[str] = None
+    archived: bool = False
 
     class Config:
         orm_mode = True
 
+class AuditFilters:
+    """
+    Query parameters shared by the list and the export.
+    date_from is inclusive, date_to exclusive.
+    """
+    def __init__(
+        self,
+        action: Optional[models.AuditAction] = None,
+        resource_type: Optional[models.AuditResourceType] = None,
+        resource_id: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ):
+        self.action = action
+        self.resource_type = resource_type
+        self.resource_id = resource_id
+        self.user_id = user_id
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in vars(self).items() if v is not None}
+
+def _logs_select(filters: AuditFilters):
+    # Newest first; id breaks ties between events of the same instant
+    Log = models.AuditLog
+    stmt = select(
+        Log.id, Log.timestamp, Log.user_id,
+        models.User.full_name.label("user_name"),
+        Log.action, Log.resource_type, Log.resource_id, Log.details
+    ).outerjoin(models.User, models.User.id == Log.user_id)\
+     .order_by(Log.timestamp.desc(), Log.id.desc())
+
+    if filters.action:
+        stmt = stmt.where(Log.action == filters.action)
+    if filters.resource_type:
+        stmt = stmt.where(Log.resource_type == filters.resource_type)
+    if filters.resource_id:
+        stmt = stmt.where(Log.resource_id == filters.resource_id)
+    if filters.user_id:
+        stmt = stmt.where(Log.user_id == filters.user_id)
+    if filters.date_from:
+        stmt = stmt.where(Log.timestamp >= filters.date_from)
+    if filters.date_to:
+        stmt = stmt.where(Log.timestamp < filters.date_to)
+    return stmt
+
+def encode_cursor(timestamp: datetime, log_id: UUID) -> str:
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, log_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), UUID(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _require_admin(current_user: models.User):
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
 @router.get("/logs", response_model=List[AuditLogResponse])
 def get_audit_logs(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(database.get_db), 
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_archived: bool = False,
+    filters: AuditFilters = Depends(),
+    db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    if current_user.role != models.UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    logs = db.query(models.AuditLog).order_by(models.AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
-    
-    # Enrich with user name manually if needed, or rely on frontend to fetch/display
-    # For simplicity, we'll just return the logs. The frontend can look up user names or we can join.
-    # Let's do a simple join or map for better UX
-    response = []
-    for log in logs:
-        log_dict = {
-            "id": log.id,
-            "user_id": log.user_id,
-            "action": log.action,
-            "resource_type": log.resource_type,
-            "resource_id": log.resource_id,
-            "details": log.details,
-            "timestamp": log.timestamp,
-            "user_name": log.user.full_name if log.user else "System/Unknown"
-        }
-        response.append(log_dict)
-        
+    """
+    Keyset pagination: pass the X-Next-Cursor header of a page as `cursor`
+    to get the next one (absent on the last page).
+    include_archived continues into the archived months once the database rows
+    run out (they are all older), with the same cursor.
+    """
+    _require_admin(current_user)
+
+    stmt = _logs_select(filters)
+    after = decode_cursor(cursor) if cursor else None
+    if after:
+        stmt = stmt.where(tuple_(models.AuditLog.timestamp, models.AuditLog.id) < tuple_(*after))
+
+    # Include events still waiting in the writer queue
+    audit_log.flush()
+    rows = [dict(row._mapping) for row in db.execute(stmt.limit(limit + 1))]
+    if include_archived and len(rows) <= limit:
+        before = (rows[-1]["timestamp"], rows[-1]["id"]) if rows else after
+        archived = audit_partitions.read_archived(filters.as_dict(), before)
+        rows += [{**row, "archived": True} for row in islice(archived, limit + 1 - len(rows))]
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return [
+        {**row, "user_name": row["user_name"] or "System/Unknown"}
+        for row in rows
+    ]
+
+def _export_rows(filters: AuditFilters, include_archived: bool):
+    # Own session: the response body is produced after the request dependencies closed
+    db = database.SessionLocal()
+    db.info["statement_timeout_ms"] = EXPORT_STATEMENT_TIMEOUT_MS
+    try:
+        result = db.execute(_logs_select(filters).execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for chunk in result.partitions():
+            yield [row._mapping for row in chunk]
+    finally:
+        db.close()
+
+    if include_archived:
+        archived = audit_partitions.read_archived(filters.as_dict())
+        while True:
+            chunk = list(islice(archived, EXPORT_CHUNK_ROWS))
+            if not chunk:
+                break
+            yield chunk
+
+def _csv_stream(filters: AuditFilters, include_archived: bool):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _export_rows(filters, include_archived):
+        for row in chunk:
+            writer.writerow([
+                row["id"], row["timestamp"].isoformat(), row["user_id"] or "", row["user_name"] or "",
+                row["action"].value, row["resource_type"].value, row["resource_id"] or "", row["details"] or ""
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_stream(filters: AuditFilters, include_archived: bool):
+    for chunk in _export_rows(filters, include_archived):
+        yield "".join(
+            json.dumps({column: row[column] for column in EXPORT_COLUMNS}, default=str, ensure_ascii=False) + "\n"
+            for row in chunk
+        )
+
+@router.get("/logs/export")
+def export_audit_logs(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    include_archived: bool = False,
+    filters: AuditFilters = Depends(),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Streams every log matching the filters (server-side cursor, constant memory).
+    """
+    _require_admin(current_user)
+
+    audit_log.flush()
+    # Exports are audited themselves, before any row leaves the server
+    audit_log.log_action(
+        user_id=current_user.id,
+        action=models.AuditAction.EXPORT,
+        resource_type=models.AuditResourceType.REPORT,
+        resource_id="audit_logs",
+        details={"format": format, "include_archived": include_archived, **filters.as_dict()},
+        durability=audit_log.SYNC
+    )
+
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    if format == "ndjson":
+        response = StreamingResponse(_ndjson_stream(filters, include_archived), media_type="application/x-ndjson")
+    else:
+        response = StreamingResponse(_csv_stream(filters, include_archived), media_type="text/csv")
+    response.headers["Content-Disposition"] = f"attachment; filename=auditoria_{stamp}.{format}"
     return response
+
+@router.get("/partitions")
+def get_partitions(
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Monthly partitions still in the database and the archived ones.
+    """
+    _require_admin(current_user)
+    archives = db.query(models.AuditArchive).order_by(models.AuditArchive.range_start.desc()).all()
+    return {
+        "partitions": audit_partitions.list_partitions(db.connection()),
+        "archives": [
+            {
+                "partition": a.partition, "range_start": a.range_start, "range_end": a.range_end,
+                "rows": a.rows, "size_bytes": a.size_bytes, "sha256": a.sha256, "archived_at": a.archived_at
+            }
+            for a in archives
+        ],
+        "stats": audit_partitions.stats()
+    }
+
+@router.post("/partitions/maintain")
+def maintain_partitions(current_user: models.User = Depends(auth.get_current_user)):
+    # Same run as the background scheduler: create upcoming months, archive expired ones
+    _require_admin(current_user)
+    audit_log.flush()
+    return audit_partitions.maintain()
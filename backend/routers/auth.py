@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import exists
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import models, schemas, auth, database
+from utils import expiration_matrix, catalog_cache, auth_cache, certificate_validation, purge, player_cache
 from datetime import timedelta
 
 router = APIRouter(
@@ -36,7 +38,10 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
 @router.post("/login", response_model=schemas.Token)
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
     # We use username field from OAuth2 form as document_id
-    user = db.query(models.User).filter(models.User.document_id == form_data.username).first()
+    user = db.query(models.User).filter(
+        models.User.document_id == form_data.username,
+        models.User.deleted_at.is_(None)
+    ).first()
     if not user or not auth.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,32 +64,32 @@ def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
 def get_all_users(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db.query(models.User).all()
+    return db.query(models.User).filter(models.User.deleted_at.is_(None)).all()
 
 @router.get("/apprentices", response_model=list[schemas.UserResponse])
 def get_apprentices(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db.query(models.User).filter(models.User.role == models.UserRole.STUDENT).all()
+    return db.query(models.User).filter(models.User.role == models.UserRole.STUDENT, models.User.deleted_at.is_(None)).all()
 
 @router.get("/system-users", response_model=list[schemas.UserResponse])
 def get_system_users(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db.query(models.User).filter(models.User.role != models.UserRole.STUDENT).all()
+    return db.query(models.User).filter(models.User.role != models.UserRole.STUDENT, models.User.deleted_at.is_(None)).all()
 
 @router.get("/trainers", response_model=list[schemas.UserResponse])
 def get_trainers(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db.query(models.User).filter(models.User.role == models.UserRole.TRAINER).all()
+    return db.query(models.User).filter(models.User.role == models.UserRole.TRAINER, models.User.deleted_at.is_(None)).all()
 
 @router.put("/users/{user_id}", response_model=schemas.UserResponse)
 def update_user(user_id: str, user_update: schemas.UserUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    db_user = db.query(models.User).filter(models.User.id == user_id, models.User.deleted_at.is_(None)).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -110,74 +115,37 @@ def update_user(user_id: str, user_update: schemas.UserUpdate, db: Session = Dep
     if user_update.password and user_update.password.strip():
         db_user.hashed_password = auth.get_password_hash(user_update.password)
     
+    db.flush()
+    expiration_matrix.refresh_user(db, db_user.id)
+    certificate_validation.refresh_user(db, db_user.id)
     db.commit()
+    auth_cache.invalidate_user(db_user.id)
+    certificate_validation.clear() # the document id may have changed
+    catalog_cache.invalidate() # trainer names are part of the catalog
+    player_cache.invalidate() # and of the player
     db.refresh(db_user)
     return db_user
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.PurgeJobResponse)
 def delete_user(user_id: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Tombstones the user (gone from every read right away) and queues the removal
+    of their records to utils/purge. Poll GET /system/purges/{id} for progress.
+    """
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    # Tombstoned users too: repeating the request returns the running purge
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    try:
-        # Manually delete related records to handle constraints
-        # 1. Enrollments
-        db.query(models.Enrollment).filter(models.Enrollment.user_id == user_id).delete()
-        
-        # 2. Documents
-        db.query(models.Document).filter(models.Document.user_id == user_id).delete()
-        
-        # 3. Practice Bookings (as student)
-        db.query(models.PracticeBooking).filter(models.PracticeBooking.student_id == user_id).delete()
-
-        # 4. Certifications
-        db.query(models.Certification).filter(models.Certification.user_id == user_id).delete()
-
-        # 5. Emergency Alerts
-        db.query(models.EmergencyAlert).filter(models.EmergencyAlert.user_id == user_id).delete()
-
-        # 6. Surveys
-        db.query(models.Survey).filter(models.Survey.user_id == user_id).delete()
-
-        # 7. PQRSF
-        db.query(models.PQRSF).filter(models.PQRSF.user_id == user_id).delete()
-
-        # 8. Work Permits
-        db.query(models.WorkPermit).filter(models.WorkPermit.user_id == user_id).delete()
-
-        # 9. Audit Logs (where user is actor)
-        db.query(models.AuditLog).filter(models.AuditLog.user_id == user_id).delete()
-
-        # 10. Quiz Attempts
-        db.query(models.QuizAttempt).filter(models.QuizAttempt.user_id == user_id).delete()
-
-        # 11. Module Progress
-        db.query(models.ModuleProgress).filter(models.ModuleProgress.user_id == user_id).delete()
-
-        # 12. Payments
-        db.query(models.Payment).filter(models.Payment.user_id == user_id).delete()
-
-        # 13. Inspections (if user was inspector)
-        db.query(models.Inspection).filter(models.Inspection.inspector_id == user_id).delete()
-
-        # 14. Unassign from Courses (if user is trainer)
-        db.query(models.Course).filter(models.Course.trainer_id == user_id).update({models.Course.trainer_id: None}, synchronize_session=False)
 
-        # 15. Unassign from Practice Sessions (if user is trainer)
-        db.query(models.PracticeSession).filter(models.PracticeSession.trainer_id == user_id).update({models.PracticeSession.trainer_id: None}, synchronize_session=False)
+    # Attendance taken as trainer belongs to the students' records and cannot lose its trainer
+    took_attendance = db.query(exists().where(models.AttendanceRecord.trainer_id == db_user.id)).scalar()
+    if took_attendance:
+        raise HTTPException(status_code=409, detail="User has recorded attendance as trainer; deactivate instead")
 
-        # Finally delete the user
-        db.delete(db_user)
-        db.commit()
-        return {"message": "User deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        # Log the specific error for debugging
-        print(f"Error deleting user {user_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error deleting user: Detail: {str(e)}")
+    job = purge.request_purge(db, db_user, current_user.id)
+    auth_cache.invalidate_user(db_user.id)
+    catalog_cache.invalidate() # trainer names are part of the catalog
+    return purge.progress(job)
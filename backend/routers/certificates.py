@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, exists
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
+import math
 import uuid
 
 import models, schemas, database, auth
-from utils import pdf_generator
+from utils import catalog_cache, pdf_renderer, expiration_matrix, certificate_validation, certificate_signing, revocations, rate_limit, expiry_digest, mailer
+
+# Public scanners retry quickly; a stuck validation query should not hold a connection
+VALIDATION_STATEMENT_TIMEOUT_MS = 2000
 
 router = APIRouter(
     prefix="/certificates",
@@ -34,8 +40,8 @@ def issue_certificate(
         return existing_cert
 
     # Get User and Course
-    user = db.query(models.User).filter(models.User.id == request.user_id).first()
-    course = db.query(models.Course).filter(models.Course.id == request.course_id).first()
+    user = db.query(models.User).filter(models.User.id == request.user_id, models.User.deleted_at.is_(None)).first()
+    course = db.query(models.Course).filter(models.Course.id == request.course_id, models.Course.deleted_at.is_(None)).first()
     
     if not user or not course:
         raise HTTPException(status_code=404, detail="User or Course not found")
@@ -43,28 +49,166 @@ def issue_certificate(
     # Generate Code
     cert_code = f"CERT-{uuid.uuid4().hex[:8].upper()}"
     
-    # Generate PDF
-    pdf_url = pdf_generator.generate_certificate_pdf(user, course, cert_code)
-    
-    # Create Certification
+    # Create Certification (pdf_url is set by the background PDF service)
     db_cert = models.Certification(
         user_id=request.user_id,
         course_id=request.course_id,
         issue_date=request.issue_date,
         expiration_date=request.expiration_date,
         certificate_code=cert_code,
-        pdf_url=pdf_url
+        signed_payload=certificate_signing.sign_certificate(
+            cert_code, user.document_id, course.name, request.issue_date, request.expiration_date
+        )
     )
     db.add(db_cert)
+    db.flush()
+    expiration_matrix.refresh_certification(db, db_cert, user, course)
+    certificate_validation.refresh_certification(db, db_cert, user, course)
+    job = pdf_renderer.enqueue(
+        db, models.RenderKind.CERTIFICATE, db_cert.id,
+        pdf_renderer.certificate_payload(user, course, cert_code, db_cert.issue_date, db_cert.expiration_date, db_cert.signed_payload),
+        owner_id=user.id
+    )
+    job_id = job.id
     db.commit()
     db.refresh(db_cert)
+    certificate_validation.invalidate(codes=[cert_code], document_ids=[user.document_id])
+    pdf_renderer.wake()
     
     # Attach course name for response
     response = schemas.CertificationResponse.from_orm(db_cert)
     response.course_name = course.name
+    response.render_job_id = job_id
     
     return response
 
+def _generate_codes(db: Session, count: int) -> List[str]:
+    # Unique within the batch and against existing certificates (one lookup per round)
+    codes = set()
+    while len(codes) < count:
+        candidates = {f"CERT-{uuid.uuid4().hex[:8].upper()}" for _ in range(count - len(codes))} - codes
+        taken = {c for (c,) in db.query(models.Certification.certificate_code).filter(
+            models.Certification.certificate_code.in_(candidates)
+        )}
+        codes |= candidates - taken
+    return list(codes)
+
+@router.post("/issue/cohort", response_model=schemas.CohortIssuanceResponse, status_code=202)
+def issue_cohort_certificates(
+    request: schemas.CohortCertificationCreate,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role not in [models.UserRole.ADMIN, models.UserRole.TRAINER]:
+        raise HTTPException(status_code=403, detail="Not authorized to issue certificates")
+
+    # Row lock serializes concurrent cohort issuance for the same course
+    course = db.query(models.Course).filter(
+        models.Course.id == request.course_id, models.Course.deleted_at.is_(None)
+    ).with_for_update().first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    # Enrolled students and whether they already hold the certificate, in one query
+    has_cert = db.query(models.Certification.id).filter(
+        models.Certification.user_id == models.Enrollment.user_id,
+        models.Certification.course_id == models.Enrollment.course_id
+    ).exists()
+    query = db.query(models.User, has_cert).join(
+        models.Enrollment, models.Enrollment.user_id == models.User.id
+    ).filter(models.Enrollment.course_id == course.id, models.User.deleted_at.is_(None))
+    if request.only_completed:
+        query = query.filter(models.Enrollment.status == models.EnrollmentStatus.COMPLETED)
+    if request.user_ids:
+        query = query.filter(models.User.id.in_(request.user_ids))
+
+    students = {}
+    skipped = set()
+    for user, already_certified in query.all():
+        if already_certified:
+            skipped.add(user.id)
+        else:
+            students[user.id] = user
+
+    if not students:
+        # No render jobs, so no batch to poll
+        return schemas.CohortIssuanceResponse(
+            batch_id=None, course_id=course.id, issued=0, skipped_existing=len(skipped)
+        )
+
+    batch_id = uuid.uuid4()
+
+    issue_date = request.issue_date or datetime.utcnow()
+    codes = _generate_codes(db, len(students))
+    now = datetime.utcnow()
+    values = [{
+        "id": uuid.uuid4(),
+        "user_id": user.id,
+        "course_id": course.id,
+        "issue_date": issue_date,
+        "expiration_date": request.expiration_date,
+        "certificate_code": code,
+        "signed_payload": certificate_signing.sign_certificate(code, user.document_id, course.name, issue_date, request.expiration_date),
+        "created_at": now
+    } for user, code in zip(students.values(), codes)]
+
+    # Single transaction: certificates, matrix rows and render jobs
+    db.execute(insert(models.Certification), values)
+    expiration_matrix.refresh_certifications(db, [v["id"] for v in values])
+    certificate_validation.refresh_certifications(db, [v["id"] for v in values])
+    for value in values:
+        user = students[value["user_id"]]
+        pdf_renderer.enqueue(
+            db, models.RenderKind.CERTIFICATE, value["id"],
+            pdf_renderer.certificate_payload(user, course, value["certificate_code"], issue_date, request.expiration_date, value["signed_payload"]),
+            owner_id=user.id,
+            batch_id=batch_id
+        )
+    items = [schemas.CohortCertificateItem(
+        certification_id=value["id"],
+        user_id=value["user_id"],
+        student_name=students[value["user_id"]].full_name,
+        certificate_code=value["certificate_code"]
+    ) for value in values]
+    course_id = course.id
+    document_ids = [user.document_id for user in students.values()]
+    db.commit()
+    # New codes may be negatively cached from earlier scans
+    certificate_validation.invalidate(codes=[item.certificate_code for item in items], document_ids=document_ids)
+    pdf_renderer.wake()
+
+    return schemas.CohortIssuanceResponse(
+        batch_id=batch_id,
+        course_id=course_id,
+        issued=len(items),
+        skipped_existing=len(skipped),
+        certificates=items
+    )
+
+@router.get("/issue/cohort/{batch_id}", response_model=schemas.CohortIssuanceProgress)
+def get_cohort_issuance_progress(
+    batch_id: UUID,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role not in [models.UserRole.ADMIN, models.UserRole.TRAINER]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    counts = pdf_renderer.batch_progress(db, batch_id)
+    total = sum(counts.values())
+    if not total:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return schemas.CohortIssuanceProgress(
+        batch_id=batch_id,
+        total=total,
+        pending=counts["PENDING"],
+        running=counts["RUNNING"],
+        completed=counts["COMPLETED"],
+        failed=counts["FAILED"],
+        done=counts["COMPLETED"] + counts["FAILED"] == total
+    )
+
 @router.get("/my-certificates", response_model=List[schemas.CertificationResponse])
 def get_my_certificates(
     db: Session = Depends(database.get_db),
@@ -82,60 +226,124 @@ def get_my_certificates(
         
     return results
 
+# Public validation: employers/inspectors scanning QR codes, no auth
+MAX_BATCH_VALIDATIONS = 200
+
+def _enforce_validation_limit(request: Request, cost: int = 1):
+    retry_after = certificate_validation.limiter.hit(rate_limit.client_key(request), cost)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many validation requests",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
 @router.get("/validate/{code}", response_model=schemas.CertificationResponse)
-def validate_certificate(
+async def validate_certificate(
     code: str,
-    db: Session = Depends(database.get_db)
+    request: Request,
+    db: AsyncSession = Depends(database.async_statement_timeout(VALIDATION_STATEMENT_TIMEOUT_MS))
 ):
-    cert = db.query(models.Certification).filter(models.Certification.certificate_code == code).first()
-    if not cert:
+    _enforce_validation_limit(request)
+    record = (await certificate_validation.lookup_codes_async(db, [code]))[code]
+    if not record:
         raise HTTPException(status_code=404, detail="Certificate not found")
-        
-    course = db.query(models.Course).filter(models.Course.id == cert.course_id).first()
-    user = db.query(models.User).filter(models.User.id == cert.user_id).first()
-    
-    cert_data = schemas.CertificationResponse.from_orm(cert)
-    
-    if course:
-        cert_data.course_name = course.name
-    
-    if user:
-        cert_data.student_name = user.full_name
-        cert_data.student_document_id = user.document_id
-        
-    return cert_data
+    return record
 
 @router.get("/validate/by-document/{document_id}", response_model=List[schemas.CertificationResponse])
-def validate_certificates_by_document(
+async def validate_certificates_by_document(
     document_id: str,
-    db: Session = Depends(database.get_db)
+    request: Request,
+    db: AsyncSession = Depends(database.async_statement_timeout(VALIDATION_STATEMENT_TIMEOUT_MS))
 ):
-    user = db.query(models.User).filter(models.User.document_id == document_id).first()
-    if not user:
-        # Return empty list if user not found, or 404? 
-        # Usually validation checks return "No records found" effectively represented by empty list.
-        return []
-        
-    certs = db.query(models.Certification).filter(models.Certification.user_id == user.id).all()
-    
-    results = []
-    for cert in certs:
-        course = db.query(models.Course).filter(models.Course.id == cert.course_id).first()
-        cert_data = schemas.CertificationResponse.from_orm(cert)
-        
-        if course:
-            cert_data.course_name = course.name
-        
-        cert_data.student_name = user.full_name
-        cert_data.student_document_id = user.document_id
-        
-        results.append(cert_data)
-        
-    return results
+    _enforce_validation_limit(request)
+    # Unknown documents return an empty list ("No records found")
+    return (await certificate_validation.lookup_documents_async(db, [document_id]))[document_id]
+
+@router.post("/validate/batch", response_model=schemas.CertificateValidationBatchResponse)
+async def validate_certificates_batch(
+    batch: schemas.CertificateValidationBatch,
+    request: Request,
+    db: AsyncSession = Depends(database.async_statement_timeout(VALIDATION_STATEMENT_TIMEOUT_MS))
+):
+    codes = list(dict.fromkeys(batch.codes))
+    document_ids = list(dict.fromkeys(batch.document_ids))
+    if len(codes) + len(document_ids) > MAX_BATCH_VALIDATIONS:
+        raise HTTPException(status_code=400, detail=f"Cannot validate more than {MAX_BATCH_VALIDATIONS} items at once")
+    _enforce_validation_limit(request, cost=max(1, len(codes) + len(document_ids)))
+
+    return {
+        "codes": await certificate_validation.lookup_codes_async(db, codes) if codes else {},
+        "documents": await certificate_validation.lookup_documents_async(db, document_ids) if document_ids else {}
+    }
+
+# Offline verification: signed QR tokens, public key and revocation list
+
+@router.get("/public-key")
+def get_signing_public_key(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return certificate_signing.public_key_info()
+
+@router.get("/verify/{token}", response_model=schemas.CertificateTokenVerification)
+def verify_certificate_token(token: str, request: Request):
+    # Signature check only: no database access
+    _enforce_validation_limit(request)
+    try:
+        fields = certificate_signing.verify_certificate(token)
+    except certificate_signing.SignatureError as e:
+        return schemas.CertificateTokenVerification(valid=False, detail=str(e))
+    return schemas.CertificateTokenVerification(
+        valid=True,
+        expired=fields["expiration_date"].date() < datetime.utcnow().date(),
+        **fields
+    )
+
+@router.get("/revocations")
+def get_revocation_list(request: Request, db: Session = Depends(database.get_db)):
+    snapshot = revocations.snapshot(db)
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"public, max-age={revocations.REVOCATION_MAX_AGE}"
+    }
+    if catalog_cache.etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@router.post("/{certification_id}/revoke")
+def revoke_certificate(
+    certification_id: UUID,
+    request: schemas.CertificateRevoke,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    cert = db.query(models.Certification).filter(models.Certification.id == certification_id).first()
+    if not cert:
+        raise HTTPException(status_code=404, detail="Certificate not found")
+
+    code = cert.certificate_code
+    revocations.revoke(db, cert, request.reason, current_user.id)
+    # Revoked certificates no longer validate online nor show in the company matrix
+    db.query(models.CertificateValidation).filter(
+        models.CertificateValidation.certification_id == cert.id
+    ).delete(synchronize_session=False)
+    db.query(models.CertificateExpirationEntry).filter(
+        models.CertificateExpirationEntry.certification_id == cert.id
+    ).delete(synchronize_session=False)
+    db.commit()
+    revocations.invalidate()
+    certificate_validation.clear()
+
+    return {"message": "Certificate revoked", "certificate_code": code}
 
 @router.get("/expiring-soon", response_model=List[schemas.CertificationResponse])
 def get_expiring_certificates(
-    days: int = 30,
+    response: Response,
+    days: int = Query(30, ge=0, le=3650),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
@@ -145,26 +353,46 @@ def get_expiring_certificates(
     start_date = datetime.utcnow()
     end_date = start_date + timedelta(days=days)
     
-    certs = db.query(models.Certification).filter(
+    # Range scan on ix_certifications_expiration_date; user and course come in the same query
+    revoked = exists().where(models.CertificateRevocation.certificate_code == models.Certification.certificate_code)
+    query = db.query(models.Certification).filter(
         models.Certification.expiration_date >= start_date,
-        models.Certification.expiration_date <= end_date
-    ).all()
+        models.Certification.expiration_date <= end_date,
+        ~revoked
+    )
+    total = query.count() if limit else None
+    query = query.options(
+        joinedload(models.Certification.user),
+        joinedload(models.Certification.course)
+    ).order_by(models.Certification.expiration_date, models.Certification.id).offset(skip)
+    if limit:
+        query = query.limit(limit)
+    certs = query.all()
     
     results = []
     for cert in certs:
-        # Optimizable with joinedload
-        course = db.query(models.Course).filter(models.Course.id == cert.course_id).first()
-        user = db.query(models.User).filter(models.User.id == cert.user_id).first()
-        
         cert_data = schemas.CertificationResponse.from_orm(cert)
-        
-        if course:
-            cert_data.course_name = course.name
-        
-        if user:
-            cert_data.student_name = user.full_name
-            cert_data.student_document_id = user.document_id
-            
+        if cert.course:
+            cert_data.course_name = cert.course.name
+        if cert.user:
+            cert_data.student_name = cert.user.full_name
+            cert_data.student_document_id = cert.user.document_id
         results.append(cert_data)
-        
+
+    response.headers["X-Total-Count"] = str(total if total is not None else skip + len(results))
     return results
+
+@router.post("/expiry-digest/run")
+def run_expiry_digest(
+    deliver: bool = True,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Manual trigger of the daily job (idempotent per company and day)
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    result = expiry_digest.build_digests(db)
+    if deliver:
+        result["delivery"] = mailer.deliver_pending()
+    return result
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-import pandas as pd
-import io
+import json
+import os
+import shutil
+import tempfile
 import models, schemas, database, auth
+from utils import expiration_matrix, bulk_import, auth_cache
+
+# Served from the materialized matrix, should answer well within this
+MATRIX_STATEMENT_TIMEOUT_MS = 10000
 
 router = APIRouter(
     prefix="/corporate",
@@ -42,7 +49,10 @@ def link_user_to_company(
         raise HTTPException(status_code=404, detail="Company not found")
         
     user.company_id = company_id
+    db.flush()
+    expiration_matrix.refresh_user(db, user.id)
     db.commit()
+    auth_cache.invalidate_user(user.id)
     return {"message": "User linked to company"}
 
 @router.get("/sgc", response_model=List[schemas.SGCDocumentResponse])
@@ -61,8 +71,9 @@ def create_sgc_document(doc: schemas.SGCDocumentCreate, db: Session = Depends(da
     return new_doc
     return new_doc
 
-@router.post("/employees/upload")
+@router.post("/employees/upload", response_model=schemas.ImportJobResponse, status_code=202)
 async def upload_employees(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
@@ -73,102 +84,110 @@ async def upload_employees(
     if not current_user.company_id:
         raise HTTPException(status_code=400, detail="User is not associated with any company")
 
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel file.")
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in bulk_import.ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel or CSV file.")
 
+    # Spool the upload to disk off the event loop, the job streams it from there
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
     try:
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        # Expected columns: Documento, Nombre Completo, Email, Cargo (Optional)
-        required_columns = ['Documento', 'Nombre Completo', 'Email']
-        if not all(col in df.columns for col in required_columns):
-             raise HTTPException(status_code=400, detail=f"Missing columns. Required: {required_columns}")
-
-        created_count = 0
-        errors = []
-
-        for index, row in df.iterrows():
-            try:
-                document_id = str(row['Documento'])
-                full_name = row['Nombre Completo']
-                email = row['Email']
-                
-                # Check if user exists
-                existing_user = db.query(models.User).filter(
-                    (models.User.document_id == document_id) | (models.User.email == email)
-                ).first()
-
-                if existing_user:
-                    errors.append(f"Row {index+2}: User {document_id} or {email} already exists")
-                    continue
-
-                # Create user
-                hashed_password = auth.get_password_hash(document_id) # Default password is document_id
-                new_user = models.User(
-                    document_id=document_id,
-                    email=email,
-                    full_name=full_name,
-                    hashed_password=hashed_password,
-                    role=models.UserRole.STUDENT, # Default role
-                    company_id=current_user.company_id
-                )
-                db.add(new_user)
-                created_count += 1
-            except Exception as e:
-                errors.append(f"Row {index+2}: {str(e)}")
-        
-        db.commit()
-        return {
-            "message": "Upload processed",
-            "created_count": created_count,
-            "errors": errors
-        }
+        await run_in_threadpool(shutil.copyfileobj, file.file, tmp)
+    finally:
+        tmp.close()
 
+    try:
+        header = await run_in_threadpool(bulk_import.read_header, tmp.name)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+
+    required_columns = bulk_import.REQUIRED_COLUMNS
+    if not all(col in header for col in required_columns):
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail=f"Missing columns. Required: {required_columns}")
+
+    job = models.ImportJob(
+        company_id=current_user.company_id,
+        created_by=current_user.id,
+        filename=file.filename,
+        status=models.ImportJobStatus.PENDING
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    background_tasks.add_task(bulk_import.run_import_job, job.id, tmp.name)
+    return _import_job_response(job)
+
+@router.get("/employees/upload/{job_id}", response_model=schemas.ImportJobResponse)
+def get_upload_job(job_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+    if current_user.role != models.UserRole.ADMIN and job.company_id != current_user.company_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return _import_job_response(job)
+
+def _import_job_response(job: models.ImportJob) -> schemas.ImportJobResponse:
+    return schemas.ImportJobResponse(
+        id=job.id,
+        status=job.status.value,
+        filename=job.filename,
+        processed_rows=job.processed_rows or 0,
+        created_count=job.created_count or 0,
+        error_count=job.error_count or 0,
+        errors=json.loads(job.errors) if job.errors else [],
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
 
 @router.get("/matrix")
-def get_expiration_matrix(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def get_expiration_matrix(
+    response: Response,
+    status: Optional[str] = Query(None, pattern="^(ACTIVE|EXPIRING_SOON|EXPIRED)$"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: Session = Depends(database.statement_timeout(MATRIX_STATEMENT_TIMEOUT_MS)),
+    current_user: models.User = Depends(auth.get_current_user)
+):
     if current_user.role != models.UserRole.COMPANY:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     if not current_user.company_id:
         raise HTTPException(status_code=400, detail="User is not associated with any company")
 
-    # Get all employees for the company
-    employees = db.query(models.User).filter(models.User.company_id == current_user.company_id).all()
+    # Served from the materialized matrix (see utils/expiration_matrix)
+    matrix_data, total = expiration_matrix.get_company_matrix(
+        db,
+        current_user.company_id,
+        status=status,
+        skip=skip,
+        limit=limit
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return matrix_data
+
+@router.get("/matrix/summary")
+def get_expiration_matrix_summary(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    if current_user.role != models.UserRole.COMPANY:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
-    matrix_data = []
-    today = pd.Timestamp.now()
+    if not current_user.company_id:
+        raise HTTPException(status_code=400, detail="User is not associated with any company")
 
-    for emp in employees:
-        # Get certifications for each employee
-        certs = db.query(models.Certification).filter(models.Certification.user_id == emp.id).all()
-        
-        for cert in certs:
-            # Determine status
-            expiration = pd.to_datetime(cert.expiration_date)
-            days_until_expiry = (expiration - today).days
-            
-            status_code = "ACTIVE"
-            if days_until_expiry < 0:
-                status_code = "EXPIRED"
-            elif days_until_expiry <= 30:
-                status_code = "EXPIRING_SOON"
-            
-            # Get course name
-            course = db.query(models.Course).filter(models.Course.id == cert.course_id).first()
-            course_name = course.name if course else "Unknown Course"
-
-            matrix_data.append({
-                "employee_name": emp.full_name,
-                "document_id": emp.document_id,
-                "course_name": course_name,
-                "issue_date": cert.issue_date,
-                "expiration_date": cert.expiration_date,
-                "status": status_code,
-                "days_remaining": days_until_expiry
-            })
-            
-    return matrix_data
+    return expiration_matrix.get_company_counts(db, current_user.company_id)
+
+@router.post("/matrix/rebuild")
+def rebuild_expiration_matrix(
+    company_id: Optional[UUID] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    rows = expiration_matrix.rebuild_company(db, company_id)
+    db.commit()
+    return {"message": "Expiration matrix rebuilt", "rows": rows}
@@ -1,123 +1,253 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, or_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 import models, schemas, database, auth
+from utils import expiration_matrix, catalog_cache, progress_buffer, certificate_validation, purge, quiz_engine, player_cache, curriculum
+import json
+
+CATALOG_STATEMENT_TIMEOUT_MS = 5000
 
 router = APIRouter(
     prefix="/courses",
     tags=["courses"]
 )
 
+def _enrolled_counts_subquery():
+    return select(
+        models.Enrollment.course_id,
+        func.count(models.Enrollment.id).label("enrolled_count")
+    ).group_by(models.Enrollment.course_id).subquery()
+
+def _enrolled_count(db: Session, course_id) -> int:
+    return db.query(func.count(models.Enrollment.id)).filter(models.Enrollment.course_id == course_id).scalar()
+
+def _catalog_select():
+    # One aggregated query for courses + enrollment counts + trainer,
+    # and one selectin query for the modules of every course.
+    counts = _enrolled_counts_subquery()
+    return select(models.Course, func.coalesce(counts.c.enrolled_count, 0))\
+        .outerjoin(counts, counts.c.course_id == models.Course.id)\
+        .where(models.Course.deleted_at.is_(None))\
+        .options(joinedload(models.Course.trainer), selectinload(models.Course.modules))
+
+def _with_counts(rows) -> List[models.Course]:
+    courses = []
+    for course, enrolled_count in rows:
+        course.enrolled_count = enrolled_count
+        courses.append(course)
+    return courses
+
+def load_catalog(db: Session) -> List[models.Course]:
+    return _with_counts(db.execute(_catalog_select()).all())
+
+async def load_catalog_async(db: AsyncSession) -> List[models.Course]:
+    return _with_counts((await db.execute(_catalog_select())).all())
+
 @router.get("/", response_model=List[schemas.CourseResponse])
-def get_courses(db: Session = Depends(database.get_db)):
-    courses = db.query(models.Course).options(joinedload(models.Course.trainer)).all()
-    # Enrolled count needs to be computed or query optimized, but let's keep it simple for now as Property? 
-    # Actually enrolled_count is not a property in models yet, so we need to set it or add property.
-    # Let's add enrolled_count as property too or keep manual assignment for strictly necessary fields.
+async def get_courses(request: Request, db: AsyncSession = Depends(database.async_statement_timeout(CATALOG_STATEMENT_TIMEOUT_MS))):
+    cached = catalog_cache.get()
+    if cached is None:
+        version = catalog_cache.version()
+        courses = await load_catalog_async(db)
+        payload = [schemas.CourseResponse.from_orm(c) for c in courses]
+        body = json.dumps(jsonable_encoder(payload)).encode("utf-8")
+        cached = catalog_cache.store(version, body)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if catalog_cache.etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+def _course_code(name: str, start_date: Optional[datetime]) -> Optional[str]:
+    if not start_date:
+        return None
+    # Format: [WORD1]-[WORD2]-[DDMMYY]
+    name_parts = name.upper().split()
+    if len(name_parts) >= 2:
+        acronym = f"{name_parts[0][:3]}-{name_parts[1][:3]}"
+    elif len(name_parts) == 1:
+        acronym = name_parts[0][:4]
+    else:
+        acronym = "CURSO"
+    # Uniqueness is settled per batch by _unique_codes
+    return f"{acronym}-{start_date.strftime('%d%m%y')}"
+
+def _unique_codes(db: Session, codes: List[Optional[str]]) -> List[Optional[str]]:
+    # Same-day courses with a common name prefix (and clones) share a base code:
+    # the first free one of BASE, BASE-2, BASE-3... is used, against the batch and
+    # every stored course (tombstoned ones included, they keep their code)
+    bases = {code for code in codes if code}
+    if not bases:
+        return codes
+    taken = {row.code for row in db.query(models.Course.code).filter(
+        or_(*[or_(models.Course.code == base, models.Course.code.like(f"{base}-%")) for base in bases])
+    )}
+    unique = []
+    for code in codes:
+        if code:
+            candidate, suffix = code, 1
+            while candidate in taken:
+                suffix += 1
+                candidate = f"{code}-{suffix}"
+            taken.add(candidate)
+            code = candidate
+        unique.append(code)
+    return unique
+
+def _check_trainer(db: Session, trainer_id: UUID):
+    # VALIDATION: Check Trainer License
+    trainer = db.query(models.User).filter(models.User.id == trainer_id).first()
+    if not trainer:
+        raise HTTPException(status_code=400, detail="Trainer not found")
     
-    for course in courses:
-        course.enrolled_count = len(course.enrollments)
-        # trainer_name is now a property, do not assign manually.
-        
+    # Check Expiration
+    if not trainer.license_expiration:
+         raise HTTPException(status_code=400, detail=f"Cannot assign trainer {trainer.full_name}: SST License expiration date is missing.")
+    
+    if trainer.license_expiration < datetime.utcnow():
+         raise HTTPException(status_code=400, detail=f"Cannot assign trainer {trainer.full_name}: SST License is expired (Expired on {trainer.license_expiration.strftime('%Y-%m-%d')}).")
+
+def _add_courses(db: Session, rows: List[dict]) -> List[models.Course]:
+    """
+    Inserts several courses in one batch (not committed).
+    """
+    if not rows:
+        raise HTTPException(status_code=400, detail="No courses to create")
+    if len(rows) > curriculum.MAX_INSTANCES:
+        raise HTTPException(status_code=400, detail=f"At most {curriculum.MAX_INSTANCES} courses per request")
+    for trainer_id in {row["trainer_id"] for row in rows if row.get("trainer_id")}:
+        _check_trainer(db, trainer_id)
+
+    codes = _unique_codes(db, [_course_code(row["name"], row.get("start_date")) for row in rows])
+    courses = [models.Course(**row, code=code) for row, code in zip(rows, codes)]
+    db.add_all(courses)
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request took one of the codes
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Course code already in use: {', '.join(c for c in codes if c)}")
     return courses
 
+def _created_courses(db: Session, course_ids: List[UUID]) -> List[models.Course]:
+    # Response rows with trainer and modules in two queries
+    return db.query(models.Course)\
+        .filter(models.Course.id.in_(course_ids))\
+        .options(joinedload(models.Course.trainer), selectinload(models.Course.modules))\
+        .order_by(models.Course.start_date, models.Course.name).all()
+
+def _get_template(db: Session, template_id: UUID) -> models.CurriculumTemplate:
+    template = db.query(models.CurriculumTemplate).filter(models.CurriculumTemplate.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Curriculum template not found")
+    return template
+
 @router.post("/", response_model=schemas.CourseResponse)
 def create_course(course: schemas.CourseCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Creates the course with the modules and questions of a curriculum template:
+    the one given, or the one matching the course name (utils/curriculum).
+    """
     if current_user.role != models.UserRole.ADMIN:
          raise HTTPException(status_code=403, detail="Not authorized")
-    
-    
-    # Generate Code
-    if course.start_date:
-        # Format: [WORD1]-[WORD2]-[DDMMYY]
-        name_parts = course.name.upper().split()
-        acronym = ""
-        if len(name_parts) >= 2:
-            acronym = f"{name_parts[0][:3]}-{name_parts[1][:3]}"
-        elif len(name_parts) == 1:
-            acronym = name_parts[0][:4]
-        else:
-            acronym = "CURSO"
-            
-        date_str = course.start_date.strftime("%d%m%y")
-        generated_code = f"{acronym}-{date_str}"
-        
-        # Check uniqueness (simple check, append suffix if exists in real app)
-        # For this MVP we trust it's unique per day/name combination
-        
-        new_course = models.Course(**course.dict())
-        new_course.code = generated_code
-    else:
-        new_course = models.Course(**course.dict())
-    
-    # If trainer_id is set, relationship handles it
-    # VALIDATION: Check Trainer License
-    if course.trainer_id:
-        trainer = db.query(models.User).filter(models.User.id == course.trainer_id).first()
-        if not trainer:
-            raise HTTPException(status_code=400, detail="Trainer not found")
-        
-        # Check Expiration
-        if not trainer.license_expiration:
-             raise HTTPException(status_code=400, detail=f"Cannot assign trainer {trainer.full_name}: SST License expiration date is missing.")
-        
-        if trainer.license_expiration < datetime.utcnow():
-             raise HTTPException(status_code=400, detail=f"Cannot assign trainer {trainer.full_name}: SST License is expired (Expired on {trainer.license_expiration.strftime('%Y-%m-%d')}).")
 
-    db.add(new_course)
+    template = _get_template(db, course.template_id) if course.template_id else curriculum.match_template(db, course.name)
+
+    # Course and curriculum are committed together
+    new_course = _add_courses(db, [course.dict(exclude={"template_id"})])[0]
+    if template:
+        curriculum.instantiate(db, template.id, [new_course.id])
     db.commit()
     db.refresh(new_course)
-    
-    # --- AUTO-POPULATE MODULES (Res. 4272/2021) ---
-    import uuid
-    
-    advanced_topics = [
-        ("Marco Legal (Res. 4272/2021)", "Análisis de la resolución, obligaciones empleador/trabajador, roles y responsabilidades."),
-        ("Identificación de Peligros", "Peligros y riesgos asociados al trabajo en alturas. Medidas de prevención y protección."),
-        ("Permisos de Trabajo", "Diligenciamiento del permiso, listas de chequeo y análisis de riesgo (ARO/ATS)."),
-        ("Equipos de Protección Personal (EPP)", "Selección, uso, inspección y mantenimiento de arneses, cascos y eslingas."),
-        ("Sistemas de Ingeniería", "Líneas de vida, puntos de anclaje, barandas y redes de seguridad."),
-        ("Procedimientos de Rescate", "Plan de emergencias, autorescate y rescate asistido básico."),
-        ("Primeros Auxilios Básicos", "Atención inicial a trauma por suspensión y lesiones comunes.")
-    ]
-
-    basic_topics = [
-        ("Introducción a la Normativa", "Aspectos generales de la Resolución 4272 de 2021."),
-        ("Responsabilidad Civil y Penal", " implicaciones legales de los accidentes de trabajo."),
-        ("Gestión de Riesgos", "Conceptos básicos de identificación y control de riesgos.")
-    ]
-    
-    topics = []
-    name_upper = new_course.name.upper()
-    
-    if "AVANZADO" in name_upper or "ENTRENAMIENTO" in name_upper or "COORDINADOR" in name_upper:
-        topics = advanced_topics
-    elif "ADMINISTRATIVO" in name_upper or "BASICO" in name_upper or "BÁSICO" in name_upper:
-        topics = basic_topics
-    else:
-        # Default fallback
-        topics = advanced_topics[:4]
-        
-    try:
-        if current_user.role == models.UserRole.ADMIN: # Double check auth just in case logic moves
-            for idx, (title, desc) in enumerate(topics):
-                mod = models.Module(
-                    id=uuid.uuid4(),
-                    course_id=new_course.id,
-                    title=title,
-                    description=desc,
-                    order_index=idx + 1
-                )
-                db.add(mod)
-            db.commit()
-    except Exception as e:
-        print(f"Error auto-populating modules: {e}")
-        # Don't fail the course creation, just log error
         
+    catalog_cache.invalidate()
     return new_course
 
+@router.post("/from-template/{template_id}", response_model=List[schemas.CourseResponse])
+def create_courses_from_template(
+    template_id: UUID,
+    courses: List[schemas.CourseBase],
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Creates several courses (e.g. the scheduled instances of a quarter) with the
+    curriculum of a template, in one transaction.
+    """
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    template = _get_template(db, template_id)
+    course_ids = [c.id for c in _add_courses(db, [c.dict() for c in courses])]
+    curriculum.instantiate(db, template.id, course_ids)
+    db.commit()
+
+    catalog_cache.invalidate()
+    return _created_courses(db, course_ids)
+
+# Copied from the source course unless the instance overrides them
+CLONED_COURSE_FIELDS = ("name", "description", "required_hours", "type", "price", "required_documents",
+                        "start_date", "duration_days", "location", "capacity", "trainer_id")
+
+@router.post("/{course_id}/clone", response_model=List[schemas.CourseResponse])
+def clone_course(
+    course_id: UUID,
+    request: schemas.CourseCloneRequest,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Copies a course with its modules and questions, once per instance, in one transaction.
+    """
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    source = db.query(models.Course).filter(models.Course.id == course_id, models.Course.deleted_at.is_(None)).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    base = {field: getattr(source, field) for field in CLONED_COURSE_FIELDS}
+    new_courses = _add_courses(db, [{**base, **instance.dict(exclude_unset=True)} for instance in request.instances])
+    course_ids = [c.id for c in new_courses]
+    curriculum.clone_modules(db, source.id, course_ids)
+    db.commit()
+
+    catalog_cache.invalidate()
+    return _created_courses(db, course_ids)
+
+def _create_enrollment(db: Session, user_id: UUID, course_id: UUID) -> models.Enrollment:
+    live_course = db.query(models.Course.id).filter(models.Course.id == course_id, models.Course.deleted_at.is_(None)).first()
+    if live_course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    new_enrollment = models.Enrollment(
+        user_id=user_id,
+        course_id=course_id,
+        status=models.EnrollmentStatus.ENROLLED
+    )
+    db.add(new_enrollment)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Concurrent enroll of the same user (uq_enrollments_user_course): return that one
+        db.rollback()
+        existing = db.query(models.Enrollment).filter(
+            models.Enrollment.user_id == user_id,
+            models.Enrollment.course_id == course_id
+        ).first()
+        if existing is None:
+            raise
+        return existing
+    db.refresh(new_enrollment)
+    catalog_cache.invalidate()
+    return new_enrollment
+
 @router.post("/{course_id}/enroll", response_model=schemas.EnrollmentResponse)
 def enroll_course(course_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     # Check if already enrolled
@@ -132,15 +262,7 @@ def enroll_course(course_id: UUID, db: Session = Depends(database.get_db), curre
     # Check compliance (Simplified logic for now)
     # In real app, we check if documents are APPROVED here
 
-    new_enrollment = models.Enrollment(
-        user_id=current_user.id,
-        course_id=course_id,
-        status=models.EnrollmentStatus.ENROLLED
-    )
-    db.add(new_enrollment)
-    db.commit()
-    db.refresh(new_enrollment)
-    return new_enrollment
+    return _create_enrollment(db, current_user.id, course_id)
 
 @router.post("/{course_id}/enroll-student", response_model=schemas.EnrollmentResponse)
 def enroll_student_admin(
@@ -153,7 +275,7 @@ def enroll_student_admin(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     # Check student existence
-    student = db.query(models.User).filter(models.User.id == enrollment_data.user_id).first()
+    student = db.query(models.User).filter(models.User.id == enrollment_data.user_id, models.User.deleted_at.is_(None)).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
@@ -166,108 +288,154 @@ def enroll_student_admin(
     if existing:
         return existing # Idempotent
 
-    new_enrollment = models.Enrollment(
-        user_id=enrollment_data.user_id,
-        course_id=course_id,
-        status=models.EnrollmentStatus.ENROLLED
-    )
-    db.add(new_enrollment)
-    db.commit()
-    db.refresh(new_enrollment)
-    return new_enrollment
+    return _create_enrollment(db, enrollment_data.user_id, course_id)
 
 @router.get("/my-enrollments", response_model=List[schemas.EnrollmentResponse])
 def get_my_enrollments(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     return db.query(models.Enrollment).filter(models.Enrollment.user_id == current_user.id).all()
 
 @router.post("/{course_id}/modules/{module_id}/progress", response_model=schemas.ModuleProgressResponse)
-def update_module_progress(
+async def update_module_progress(
     course_id: UUID,
     module_id: UUID,
     progress: schemas.ModuleProgressCreate,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
 ):
-    # Verify enrollment
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == course_id
-    ).first()
-    
-    if not enrollment:
+    # Verify enrollment (cached per user/course by the progress buffer)
+    if not await progress_buffer.is_enrolled_async(db, current_user.id, course_id):
         raise HTTPException(status_code=403, detail="Not enrolled in this course")
 
-    # Get or create progress record
-    module_progress = db.query(models.ModuleProgress).filter(
-        models.ModuleProgress.user_id == current_user.id,
-        models.ModuleProgress.module_id == module_id
-    ).first()
+    # Heartbeats are coalesced in memory and flushed in batches
+    return await progress_buffer.record_async(
+        db,
+        current_user.id,
+        module_id,
+        progress.status,
+        progress.seconds_spent
+    )
+
+@router.get("/{course_id}/progress", response_model=List[schemas.ModuleProgressResponse])
+async def get_course_progress(
+    course_id: UUID,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
+):
+    if not await progress_buffer.is_enrolled_async(db, current_user.id, course_id):
+        raise HTTPException(status_code=403, detail="Not enrolled in this course")
 
-    if not module_progress:
-        module_progress = models.ModuleProgress(
-            user_id=current_user.id,
-            module_id=module_id,
-            status=progress.status,
-            seconds_spent=progress.seconds_spent
+    rows = (await db.execute(
+        select(models.ModuleProgress)
+        .join(models.Module, models.Module.id == models.ModuleProgress.module_id)
+        .where(
+            models.ModuleProgress.user_id == current_user.id,
+            models.Module.course_id == course_id
         )
-        db.add(module_progress)
-    else:
-        module_progress.status = progress.status
-        module_progress.seconds_spent = progress.seconds_spent
-        module_progress.last_updated = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(module_progress)
-    return module_progress
+    )).scalars().all()
+
+    # Pending heartbeats for modules of this course
+    module_ids = set((await db.execute(select(models.Module.id).where(models.Module.course_id == course_id))).scalars())
+    return [p for p in progress_buffer.overlay(current_user.id, rows) if p["module_id"] in module_ids]
+
+async def _player_structure(db: AsyncSession, course_id: UUID) -> player_cache.CachedStructure:
+    cached = player_cache.get(course_id)
+    if cached is not None:
+        return cached
+
+    built_version = player_cache.version()
+    # Relationships are loaded eagerly: lazy loads are not possible on the async session
+    course = (await db.execute(
+        select(models.Course)
+        .where(models.Course.id == course_id, models.Course.deleted_at.is_(None))
+        .options(joinedload(models.Course.trainer), selectinload(models.Course.modules))
+    )).scalars().first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    payload = schemas.CourseResponse.from_orm(course).dict()
+    payload["modules"].sort(key=lambda m: m["order_index"])
+    return player_cache.store(built_version, course_id, payload)
 
-@router.get("/{course_id}/player", response_model=schemas.CourseResponse)
-def get_course_player(
+@router.get("/{course_id}/player", response_model=schemas.CoursePlayerResponse)
+async def get_course_player(
     course_id: UUID,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
 ):
-    # Verify enrollment
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == course_id
-    ).first()
-    
+    """
+    Everything the player needs in one payload: the course with its ordered modules
+    (cached per course), plus the user's enrollment, progress (including pending
+    heartbeats) and best quiz result per module.
+    """
+    enrollment = (await db.execute(
+        select(models.Enrollment).where(
+            models.Enrollment.user_id == current_user.id,
+            models.Enrollment.course_id == course_id
+        )
+    )).scalars().first()
     if not enrollment:
         raise HTTPException(status_code=403, detail="Not enrolled in this course")
-        
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-        
-    return course
-    return course
+
+    structure = await _player_structure(db, course_id)
+    module_ids = structure.module_ids
+
+    progress = {}
+    quiz_results = {}
+    if module_ids:
+        rows = (await db.execute(
+            select(models.ModuleProgress).where(
+                models.ModuleProgress.user_id == current_user.id,
+                models.ModuleProgress.module_id.in_(module_ids)
+            )
+        )).scalars().all()
+        progress = {p["module_id"]: p for p in progress_buffer.overlay(current_user.id, rows)}
+
+        attempts = models.QuizAttempt
+        quiz_results = {row.module_id: row for row in (await db.execute(
+            select(
+                attempts.module_id,
+                func.max(attempts.score).label("best_score"),
+                func.bool_or(attempts.passed).label("passed"),
+                func.count().label("attempts")
+            )
+            .where(attempts.user_id == current_user.id, attempts.module_id.in_(module_ids))
+            .group_by(attempts.module_id)
+        )).all()}
+
+    states = []
+    for module_id in module_ids:
+        state = {"module_id": module_id}
+        if module_id in progress:
+            p = progress[module_id]
+            state.update(status=p["status"], seconds_spent=p["seconds_spent"], last_updated=p["last_updated"])
+        if module_id in quiz_results:
+            q = quiz_results[module_id]
+            state.update(best_score=q.best_score, quiz_passed=bool(q.passed), quiz_attempts=q.attempts)
+        states.append(state)
+
+    return {**structure.payload, "enrollment": enrollment, "progress": states}
 
 @router.get("/modules/{module_id}/quiz", response_model=List[schemas.QuestionResponse])
 def get_module_quiz(
     module_id: UUID,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    # Verify module exists and has quiz
-    module = db.query(models.Module).filter(models.Module.id == module_id).first()
-    if not module or not module.has_quiz:
+    """
+    Draws the questions of a new attempt. The X-Quiz-Session header identifies it
+    on submit; requesting the quiz again replaces the open attempt.
+    """
+    bank = quiz_engine.get_bank(db, module_id)
+    if not bank or not bank.has_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found for this module")
 
-    # Verify enrollment in the course
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == module.course_id
-    ).first()
-    
-    if not enrollment:
+    if not progress_buffer.is_enrolled(db, current_user.id, bank.course_id):
         raise HTTPException(status_code=403, detail="Not enrolled in this course")
 
-    # Get random questions (Limit to 5 for now)
-    import random
-    questions = db.query(models.Question).filter(models.Question.module_id == module_id).all()
-    selected_questions = random.sample(questions, min(len(questions), 5))
-    
-    return selected_questions
+    session_id, questions = quiz_engine.serve(db, bank, current_user.id)
+    response.headers["X-Quiz-Session"] = str(session_id)
+    return [schemas.QuestionResponse(id=q.id, text=q.text, options=q.options) for q in questions]
 
 @router.post("/modules/{module_id}/quiz", response_model=schemas.QuizResult)
 def submit_module_quiz(
@@ -276,84 +444,39 @@ def submit_module_quiz(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    # Verify module
-    module = db.query(models.Module).filter(models.Module.id == module_id).first()
-    if not module or not module.has_quiz:
+    """
+    Grades the open attempt: answers[i] is the option chosen for the i-th question served.
+    """
+    bank = quiz_engine.get_bank(db, module_id)
+    if not bank or not bank.has_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
-    # Get questions (In a real app, we should track which questions were served to the user)
-    # For simplicity, we assume the frontend sends answers for the questions it received
-    # BUT, since we don't track session, we can't easily map answers to random questions without IDs.
-    # FIX: The frontend should probably send {question_id: answer_index}.
-    # However, to stick to the plan's schema (List[int]), we will assume the frontend sends answers 
-    # for ALL questions or we need to change the schema.
-    # Let's change the logic: The backend will fetch ALL questions for the module and grade them.
-    # Wait, if we serve random questions, we MUST know which ones.
-    # Let's simplify: Return ALL questions for the module for now, or assume the user answers all.
-    
-    # BETTER APPROACH for this MVP:
-    # 1. Fetch all questions for the module.
-    # 2. Expect submission.answers to be a list of indices corresponding to the fetched questions order?
-    # NO, that's flaky.
-    # Let's update the schema to accept {question_id: index} map? 
-    # Or just fetch all questions and assume the submission matches the order of `db.query(models.Question).all()`?
-    # That's also risky if DB order changes.
-    
-    # Let's stick to the simplest robust way:
-    # The endpoint receives a list of answers. We need to know which question each answer belongs to.
-    # I will modify the schema in the next step if needed, but for now let's assume 
-    # the frontend sends answers for ALL questions in the module, ordered by ID or creation.
-    
-    questions = db.query(models.Question).filter(models.Question.module_id == module_id).all()
-    
-    if len(submission.answers) != len(questions):
-        # This is a limitation of the current simple schema
-        # For MVP, let's assume we always serve ALL questions if we want to grade simply.
-        pass 
-
-    correct_count = 0
-    for i, question in enumerate(questions):
-        if i < len(submission.answers):
-            if submission.answers[i] == question.correct_option_index:
-                correct_count += 1
-    
-    score = int((correct_count / len(questions)) * 100) if questions else 0
-    passed = score >= module.passing_score
+    question_ids = quiz_engine.consume(db, current_user.id, module_id, submission.session_id)
+    if question_ids is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="No open quiz for this module (expired or already submitted)")
+
+    correct_count = quiz_engine.grade(bank, question_ids, submission.answers)
+    score = int((correct_count / len(question_ids)) * 100) if question_ids else 0
+    passed = score >= bank.passing_score
 
-    # Record attempt
-    attempt = models.QuizAttempt(
+    # The attempt and the session removal are committed before the completion is recorded
+    db.add(models.QuizAttempt(
         user_id=current_user.id,
         module_id=module_id,
         score=score,
         passed=passed
-    )
-    db.add(attempt)
-    
-    # Update module progress if passed
-    if passed:
-        progress = db.query(models.ModuleProgress).filter(
-            models.ModuleProgress.user_id == current_user.id,
-            models.ModuleProgress.module_id == module_id
-        ).first()
-        
-        if progress:
-            progress.status = 'COMPLETED'
-        else:
-            progress = models.ModuleProgress(
-                user_id=current_user.id,
-                module_id=module_id,
-                status='COMPLETED',
-                seconds_spent=module.min_duration_seconds # Assume full time if passed quiz
-            )
-            db.add(progress)
-
+    ))
     db.commit()
+    if passed:
+        # Through the progress buffer: merged with any pending heartbeat of the module
+        progress_buffer.record(db, current_user.id, module_id, "COMPLETED", bank.min_duration_seconds)
     
     return schemas.QuizResult(
         score=score,
         passed=passed,
         correct_answers=correct_count,
-        total_questions=len(questions)
+        total_questions=len(question_ids)
     )
 
 @router.get("/{course_id}/enrollments", response_model=List[schemas.UserResponse])
@@ -367,7 +490,8 @@ def get_course_enrollments(
         
     users = db.query(models.User).join(models.Enrollment).filter(
         models.Enrollment.course_id == course_id,
-        models.Enrollment.status == models.EnrollmentStatus.ENROLLED
+        models.Enrollment.status == models.EnrollmentStatus.ENROLLED,
+        models.User.deleted_at.is_(None)
     ).all()
     
     return users
@@ -382,12 +506,12 @@ def update_course(
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    db_course = db.query(models.Course).filter(models.Course.id == course_id, models.Course.deleted_at.is_(None)).first()
     if not db_course:
         raise HTTPException(status_code=404, detail="Course not found")
         
     # Validation: Capacity cannot be less than current enrollments
-    current_enrollments = len(db_course.enrollments)
+    current_enrollments = _enrolled_count(db, db_course.id)
     if course_update.capacity < current_enrollments:
         raise HTTPException(status_code=400, detail=f"Capacity cannot be less than current enrollments ({current_enrollments})")
 
@@ -407,18 +531,11 @@ def update_course(
     
     # VALIDATION: Check Trainer License if changing trainer
     if course_update.trainer_id:
-        trainer = db.query(models.User).filter(models.User.id == course_update.trainer_id).first()
-        if not trainer:
-            raise HTTPException(status_code=400, detail="Trainer not found")
-        
-        # Check Expiration
-        if not trainer.license_expiration:
-             raise HTTPException(status_code=400, detail=f"Cannot assign trainer {trainer.full_name}: SST License expiration date is missing.")
-        
-        if trainer.license_expiration < datetime.utcnow():
-             raise HTTPException(status_code=400, detail=f"Cannot assign trainer {trainer.full_name}: SST License is expired (Expired on {trainer.license_expiration.strftime('%Y-%m-%d')}).")
+        _check_trainer(db, course_update.trainer_id)
 
     db_course.trainer_id = course_update.trainer_id
+    expiration_matrix.refresh_course_name(db, db_course.id, db_course.name)
+    certificate_validation.refresh_course_name(db, db_course.id, db_course.name)
     
     # Recalculate code if name or date changed? 
     # For now, let's keep the original code to avoid confusion or add complex logic later if requested.
@@ -426,74 +543,35 @@ def update_course(
     
     db.commit()
     db.refresh(db_course)
-    db_course.enrolled_count = len(db_course.enrollments) # Ensure property is set for response
+    catalog_cache.invalidate()
+    player_cache.invalidate(db_course.id)
+    certificate_validation.clear()
+    db_course.enrolled_count = current_enrollments # Ensure property is set for response
     return db_course
 
-@router.delete("/{course_id}")
+@router.delete("/{course_id}", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.PurgeJobResponse)
 def delete_course(
     course_id: UUID,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    """
+    Tombstones the course (out of the catalog right away) and queues the removal
+    of its modules, enrollments, sessions and certificates to utils/purge.
+    Poll GET /system/purges/{id} for progress.
+    """
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
         
+    # Tombstoned courses too: repeating the request returns the running purge
     db_course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if not db_course:
         raise HTTPException(status_code=404, detail="Course not found")
-        
-    # Deep Cascade Delete for ALL dependencies
-    try:
-        # A. Pre-fetch IDs if needed for deeper nesting, but simple query->delete is sufficient for most
-        
-        # 1. Delete Certifications
-        db.query(models.Certification).filter(models.Certification.course_id == course_id).delete(synchronize_session=False)
-
-        # 2. Delete Surveys
-        db.query(models.Survey).filter(models.Survey.course_id == course_id).delete(synchronize_session=False)
-
-        # 3. Delete Practice Sessions & Bookings
-        # Find sessions
-        sessions = db.query(models.PracticeSession).filter(models.PracticeSession.course_id == course_id).all()
-        session_ids = [s.id for s in sessions]
-        if session_ids:
-            # Delete Bookings
-            db.query(models.PracticeBooking).filter(models.PracticeBooking.session_id.in_(session_ids)).delete(synchronize_session=False)
-            # Delete Sessions
-            db.query(models.PracticeSession).filter(models.PracticeSession.course_id == course_id).delete(synchronize_session=False)
-
-        # 4. Delete Enrollments & Related (Attendance, Documents, Progress)
-        enrollments = db.query(models.Enrollment).filter(models.Enrollment.course_id == course_id).all()
-        enrollment_ids = [e.id for e in enrollments]
-        
-        if enrollment_ids:
-            # Delete Attendance
-            db.query(models.AttendanceRecord).filter(models.AttendanceRecord.enrollment_id.in_(enrollment_ids)).delete(synchronize_session=False)
-            # Delete Documents (uploaded by student for this enrollment if linked)
-            # Note: Documents in 'documents' table might serve multiple purposes, but if linked to enrollment_id...
-            # The model has enrollment_id nullable. Let's delete those linked.
-            db.query(models.Document).filter(models.Document.enrollment_id.in_(enrollment_ids)).delete(synchronize_session=False)
-            # Delete Enrollments
-            db.query(models.Enrollment).filter(models.Enrollment.course_id == course_id).delete(synchronize_session=False)
-
-        # 5. Delete Modules & Content
-        modules = db.query(models.Module).filter(models.Module.course_id == course_id).all()
-        module_ids = [m.id for m in modules]
-        
-        if module_ids:
-            db.query(models.QuizAttempt).filter(models.QuizAttempt.module_id.in_(module_ids)).delete(synchronize_session=False)
-            db.query(models.ModuleProgress).filter(models.ModuleProgress.module_id.in_(module_ids)).delete(synchronize_session=False)
-            db.query(models.Question).filter(models.Question.module_id.in_(module_ids)).delete(synchronize_session=False)
-            db.query(models.Module).filter(models.Module.course_id == course_id).delete(synchronize_session=False)
-            
-        # 6. Delete Course
-        db.delete(db_course)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting course: {str(e)}")
-        
-    return {"message": "Course deleted successfully"}
+
+    job = purge.request_purge(db, db_course, current_user.id)
+    player_cache.invalidate(course_id)
+    catalog_cache.invalidate()
+    return purge.progress(job)
 
 @router.delete("/{course_id}/enrollments/{user_id}")
 def remove_student_from_course(
@@ -515,5 +593,7 @@ def remove_student_from_course(
         
     db.delete(enrollment)
     db.commit()
+    catalog_cache.invalidate()
+    progress_buffer.forget_enrollment(user_id, course_id)
     
     return {"message": "Student removed from course"}
@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
+from uuid import UUID
+import uuid
+import models, schemas, database, auth
+from utils import curriculum
+
+router = APIRouter(
+    prefix="/curricula",
+    tags=["curricula"]
+)
+
+def _require_admin(current_user: models.User):
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+def _load_templates(db: Session, template_id: Optional[UUID] = None) -> List[models.CurriculumTemplate]:
+    query = db.query(models.CurriculumTemplate).options(selectinload(models.CurriculumTemplate.modules))
+    if template_id:
+        query = query.filter(models.CurriculumTemplate.id == template_id)
+    templates = query.order_by(models.CurriculumTemplate.priority, models.CurriculumTemplate.name).all()
+
+    # Question counts per module in one grouped query
+    module_ids = [m.id for t in templates for m in t.modules]
+    counts = dict(db.query(models.TemplateQuestion.template_module_id, func.count(models.TemplateQuestion.id))
+                  .filter(models.TemplateQuestion.template_module_id.in_(module_ids))
+                  .group_by(models.TemplateQuestion.template_module_id).all()) if module_ids else {}
+    for template in templates:
+        for module in template.modules:
+            module.question_count = counts.get(module.id, 0)
+    return templates
+
+def _commit_template(db: Session, template_id: UUID) -> models.CurriculumTemplate:
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A curriculum template with this name already exists")
+    return _load_templates(db, template_id)[0]
+
+@router.get("", response_model=List[schemas.CurriculumTemplateResponse])
+def list_templates(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    _require_admin(current_user)
+    return _load_templates(db)
+
+@router.get("/{template_id}", response_model=schemas.CurriculumTemplateResponse)
+def get_template(template_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    _require_admin(current_user)
+    templates = _load_templates(db, template_id)
+    if not templates:
+        raise HTTPException(status_code=404, detail="Curriculum template not found")
+    return templates[0]
+
+@router.post("", response_model=schemas.CurriculumTemplateResponse)
+def create_template(
+    template: schemas.CurriculumTemplateCreate,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Stores a template with its modules and question banks.
+    """
+    _require_admin(current_user)
+
+    db_template = models.CurriculumTemplate(id=uuid.uuid4(), **template.dict(exclude={"modules"}))
+    rows = [db_template]
+    for module in template.modules:
+        db_module = models.TemplateModule(id=uuid.uuid4(), template_id=db_template.id, **module.dict(exclude={"questions"}))
+        rows.append(db_module)
+        rows.extend(models.TemplateQuestion(template_module_id=db_module.id, **q.dict()) for q in module.questions)
+    db.add_all(rows)
+    return _commit_template(db, db_template.id)
+
+@router.post("/from-course/{course_id}", response_model=schemas.CurriculumTemplateResponse)
+def capture_template(
+    course_id: UUID,
+    template: schemas.CurriculumTemplateBase,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Saves the modules and questions of an existing course as a new template.
+    """
+    _require_admin(current_user)
+
+    course = db.query(models.Course.id).filter(models.Course.id == course_id, models.Course.deleted_at.is_(None)).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    db_template = models.CurriculumTemplate(id=uuid.uuid4(), **template.dict())
+    db.add(db_template)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A curriculum template with this name already exists")
+    curriculum.capture(db, course_id, db_template.id)
+    return _commit_template(db, db_template.id)
+
+@router.delete("/{template_id}")
+def delete_template(template_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    # Courses created from the template keep their own copy of the curriculum
+    _require_admin(current_user)
+    if not db.query(models.CurriculumTemplate.id).filter(models.CurriculumTemplate.id == template_id).first():
+        raise HTTPException(status_code=404, detail="Curriculum template not found")
+    curriculum.delete_template(db, template_id)
+    db.commit()
+    return {"message": "Curriculum template deleted successfully"}
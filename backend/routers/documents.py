@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-import shutil
 import os
 import uuid
 import json
 import models, schemas, database, auth
+from utils import compliance_matrix, upload_store
 
 router = APIRouter(
     prefix="/documents",
@@ -16,6 +16,12 @@ router = APIRouter(
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+async def _store_upload(file: UploadFile, stem: str) -> upload_store.StoredUpload:
+    try:
+        return await upload_store.store(file, UPLOAD_DIR, stem)
+    except upload_store.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
 @router.post("/upload", response_model=schemas.DocumentResponse)
 async def upload_document(
     type: str = Form(...),
@@ -24,23 +30,21 @@ async def upload_document(
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    # Validate file type
-    if file.content_type not in ["application/pdf", "image/jpeg", "image/png"]:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, JPEG, PNG allowed.")
+    if type not in {t.value for t in models.DocumentType}:
+        raise HTTPException(status_code=400, detail=f"Invalid document type. Allowed: {', '.join(t.value for t in models.DocumentType)}")
 
-    # Save file
-    file_extension = os.path.splitext(file.filename)[1]
-    file_name = f"{current_user.id}_{type}_{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save file (validated and written off the event loop)
+    safe_type = "".join([c for c in type if c.isalnum() or c in ('-', '_')])
+    stored = await _store_upload(file, f"{current_user.id}_{safe_type}_{uuid.uuid4()}")
 
     # Create DB record
     new_doc = models.Document(
         user_id=current_user.id,
         type=type,
-        file_url=file_path,
+        file_url=stored.path,
+        file_sha256=stored.sha256,
+        file_size=stored.size,
+        file_content_type=stored.content_type,
         expiration_date=expiration_date,
         status=models.DocumentStatus.PENDING
     )
@@ -123,58 +127,35 @@ def review_document(
 
 @router.get("/matrix", response_model=List[schemas.DocumentMatrixItem])
 def get_compliance_matrix(
+    response: Response,
+    course_id: Optional[uuid.UUID] = None,
+    status: Optional[models.EnrollmentStatus] = None,
+    missing_type: Optional[models.DocumentType] = None,
+    sort: str = "-enrollment_date",
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    # Get all enrollments for students
-    enrollments = db.query(models.Enrollment)\
-        .join(models.User)\
-        .filter(models.User.role == models.UserRole.STUDENT)\
-        .order_by(models.Enrollment.created_at.desc())\
-        .all()
-    
-    matrix = []
-    
-    for enrollment in enrollments:
-        student = enrollment.user
-        course = enrollment.course
-        
-        required_types = ["ID_CARD", "SOCIAL_SECURITY", "MEDICAL_CONCEPT"] # Default
-        course_name = course.name
-        
-        if course.required_documents:
-            try:
-                required_types = json.loads(course.required_documents)
-            except:
-                pass 
-                        
-        # Get documents LINKED to this enrollment
-        docs = db.query(models.Document).filter(
-            models.Document.user_id == student.id,
-            models.Document.enrollment_id == enrollment.id
-        ).all()
-        
-        doc_map = {}
-        
-        for dtype in required_types:
-            found = next((d for d in docs if d.type == dtype), None)
-            doc_map[dtype] = schemas.DocumentResponse.from_orm(found) if found else None
-            
-        matrix.append(schemas.DocumentMatrixItem(
-            user_id=student.id,
-            enrollment_id=enrollment.id,
-            enrollment_status=enrollment.status.value if enrollment.status else "ENROLLED",
-            enrollment_date=enrollment.created_at,
-            full_name=student.full_name,
-            document_id=student.document_id,
-            course_name=course_name,
-            required_types=required_types,
-            documents=doc_map
-        ))
-        
+
+    # Student enrollments with the documents linked to each one.
+    # Without `limit` the whole grid is returned (still in two queries).
+    try:
+        matrix, total = compliance_matrix.build_compliance_matrix(
+            db,
+            course_id=course_id,
+            status=status,
+            missing_type=missing_type,
+            sort=sort,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["X-Total-Count"] = str(total)
     return matrix
 
 
@@ -196,25 +177,19 @@ async def upload_document_on_behalf(
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
         
-    # Validate file type
-    if file.content_type not in ["application/pdf", "image/jpeg", "image/png"]:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, JPEG, PNG allowed.")
-
     # Save file
-    file_extension = os.path.splitext(file.filename)[1]
     safe_type = "".join([c for c in type if c.isalnum() or c in ('-', '_')])
-    file_name = f"{target_user.id}_{safe_type}_onbehalf_{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    stored = await _store_upload(file, f"{target_user.id}_{safe_type}_onbehalf_{uuid.uuid4()}")
 
     # Create DB record
     new_doc = models.Document(
         user_id=target_user.id,
         enrollment_id=enrollment_id, # Linked to specific enrollment
         type=type,
-        file_url=file_path,
+        file_url=stored.path,
+        file_sha256=stored.sha256,
+        file_size=stored.size,
+        file_content_type=stored.content_type,
         expiration_date=expiration_date,
         status=models.DocumentStatus.PENDING # Set to PENDING to allow manual verification workflow
     )
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from pydantic import BaseModel
 from uuid import UUID
@@ -53,7 +55,6 @@ def create_alert(alert: AlertCreate, db: Session = Depends(database.get_db), cur
     # Log Action
     from utils.audit import log_action
     log_action(
-        db, 
         user_id=current_user.id, 
         action=models.AuditAction.CREATE, 
         resource_type=models.AuditResourceType.ALERT, 
@@ -64,10 +65,12 @@ def create_alert(alert: AlertCreate, db: Session = Depends(database.get_db), cur
     return new_alert
 
 @router.get("/alerts", response_model=List[AlertResponse])
-def get_alerts(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def get_alerts(db: AsyncSession = Depends(database.get_async_db), current_user: models.User = Depends(auth.get_current_user_async)):
     # In a real scenario, maybe filter by location or role. For now, list all active alerts.
-    return db.query(models.EmergencyAlert).filter(models.EmergencyAlert.status == models.EmergencyStatus.OPEN).all()
+    result = await db.execute(select(models.EmergencyAlert).where(models.EmergencyAlert.status == models.EmergencyStatus.OPEN))
+    return result.scalars().all()
 
 @router.get("/rescue-inventory", response_model=List[EquipmentResponse])
-def get_rescue_inventory(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return db.query(models.Equipment).filter(models.Equipment.is_rescue == True).all()
+async def get_rescue_inventory(db: AsyncSession = Depends(database.get_async_db), current_user: models.User = Depends(auth.get_current_user_async)):
+    result = await db.execute(select(models.Equipment).where(models.Equipment.is_rescue == True))
+    return result.scalars().all()
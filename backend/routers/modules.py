@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-import models, schemas
+import models, schemas, auth
+from utils import catalog_cache, player_cache, quiz_engine
 from pydantic import BaseModel
 from typing import List, Optional
 import uuid
@@ -19,7 +20,7 @@ def get_course_modules(course_id: str, db: Session = Depends(get_db)):
 @router.post("", response_model=schemas.ModuleResponse)
 def create_module(module: schemas.ModuleCreate, db: Session = Depends(get_db)):
     # Check if course exists
-    course = db.query(models.Course).filter(models.Course.id == module.course_id).first()
+    course = db.query(models.Course).filter(models.Course.id == module.course_id, models.Course.deleted_at.is_(None)).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
         
@@ -33,6 +34,8 @@ def create_module(module: schemas.ModuleCreate, db: Session = Depends(get_db)):
     db.add(db_module)
     db.commit()
     db.refresh(db_module)
+    catalog_cache.invalidate()
+    player_cache.invalidate(db_module.course_id)
     return db_module
 
 @router.put("/{module_id}", response_model=schemas.ModuleResponse)
@@ -47,9 +50,16 @@ def update_module(module_id: str, module_update: schemas.ModuleUpdate, db: Sessi
         db_module.description = module_update.description
     if module_update.order_index is not None:
         db_module.order_index = module_update.order_index
+    if module_update.has_quiz is not None:
+        db_module.has_quiz = module_update.has_quiz
+    if module_update.passing_score is not None:
+        db_module.passing_score = module_update.passing_score
         
     db.commit()
     db.refresh(db_module)
+    catalog_cache.invalidate()
+    player_cache.invalidate(db_module.course_id)
+    quiz_engine.invalidate(db_module.id)
     return db_module
 
 @router.delete("/{module_id}")
@@ -58,6 +68,72 @@ def delete_module(module_id: str, db: Session = Depends(get_db)):
     if not db_module:
         raise HTTPException(status_code=404, detail="Module not found")
         
+    db.query(models.QuizSession).filter(models.QuizSession.module_id == db_module.id).delete(synchronize_session=False)
     db.delete(db_module)
     db.commit()
+    catalog_cache.invalidate()
+    player_cache.invalidate(db_module.course_id)
+    quiz_engine.invalidate(db_module.id)
     return {"message": "Module deleted successfully"}
+
+# --- Quiz questions (every change drops the cached question bank of the module) ---
+
+def _require_editor(current_user: models.User):
+    if current_user.role not in [models.UserRole.TRAINER, models.UserRole.ADMIN]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+def _validate_question(question: schemas.QuestionCreate):
+    option_count = quiz_engine.option_count(question.options)
+    if option_count is None:
+        raise HTTPException(status_code=400, detail="options must be a JSON list")
+    if not 0 <= question.correct_option_index < option_count:
+        raise HTTPException(status_code=400, detail="correct_option_index is out of range")
+
+@router.get("/{module_id}/questions", response_model=List[schemas.QuestionAdminResponse])
+def get_module_questions(module_id: uuid.UUID, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    _require_editor(current_user)
+    return db.query(models.Question).filter(models.Question.module_id == module_id).order_by(models.Question.id).all()
+
+@router.post("/{module_id}/questions", response_model=schemas.QuestionAdminResponse)
+def create_question(module_id: uuid.UUID, question: schemas.QuestionCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    _require_editor(current_user)
+    if not db.query(models.Module.id).filter(models.Module.id == module_id).first():
+        raise HTTPException(status_code=404, detail="Module not found")
+    _validate_question(question)
+
+    db_question = models.Question(module_id=module_id, **question.dict())
+    db.add(db_question)
+    db.commit()
+    db.refresh(db_question)
+    quiz_engine.invalidate(module_id)
+    return db_question
+
+@router.put("/questions/{question_id}", response_model=schemas.QuestionAdminResponse)
+def update_question(question_id: uuid.UUID, question: schemas.QuestionCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    _require_editor(current_user)
+    db_question = db.query(models.Question).filter(models.Question.id == question_id).first()
+    if not db_question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    _validate_question(question)
+
+    db_question.text = question.text
+    db_question.options = question.options
+    db_question.correct_option_index = question.correct_option_index
+    db.commit()
+    db.refresh(db_question)
+    quiz_engine.invalidate(db_question.module_id)
+    return db_question
+
+@router.delete("/questions/{question_id}")
+def delete_question(question_id: uuid.UUID, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    _require_editor(current_user)
+    db_question = db.query(models.Question).filter(models.Question.id == question_id).first()
+    if not db_question:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    module_id = db_question.module_id
+    db.delete(db_question)
+    db.commit()
+    # Open attempts that drew it grade it as wrong (utils/quiz_engine.grade)
+    quiz_engine.invalidate(module_id)
+    return {"message": "Question deleted successfully"}
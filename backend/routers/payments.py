@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 import models, schemas, database, auth
+from utils import pdf_renderer
 import hashlib
 import os
 
@@ -69,24 +70,24 @@ async def wompi_webhook(request: Request, db: Session = Depends(database.get_db)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
+    invoice_job_id = None
+
     # Update status
     if status == "APPROVED":
-        payment.status = models.PaymentStatus.APPROVED
-        
-        # Generate Invoice
-        try:
-            # Fetch user and course info (Assuming course info is available or generic)
+        # Wompi may deliver the same event more than once: render the invoice only on the transition
+        if payment.status != models.PaymentStatus.APPROVED:
             user = db.query(models.User).filter(models.User.id == payment.user_id).first()
             # For MVP, we don't have course_id in Payment, so we'll use a placeholder or try to find it
             # In a real app, Payment should have course_id or order_id
-            course_name = "Curso de Alturas (Referencia)" 
-            
-            from utils.invoice_generator import generate_invoice_pdf
-            invoice_path = generate_invoice_pdf(payment, user, course_name)
-            payment.invoice_url = invoice_path
-            print(f"Invoice generated: {invoice_path}")
-        except Exception as e:
-            print(f"Error generating invoice: {e}")
+            course_name = "Curso de Alturas (Referencia)"
+
+            # Rendered by the background PDF service, invoice_url is set when done
+            invoice_job_id = pdf_renderer.enqueue(
+                db, models.RenderKind.INVOICE, payment.id,
+                pdf_renderer.invoice_payload(payment, user, course_name),
+                owner_id=payment.user_id
+            ).id
+        payment.status = models.PaymentStatus.APPROVED
 
     elif status == "DECLINED" or status == "ERROR":
         payment.status = models.PaymentStatus.REJECTED
@@ -94,4 +95,7 @@ async def wompi_webhook(request: Request, db: Session = Depends(database.get_db)
     payment.transaction_id = transaction.get("id")
     db.commit()
 
+    if invoice_job_id is not None:
+        pdf_renderer.wake()
+        return {"status": "received", "invoice_job_id": str(invoice_job_id)}
     return {"status": "received"}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List
 from uuid import UUID
 from datetime import datetime
@@ -87,7 +88,12 @@ def book_session(
         status=models.BookingStatus.CONFIRMED
     )
     db.add(booking)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Double submit raced past the check above (uq_practice_bookings_confirmed)
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Already booked for this session")
     db.refresh(booking)
     return booking
 
@@ -131,7 +137,6 @@ def check_in_student(
     # Log Action
     from utils.audit import log_action
     log_action(
-        db, 
         user_id=current_user.id, 
         action=models.AuditAction.UPDATE, 
         resource_type=models.AuditResourceType.CERTIFICATE, # Using CERTIFICATE as proxy for practice/training
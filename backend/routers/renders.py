@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from uuid import UUID
+import os
+import models, schemas, database, auth
+from utils import pdf_renderer
+
+router = APIRouter(
+    prefix="/renders",
+    tags=["renders"]
+)
+
+def _render_job_response(job: models.RenderJob) -> schemas.RenderJobResponse:
+    return schemas.RenderJobResponse(
+        id=job.id,
+        kind=job.kind.value,
+        resource_id=job.resource_id,
+        status=job.status.value,
+        url=pdf_renderer.download_url(job),
+        error=job.error if job.status == models.RenderJobStatus.FAILED else None,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
+
+def _check_access(job: models.RenderJob, current_user: models.User):
+    if current_user.role == models.UserRole.ADMIN or job.owner_id == current_user.id:
+        return
+    # Trainers issue certificates for their students
+    if job.kind == models.RenderKind.CERTIFICATE and current_user.role == models.UserRole.TRAINER:
+        return
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+@router.get("", response_model=schemas.RenderJobResponse)
+def get_latest_render_for_resource(
+    resource_id: UUID,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    job = db.query(models.RenderJob).filter(
+        models.RenderJob.resource_id == resource_id
+    ).order_by(models.RenderJob.created_at.desc()).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    _check_access(job, current_user)
+    return _render_job_response(job)
+
+@router.get("/{job_id}", response_model=schemas.RenderJobResponse)
+def get_render_job(
+    job_id: UUID,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    job = db.query(models.RenderJob).filter(models.RenderJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    _check_access(job, current_user)
+    return _render_job_response(job)
+
+@router.get("/{job_id}/file")
+def download_render(
+    job_id: UUID,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    job = db.query(models.RenderJob).filter(models.RenderJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    _check_access(job, current_user)
+    if job.status != models.RenderJobStatus.COMPLETED or not job.output_path or not os.path.exists(job.output_path):
+        raise HTTPException(status_code=409, detail=f"Render job is {job.status.value}")
+    return FileResponse(job.output_path, media_type="application/pdf", filename=os.path.basename(job.output_path))
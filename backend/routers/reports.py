@@ -8,13 +8,16 @@ import csv
 import io
 from datetime import datetime
 
+# Full-table regulatory reports may run longer than the default statement timeout
+REPORT_STATEMENT_TIMEOUT_MS = 120000
+
 router = APIRouter(
     prefix="/reports",
     tags=["reports"]
 )
 
 @router.get("/mintrabajo")
-def generate_mintrabajo_report(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def generate_mintrabajo_report(db: Session = Depends(database.statement_timeout(REPORT_STATEMENT_TIMEOUT_MS)), current_user: models.User = Depends(auth.get_current_user)):
     # Verify Admin role
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -54,7 +57,7 @@ def generate_mintrabajo_report(db: Session = Depends(database.get_db), current_u
     return response
 
 @router.get("/arl")
-def generate_arl_report(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def generate_arl_report(db: Session = Depends(database.statement_timeout(REPORT_STATEMENT_TIMEOUT_MS)), current_user: models.User = Depends(auth.get_current_user)):
     # Verify Admin role
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
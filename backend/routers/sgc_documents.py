@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import shutil
 import os
 import uuid
 from datetime import datetime
 import models, database, auth
+from utils import upload_store
 
 router = APIRouter(
     prefix="/sgc",
@@ -30,13 +30,12 @@ async def upload_sgc_document(
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # Save file
-    file_extension = os.path.splitext(file.filename)[1]
-    file_name = f"{code}_{version}_{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save file (same pipeline as documents, with office formats allowed)
+    safe_code = "".join([c for c in f"{code}_{version}" if c.isalnum() or c in ('-', '_', '.')])
+    try:
+        stored = await upload_store.store(file, UPLOAD_DIR, f"{safe_code}_{uuid.uuid4()}", allowed=upload_store.SGC_TYPES)
+    except upload_store.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
     # Create DB record
     new_doc = models.SGCDocument(
@@ -44,7 +43,10 @@ async def upload_sgc_document(
         code=code,
         version=version,
         type=type,
-        url=file_path,
+        url=stored.path,
+        file_sha256=stored.sha256,
+        file_size=stored.size,
+        file_content_type=stored.content_type,
         is_active=True
     )
     
@@ -55,7 +57,6 @@ async def upload_sgc_document(
     # Log Action
     from utils.audit import log_action
     log_action(
-        db, 
         user_id=current_user.id, 
         action=models.AuditAction.CREATE, 
         resource_type=models.AuditResourceType.SYSTEM, 
@@ -91,7 +92,6 @@ def delete_sgc_document(
     # Log Action
     from utils.audit import log_action
     log_action(
-        db, 
         user_id=current_user.id, 
         action=models.AuditAction.DELETE, 
         resource_type=models.AuditResourceType.SYSTEM, 
@@ -4,7 +4,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 from uuid import UUID
 import models, database, auth
-from utils.permit_generator import generate_permit_pdf
+from utils import pdf_renderer
 from datetime import datetime
 
 router = APIRouter(
@@ -25,9 +25,10 @@ class WorkPermitResponse(BaseModel):
     status: models.WorkPermitStatus
     pdf_url: Optional[str]
     created_at: datetime
+    render_job_id: Optional[UUID] = None # Poll /renders/{id} until the PDF is ready
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 @router.post("/permit", response_model=WorkPermitResponse)
 def create_permit(permit: WorkPermitCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
@@ -39,18 +40,22 @@ def create_permit(permit: WorkPermitCreate, db: Session = Depends(database.get_d
         precautions=permit.precautions
     )
     db.add(new_permit)
+    db.flush()
+
+    # PDF is rendered by the background service, pdf_url is set when done
+    job = pdf_renderer.enqueue(
+        db, models.RenderKind.PERMIT, new_permit.id,
+        pdf_renderer.permit_payload(new_permit, current_user),
+        owner_id=current_user.id
+    )
+    job_id = job.id
     db.commit()
     db.refresh(new_permit)
+    pdf_renderer.wake()
 
-    # Generate PDF
-    try:
-        pdf_path = generate_permit_pdf(new_permit, current_user)
-        new_permit.pdf_url = pdf_path
-        db.commit()
-    except Exception as e:
-        print(f"Error generating PDF: {e}")
-
-    return new_permit
+    response = WorkPermitResponse.from_orm(new_permit)
+    response.render_job_id = job_id
+    return response
 
 @router.get("/permits", response_model=List[WorkPermitResponse])
 def get_permits(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
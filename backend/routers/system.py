@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from uuid import UUID
+import models, schemas, auth, database
+from utils import auth_cache, progress_buffer, signature_store, pdf_renderer, certificate_validation, expiry_digest, audit, audit_partitions, purge, quiz_engine, player_cache, upload_store
+
+router = APIRouter(
+    prefix="/system",
+    tags=["system"]
+)
+
+@router.get("/metrics")
+def get_metrics(current_user: models.User = Depends(auth.get_current_user)):
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return {
+        "auth_cache": auth_cache.stats(),
+        "progress_buffer": progress_buffer.stats(),
+        "signature_store": signature_store.stats(),
+        "pdf_renderer": pdf_renderer.stats(),
+        "certificate_validation": certificate_validation.stats(),
+        "expiry_digest": expiry_digest.stats(),
+        "audit": audit.stats(),
+        "audit_partitions": audit_partitions.stats(),
+        "purge": purge.stats(),
+        "quiz_engine": quiz_engine.stats(),
+        "player_cache": player_cache.stats(),
+        "upload_store": upload_store.stats(),
+        "db_pool": database.pool_stats()
+    }
+
+@router.get("/db-pool")
+def get_db_pool(current_user: models.User = Depends(auth.get_current_user)):
+    # Live pool occupancy and checkout wait histograms of both engines
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return database.pool_stats()
+
+@router.get("/purges", response_model=List[schemas.PurgeJobResponse])
+def get_purges(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    # Latest user/course deletions and how far their background purge got
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    jobs = db.query(models.PurgeJob).order_by(models.PurgeJob.created_at.desc()).limit(50).all()
+    return [purge.progress(job) for job in jobs]
+
+@router.get("/purges/{job_id}", response_model=schemas.PurgeJobResponse)
+def get_purge(job_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    job = db.query(models.PurgeJob).filter(models.PurgeJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return purge.progress(job)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from uuid import UUID
 from datetime import datetime
 from models import UserRole
@@ -64,6 +64,9 @@ class DocumentResponse(DocumentBase):
     id: UUID
     user_id: UUID
     file_url: str
+    file_sha256: Optional[str] = None
+    file_size: Optional[int] = None
+    file_content_type: Optional[str] = None
     status: str
     rejection_reason: Optional[str] = None
     created_at: datetime
@@ -85,6 +88,8 @@ class ModuleUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     order_index: Optional[int] = None
+    has_quiz: Optional[bool] = None
+    passing_score: Optional[int] = None
 
 class QuestionBase(BaseModel):
     text: str
@@ -103,8 +108,17 @@ class QuestionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class QuestionAdminResponse(QuestionBase):
+    # Question editor view (trainers/admins), with the answer
+    id: UUID
+    module_id: UUID
+
+    class Config:
+        from_attributes = True
+
 class QuizSubmission(BaseModel):
-    answers: List[int] # List of selected indices
+    answers: List[int] # Selected option per question, in the order served
+    session_id: Optional[UUID] = None # X-Quiz-Session of the GET; defaults to the open attempt
 
 class QuizResult(BaseModel):
     score: int
@@ -150,7 +164,7 @@ class CourseBase(BaseModel):
     trainer_id: Optional[UUID] = None
 
 class CourseCreate(CourseBase):
-    pass
+    template_id: Optional[UUID] = None # Curriculum to copy; default: matched by course name (utils/curriculum)
 
 class CourseResponse(CourseBase):
     id: UUID
@@ -174,6 +188,74 @@ class EnrollmentResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CourseCloneInstance(BaseModel):
+    # Fields that differ from the source course; the rest is copied
+    name: Optional[str] = None
+    start_date: Optional[datetime] = None
+    location: Optional[str] = None
+    capacity: Optional[int] = None
+    price: Optional[int] = None
+    trainer_id: Optional[UUID] = None
+
+class CourseCloneRequest(BaseModel):
+    instances: List[CourseCloneInstance]
+
+class TemplateQuestionBase(BaseModel):
+    text: str
+    options: str # JSON string
+    correct_option_index: int
+
+class TemplateModuleBase(BaseModel):
+    title: str
+    description: Optional[str] = None
+    content_url: Optional[str] = None
+    min_duration_seconds: int = 0
+    order_index: int = 0
+    has_quiz: bool = False
+    passing_score: int = 80
+
+class TemplateModuleCreate(TemplateModuleBase):
+    questions: List[TemplateQuestionBase] = []
+
+class TemplateModuleResponse(TemplateModuleBase):
+    id: UUID
+    question_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+class CurriculumTemplateBase(BaseModel):
+    name: str
+    description: Optional[str] = None
+    match_keywords: Optional[str] = None # Comma separated words of course names
+    priority: int = 100
+    is_fallback: bool = False
+
+class CurriculumTemplateCreate(CurriculumTemplateBase):
+    modules: List[TemplateModuleCreate] = []
+
+class CurriculumTemplateResponse(CurriculumTemplateBase):
+    id: UUID
+    created_at: datetime
+    modules: List[TemplateModuleResponse] = []
+
+    class Config:
+        from_attributes = True
+
+class PlayerModuleState(BaseModel):
+    module_id: UUID
+    status: Optional[str] = None # None: not started
+    seconds_spent: int = 0
+    last_updated: Optional[datetime] = None
+    best_score: Optional[int] = None # Best quiz attempt, None when never attempted
+    quiz_passed: bool = False
+    quiz_attempts: int = 0
+
+class CoursePlayerResponse(CourseResponse):
+    # modules are ordered by order_index; progress has one entry per module, same order
+    enrollment: EnrollmentResponse
+    progress: List[PlayerModuleState] = []
+
 class EnrollmentCreateAdmin(BaseModel):
     user_id: UUID
 
@@ -242,6 +324,41 @@ class CompanyResponse(CompanyBase):
     class Config:
         from_attributes = True
 
+class ImportJobResponse(BaseModel):
+    id: UUID
+    status: str
+    filename: Optional[str] = None
+    processed_rows: int = 0
+    created_count: int = 0
+    error_count: int = 0
+    errors: List[str] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class RenderJobResponse(BaseModel):
+    id: UUID
+    kind: str
+    resource_id: UUID
+    status: str
+    url: Optional[str] = None # Download link once COMPLETED
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class PurgeJobResponse(BaseModel):
+    id: UUID
+    entity: str
+    entity_id: UUID
+    label: Optional[str] = None
+    status: str
+    step: int
+    total_steps: int
+    current_step: Optional[str] = None # Table being cleaned while RUNNING
+    deleted_rows: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
 class SGCDocumentBase(BaseModel):
     title: str
     code: str
@@ -254,6 +371,9 @@ class SGCDocumentCreate(SGCDocumentBase):
 
 class SGCDocumentResponse(SGCDocumentBase):
     id: UUID
+    file_sha256: Optional[str] = None
+    file_size: Optional[int] = None
+    file_content_type: Optional[str] = None
     is_active: bool
     created_at: datetime
 
@@ -312,10 +432,63 @@ class CertificationResponse(CertificationBase):
     course_name: Optional[str] = None
     student_name: Optional[str] = None
     student_document_id: Optional[str] = None
+    render_job_id: Optional[UUID] = None # Set on issue while the PDF is rendered
+    signed_payload: Optional[str] = None # Offline verifiable token (QR content)
 
     class Config:
         from_attributes = True
 
+class CertificateValidationBatch(BaseModel):
+    codes: List[str] = []
+    document_ids: List[str] = []
+
+class CertificateValidationBatchResponse(BaseModel):
+    codes: Dict[str, Optional[CertificationResponse]] # null = not found
+    documents: Dict[str, List[CertificationResponse]]
+
+class CertificateTokenVerification(BaseModel):
+    valid: bool
+    expired: Optional[bool] = None
+    detail: Optional[str] = None
+    kid: Optional[str] = None
+    certificate_code: Optional[str] = None
+    student_document_id: Optional[str] = None
+    course_name: Optional[str] = None
+    issue_date: Optional[datetime] = None
+    expiration_date: Optional[datetime] = None
+
+class CertificateRevoke(BaseModel):
+    reason: Optional[str] = None
+
+class CohortCertificationCreate(BaseModel):
+    course_id: UUID
+    issue_date: Optional[datetime] = None # Defaults to now
+    expiration_date: datetime
+    only_completed: bool = True # Only enrollments with status COMPLETED
+    user_ids: Optional[List[UUID]] = None # Restrict to these students
+
+class CohortCertificateItem(BaseModel):
+    certification_id: UUID
+    user_id: UUID
+    student_name: str
+    certificate_code: str
+
+class CohortIssuanceResponse(BaseModel):
+    batch_id: Optional[UUID] = None # Progress handle; None when nothing was issued
+    course_id: UUID
+    issued: int
+    skipped_existing: int
+    certificates: List[CohortCertificateItem] = []
+
+class CohortIssuanceProgress(BaseModel):
+    batch_id: UUID
+    total: int
+    pending: int
+    running: int
+    completed: int
+    failed: int
+    done: bool
+
 from typing import Dict
 
 class DocumentMatrixItem(BaseModel):
@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal, engine, Base
+from backend.database import SessionLocal, engine
 from backend import models, auth
+from backend.utils import schema_migrations
 import uuid
 
 def seed_db():
-    Base.metadata.create_all(bind=engine)
+    schema_migrations.upgrade(engine)
     db = SessionLocal()
 
     try:
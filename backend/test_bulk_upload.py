@@ -104,7 +104,22 @@ def test_bulk_upload():
     print(f"Upload Status: {response.status_code}")
     print(f"Upload Response: {response.json()}")
 
-    if response.status_code == 200:
+    if response.status_code != 202:
+        print("TEST FAILED")
+        return
+
+    # 8. Poll the import job
+    job_id = response.json()["id"]
+    job = response.json()
+    for _ in range(30):
+        if job["status"] in ("COMPLETED", "FAILED"):
+            break
+        time.sleep(1)
+        job = requests.get(f"{BASE_URL}/corporate/employees/upload/{job_id}", headers=company_headers).json()
+
+    print(f"Job: {job['status']} | created: {job['created_count']} | errors: {job['errors']}")
+
+    if job["status"] == "COMPLETED":
         print("TEST PASSED")
     else:
         print("TEST FAILED")
@@ -0,0 +1,94 @@
+import requests
+from datetime import datetime, timedelta
+import time
+
+BASE_URL = "http://localhost:8000"
+
+def run_test():
+    print("=== STARTING CERTIFICATE REVOCATION TEST ===")
+
+    # 1. Login Admin
+    login_data = {"username": "admin_debug", "password": "admin123"}
+    res = requests.post(f"{BASE_URL}/auth/login", data=login_data)
+    token = res.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # 2. Company, Student and Course
+    print("\n[2] Creating Company, Student and Course...")
+    student_doc = f"st_revoke_{int(time.time())}"
+    student = {
+        "full_name": "Student Revocation",
+        "document_id": student_doc,
+        "email": f"{student_doc}@test.com",
+        "role": "STUDENT",
+        "password": "password123"
+    }
+    res = requests.post(f"{BASE_URL}/auth/register", json=student)
+    student_id = res.json()["id"]
+    course_data = {
+        "name": f"Course Revocation {student_doc}",
+        "required_hours": 10,
+        "price": 0,
+        "type": "PRACTICE"
+    }
+    res = requests.post(f"{BASE_URL}/courses/", json=course_data, headers=headers)
+    course_id = res.json()["id"]
+
+    # The student works for a company whose account reads the expiration matrix
+    res = requests.post(f"{BASE_URL}/corporate/companies", json={
+        "name": f"Company {student_doc}", "nit": student_doc, "contact_email": f"co_{student_doc}@test.com"
+    }, headers=headers)
+    company_id = res.json()["id"]
+    company_user = {
+        "full_name": "Company Revocation",
+        "document_id": f"co_{student_doc}",
+        "email": f"co_{student_doc}@test.com",
+        "role": "COMPANY",
+        "password": "password123"
+    }
+    res = requests.post(f"{BASE_URL}/auth/register", json=company_user)
+    for user_id in (student_id, res.json()["id"]):
+        requests.post(f"{BASE_URL}/corporate/companies/{company_id}/users/{user_id}", headers=headers)
+    res = requests.post(f"{BASE_URL}/auth/login", data={"username": company_user["document_id"], "password": "password123"})
+    company_headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    # 3. Issue and Revoke
+    print("\n[3] Issuing and Revoking Certificate...")
+    res = requests.post(f"{BASE_URL}/certificates/issue", json={
+        "user_id": student_id,
+        "course_id": course_id,
+        "issue_date": datetime.utcnow().isoformat(),
+        "expiration_date": (datetime.utcnow() + timedelta(days=365)).isoformat(),
+        "certificate_code": "AUTO" # Generated by the server
+    }, headers=headers)
+    cert = res.json()
+    code = cert["certificate_code"]
+    res = requests.get(f"{BASE_URL}/certificates/validate/{code}")
+    print(f"Validate before revoke: {res.status_code}")
+    res = requests.get(f"{BASE_URL}/corporate/matrix", headers=company_headers)
+    print(f"Matrix rows before revoke: {len([r for r in res.json() if r['document_id'] == student_doc])}")
+    res = requests.post(f"{BASE_URL}/certificates/{cert['id']}/revoke", json={"reason": "Test"}, headers=headers)
+    print(f"Revoke: {res.status_code}")
+
+    # 4. Update the Student (refreshes the validation read model)
+    print("\n[4] Updating Student...")
+    res = requests.put(f"{BASE_URL}/auth/users/{student_id}", json={**student, "full_name": "Student Revocation UPDATE", "password": ""}, headers=headers)
+    print(f"Update: {res.status_code}")
+
+    # 5. Validate (Should Fail)
+    res = requests.get(f"{BASE_URL}/certificates/validate/{code}")
+    if res.status_code == 404:
+        print("SUCCESS: Revoked certificate is still rejected after the user update.")
+    else:
+        print(f"FAILED: Revoked certificate validated again ({res.status_code}): {res.text}")
+
+    # 6. Company Matrix (Should Not List It)
+    res = requests.get(f"{BASE_URL}/corporate/matrix", headers=company_headers)
+    rows = [r for r in res.json() if r["document_id"] == student_doc]
+    if res.status_code == 200 and not rows:
+        print("SUCCESS: Revoked certificate is gone from the company matrix.")
+    else:
+        print(f"FAILED: Company matrix still lists the revoked certificate ({res.status_code}): {rows}")
+
+if __name__ == "__main__":
+    run_test()
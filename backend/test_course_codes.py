@@ -0,0 +1,43 @@
+import requests
+import time
+
+BASE_URL = "http://localhost:8000"
+
+def run_test():
+    print("=== STARTING COURSE CODES TEST ===")
+
+    # 1. Login Admin
+    login_data = {"username": "admin_debug", "password": "admin123"}
+    res = requests.post(f"{BASE_URL}/auth/login", data=login_data)
+    token = res.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # 2. Create Course with a start date (gets an automatic code)
+    print("\n[2] Creating Source Course...")
+    course_data = {
+        "name": f"Codes Course {int(time.time())}",
+        "required_hours": 10,
+        "price": 0,
+        "type": "PRACTICE",
+        "start_date": "2030-01-15T08:00:00"
+    }
+    res = requests.post(f"{BASE_URL}/courses/", json=course_data, headers=headers)
+    source = res.json()
+    print(f"Source Code: {source['code']}")
+
+    # 3. Clone with No Overrides (same name and start date)
+    print("\n[3] Cloning Twice with No Overrides...")
+    res = requests.post(f"{BASE_URL}/courses/{source['id']}/clone", json={"instances": [{}, {}]}, headers=headers)
+    if res.status_code != 200:
+        print(f"FAILED to clone course: {res.status_code} {res.text}")
+        return
+    codes = [source["code"]] + [c["code"] for c in res.json()]
+    print(f"Codes: {codes}")
+
+    if len(set(codes)) == len(codes):
+        print("SUCCESS: Cloned courses got unique codes.")
+    else:
+        print("FAILED: Duplicate course codes.")
+
+if __name__ == "__main__":
+    run_test()
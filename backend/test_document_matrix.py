@@ -0,0 +1,57 @@
+import requests
+import time
+
+BASE_URL = "http://localhost:8000"
+
+def test_document_matrix():
+    # 1. Login as Admin
+    print("Logging in as Admin...")
+    login_data = {"username": "123456789", "password": "admin123"}
+    response = requests.post(f"{BASE_URL}/auth/login", data=login_data)
+    if response.status_code != 200:
+        print(f"Admin login failed: {response.text}")
+        return
+    token = response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # 2. Full matrix (no limit) - backwards compatible response
+    print("Fetching full matrix...")
+    start = time.time()
+    response = requests.get(f"{BASE_URL}/documents/matrix", headers=headers)
+    elapsed = time.time() - start
+    if response.status_code != 200:
+        print(f"TEST FAILED: {response.text}")
+        return
+    total = int(response.headers.get("X-Total-Count", -1))
+    print(f"Rows: {len(response.json())} | Total: {total} | {elapsed:.2f}s")
+    if total != len(response.json()):
+        print("TEST FAILED: X-Total-Count does not match full matrix size")
+        return
+
+    # 3. Paginated + sorted
+    response = requests.get(f"{BASE_URL}/documents/matrix?skip=0&limit=10&sort=full_name", headers=headers)
+    page = response.json()
+    names = [item["full_name"] for item in page]
+    if len(page) > 10 or names != sorted(names):
+        print("TEST FAILED: Pagination/sorting not applied")
+        return
+    print(f"First page: {len(page)} rows")
+
+    # 4. Missing-type filter: every row must lack the requested document
+    response = requests.get(f"{BASE_URL}/documents/matrix?missing_type=MEDICAL_CONCEPT&limit=50", headers=headers)
+    for item in response.json():
+        if item["documents"].get("MEDICAL_CONCEPT"):
+            print(f"TEST FAILED: {item['full_name']} has MEDICAL_CONCEPT but was returned as missing")
+            return
+    print(f"Missing MEDICAL_CONCEPT: {response.headers.get('X-Total-Count')}")
+
+    # 5. Invalid sort field
+    response = requests.get(f"{BASE_URL}/documents/matrix?sort=password", headers=headers)
+    if response.status_code != 400:
+        print("TEST FAILED: Invalid sort should return 400")
+        return
+
+    print("TEST PASSED")
+
+if __name__ == "__main__":
+    test_document_matrix()
@@ -2,6 +2,7 @@ import requests
 import time
 import uuid
 import os
+import hashlib
 
 BASE_URL = "http://localhost:8000"
 
@@ -248,29 +249,33 @@ def test_08_sgc():
     print_step("TEST 08: SGC & Quality")
     headers = {"Authorization": f"Bearer {state['admin_token']}"}
     
-    # Upload Doc
-    with open("test_doc.txt", "w") as f: f.write("Content")
-    
-    # Open file for reading
-    f = open('test_doc.txt', 'rb')
-    files = {'file': ('test_doc.txt', f, 'text/plain')}
+    # Upload Doc (only PDF, image and Office files are accepted; the content must match the type)
+    content = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n"
+    files = {'file': ('test_doc.pdf', content, 'application/pdf')}
     data = {"title": "Test Doc", "code": f"DOC-{int(time.time())}", "version": "1.0", "type": "POLICY"}
     
-    try:
-        res = requests.post(f"{BASE_URL}/sgc/upload", headers=headers, data=data, files=files)
-        if res.status_code == 200:
-            state["doc_id"] = res.json()["id"]
-            print("SGC Document Uploaded")
+    res = requests.post(f"{BASE_URL}/sgc/upload", headers=headers, data=data, files=files)
+    if res.status_code == 200:
+        doc = res.json()
+        state["doc_id"] = doc["id"]
+        print("SGC Document Uploaded")
+        expected = (hashlib.sha256(content).hexdigest(), len(content), "application/pdf")
+        stored = (doc["file_sha256"], doc["file_size"], doc["file_content_type"])
+        if stored == expected:
+            print("SGC File Metadata OK")
         else:
-            print(f"SGC Upload Failed: {res.text}")
-    finally:
-        f.close()
-    
-    time.sleep(1) # Wait for release
-    try:
-        os.remove("test_doc.txt")
-    except:
-        pass
+            print(f"SGC File Metadata Mismatch: {stored} != {expected}")
+    else:
+        print(f"SGC Upload Failed: {res.text}")
+
+    # Plain text is not an accepted SGC type
+    files = {'file': ('test_doc.txt', b"Content", 'text/plain')}
+    data["code"] = f"DOC-TXT-{int(time.time())}"
+    res = requests.post(f"{BASE_URL}/sgc/upload", headers=headers, data=data, files=files)
+    if res.status_code == 400:
+        print("SGC Text Upload Rejected")
+    else:
+        print(f"SGC Text Upload NOT Rejected: {res.status_code} {res.text}")
 
 def test_09_simulator():
     print_step("TEST 09: Operational Simulator")
@@ -1,5 +1,6 @@
 import requests
 import time
+from datetime import datetime, timedelta
 
 BASE_URL = "http://localhost:8000"
 
@@ -50,6 +51,7 @@ def run_test():
         "email": f"{trainer_doc}@test.com",
         "role": "TRAINER",
         "phone": "555-5555",
+        "license_expiration": (datetime.utcnow() + timedelta(days=365)).isoformat(), # Required to be assigned a course
         "password": "" # Empty password
     }
     res = requests.put(f"{BASE_URL}/auth/users/{trainer_id}", json=update_payload, headers=headers)
@@ -75,16 +77,39 @@ def run_test():
     course_id = res.json()["id"]
     print(f"Course Created: {course_id} assigned to Trainer.")
 
+    # The trainer also holds an enrollment and a certificate of their own
+    requests.post(f"{BASE_URL}/courses/{course_id}/enroll-student", json={"user_id": trainer_id}, headers=headers)
+    res = requests.post(f"{BASE_URL}/certificates/issue", json={
+        "user_id": trainer_id,
+        "course_id": course_id,
+        "issue_date": datetime.utcnow().isoformat(),
+        "expiration_date": (datetime.utcnow() + timedelta(days=365)).isoformat(),
+        "certificate_code": "AUTO" # Generated by the server
+    }, headers=headers)
+    cert_code = res.json()["certificate_code"]
+
     # 5. Delete Trainer (The Ultimate Test)
     print("\n[5] Deleting Trainer (Should unassign from course)...")
     res = requests.delete(f"{BASE_URL}/auth/users/{trainer_id}", headers=headers)
     
-    if res.status_code == 200:
-        print("Trainer DELETE SUCCESSFUL.")
+    if res.status_code == 202:
+        print("Trainer DELETE ACCEPTED.")
     else:
         print(f"Trainer DELETE FAILED: {res.status_code} - {res.text}")
         return
 
+    # The records are removed by the background purge
+    job_id = res.json()["id"]
+    for _ in range(60):
+        job = requests.get(f"{BASE_URL}/system/purges/{job_id}", headers=headers).json()
+        if job["status"] in ("COMPLETED", "FAILED"):
+            break
+        time.sleep(1)
+    if job["status"] != "COMPLETED":
+        print(f"FAILED: Purge did not complete: {job}")
+        return
+    print(f"Purge COMPLETED ({job['deleted_rows']} rows).")
+
     # 6. Verify Course still exists but has NO trainer
     print("\n[6] Verifying Course State...")
     # Currently no direct GET course by ID public endpoint easily accessible without iterating?
@@ -101,6 +126,28 @@ def run_test():
     else:
         print("WARNING: Course not found (Deleted?).")
 
+    # 7. Verify the Trainer's Records are Gone
+    print("\n[7] Verifying Purged Records...")
+    if target_course and target_course["enrolled_count"] == 0:
+        print("VERIFIED: Enrollment removed.")
+    else:
+        print(f"FAILED: Enrollment still counted: {target_course and target_course['enrolled_count']}")
+        return
+
+    res = requests.get(f"{BASE_URL}/certificates/validate/{cert_code}")
+    if res.status_code == 404:
+        print("VERIFIED: Certificate removed.")
+    else:
+        print(f"FAILED: Certificate still validates: {res.status_code}")
+        return
+
+    res = requests.get(f"{BASE_URL}/certificates/revocations")
+    if cert_code in res.json()["revoked"]:
+        print("VERIFIED: Certificate code published as revoked.")
+    else:
+        print("FAILED: Certificate code missing from the revocation list.")
+        return
+
     print("\n=== TEST COMPLETED SUCCESSFULLY ===")
 
 if __name__ == "__main__":
@@ -71,17 +71,22 @@ def test_payments():
     print(f"Webhook Response: {response.json()}")
 
     # 4. Verify Payment Status and Invoice in DB
+    # The invoice is rendered in the background: poll until invoice_url is set
     print("Verifying Payment Status in DB...")
-    with get_db_connection() as conn:
-        result = conn.execute(text("SELECT status, invoice_url FROM payments WHERE id = :id"), {"id": reference}).fetchone()
-        if result and result[0] == "APPROVED":
-            print("TEST PASSED: Payment status is APPROVED.")
-            if result[1]:
-                print(f"TEST PASSED: Invoice URL found: {result[1]}")
-            else:
-                print("TEST FAILED: Invoice URL not found.")
+    for _ in range(30):
+        with get_db_connection() as conn:
+            result = conn.execute(text("SELECT status, invoice_url FROM payments WHERE id = :id"), {"id": reference}).fetchone()
+        if result and result[1]:
+            break
+        time.sleep(0.5)
+    if result and result[0] == "APPROVED":
+        print("TEST PASSED: Payment status is APPROVED.")
+        if result[1]:
+            print(f"TEST PASSED: Invoice URL found: {result[1]}")
         else:
-            print(f"TEST FAILED: Payment status is {result[0] if result else 'None'}")
+            print("TEST FAILED: Invoice URL not found.")
+    else:
+        print(f"TEST FAILED: Payment status is {result[0] if result else 'None'}")
 
 if __name__ == "__main__":
     test_payments()
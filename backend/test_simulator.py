@@ -37,10 +37,18 @@ def test_simulator():
         permit = response.json()
         print(permit)
         
-        if permit["pdf_url"] and "permits" in permit["pdf_url"]:
+        # The PDF is rendered in the background: poll the render job
+        job = None
+        for _ in range(30):
+            job = requests.get(f"{BASE_URL}/renders/{permit['render_job_id']}", headers=headers).json()
+            if job["status"] in ("COMPLETED", "FAILED"):
+                break
+            time.sleep(0.5)
+
+        if job and job["status"] == "COMPLETED" and job["url"]:
             print("TEST PASSED: PDF URL generated.")
         else:
-            print("TEST FAILED: PDF URL missing.")
+            print(f"TEST FAILED: PDF not rendered: {job}")
     else:
         print(f"Permit Creation Failed: {response.text}")
         return
@@ -1,25 +1,173 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from collections import deque
+from typing import List, Optional
+from datetime import datetime
 from uuid import UUID
-import models
 import json
+import os
+import threading
+import time
+import uuid
+import models, database
+from utils import audit_partitions
 
-def log_action(db: Session, user_id: UUID, action: models.AuditAction, resource_type: models.AuditResourceType, resource_id: str = None, details: dict = None):
+# Batched audit log writer.
+# log_action() only appends the event to an in-memory queue; a background thread
+# writes the queue with one bulk insert every AUDIT_FLUSH_INTERVAL seconds or as
+# soon as AUDIT_BATCH_SIZE events are waiting, and once more at shutdown.
+# Actions in AUDIT_SYNC_ACTIONS (and calls with durability="sync") are written
+# before log_action returns. Writes use their own session, never the request one.
+FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1"))
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+# Past this depth callers write synchronously instead of growing the queue
+MAX_QUEUE = int(os.getenv("AUDIT_MAX_QUEUE", "50000"))
+SYNC_ACTIONS = {
+    models.AuditAction(a.strip()) for a in os.getenv("AUDIT_SYNC_ACTIONS", "DELETE").split(",") if a.strip()
+}
+
+SYNC = "sync"
+ASYNC = "async"
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock() # one writer at a time: a sync caller waits for an in-flight batch
+_queue = deque()
+_wake = threading.Event()
+_stats = {
+    "enqueued": 0, "written": 0, "sync_writes": 0, "backpressure_writes": 0,
+    "flushes": 0, "failed_flushes": 0, "partitions_created": 0, "max_depth": 0, "last_flush_ms": 0.0
+}
+
+_flusher: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def log_action(
+    user_id: Optional[UUID],
+    action: models.AuditAction,
+    resource_type: models.AuditResourceType,
+    resource_id: str = None,
+    details: dict = None,
+    durability: Optional[str] = None
+):
     """
-    Creates an audit log entry.
+    Records an audit event. durability: "sync" (written before returning),
+    "async" (next batch) or None (sync only for AUDIT_SYNC_ACTIONS).
+    Never raises: a failed write is retried by the next flush.
     """
+    event = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": str(resource_id) if resource_id else None,
+        "details": json.dumps(details, default=str) if details else None,
+        "timestamp": datetime.utcnow()
+    }
+    if durability is None:
+        durability = SYNC if action in SYNC_ACTIONS else ASYNC
+
+    with _lock:
+        _queue.append(event)
+        depth = len(_queue)
+        _stats["enqueued"] += 1
+        _stats["max_depth"] = max(_stats["max_depth"], depth)
+        if durability == SYNC:
+            _stats["sync_writes"] += 1
+        elif depth > MAX_QUEUE:
+            _stats["backpressure_writes"] += 1
+
+    if durability == SYNC or depth > MAX_QUEUE:
+        flush()
+    elif depth >= BATCH_SIZE:
+        _wake.set()
+
+def _insert(db, rows: List[dict]) -> int:
     try:
-        details_str = json.dumps(details) if details else None
-        
-        new_log = models.AuditLog(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=str(resource_id) if resource_id else None,
-            details=details_str
-        )
-        db.add(new_log)
+        db.execute(insert(models.AuditLog), rows)
         db.commit()
-    except Exception as e:
-        print(f"Failed to create audit log: {e}")
-        # Don't raise exception to avoid breaking the main flow
+        return 0
+    except IntegrityError:
+        # No partition for the month (maintenance has not run yet): create it and retry
         db.rollback()
+        created = 0
+        for month in {audit_partitions.month_start(row["timestamp"]) for row in rows}:
+            created += audit_partitions.create_partition(db.connection(), month)
+        db.execute(insert(models.AuditLog), rows)
+        db.commit()
+        return created
+
+def flush() -> int:
+    """
+    Writes every queued event in batches of AUDIT_BATCH_SIZE (own session).
+    On a database error the batch goes back to the front of the queue.
+    """
+    written = 0
+    with _flush_lock:
+        db = None
+        started = time.perf_counter()
+        try:
+            while True:
+                with _lock:
+                    batch = [_queue.popleft() for _ in range(min(BATCH_SIZE, len(_queue)))]
+                if not batch:
+                    break
+                if db is None:
+                    db = database.SessionLocal()
+                try:
+                    created = _insert(db, batch)
+                except Exception as e:
+                    db.rollback()
+                    with _lock:
+                        _queue.extendleft(reversed(batch))
+                        _stats["failed_flushes"] += 1
+                    print(f"Audit flush failed, will retry: {e}")
+                    break
+                written += len(batch)
+                with _lock:
+                    _stats["partitions_created"] += created
+        finally:
+            if db is not None:
+                db.close()
+
+        with _lock:
+            if written:
+                _stats["flushes"] += 1
+                _stats["written"] += written
+                _stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return written
+
+def _run():
+    while not _stop.is_set():
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        flush()
+
+def start():
+    global _flusher
+    if _flusher is not None:
+        return
+    _stop.clear()
+    _flusher = threading.Thread(target=_run, name="audit-flusher", daemon=True)
+    _flusher.start()
+
+def stop():
+    global _flusher
+    _stop.set()
+    _wake.set()
+    if _flusher is not None:
+        _flusher.join(timeout=FLUSH_INTERVAL + 5)
+        _flusher = None
+    flush()
+
+def stats() -> dict:
+    with _lock:
+        oldest = _queue[0]["timestamp"] if _queue else None
+        return {
+            **_stats,
+            "queue_depth": len(_queue),
+            "oldest_pending_seconds": round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0,
+            "batch_size": BATCH_SIZE,
+            "flush_interval_seconds": FLUSH_INTERVAL,
+            "max_queue": MAX_QUEUE,
+            "sync_actions": sorted(a.value for a in SYNC_ACTIONS)
+        }
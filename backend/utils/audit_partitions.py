@@ -0,0 +1,288 @@
+from sqlalchemy import text, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection, Engine
+from typing import Iterator, List, Optional
+from datetime import datetime, date
+from uuid import UUID
+import csv
+import gzip
+import hashlib
+import os
+import re
+import threading
+import models, database
+
+# Monthly partitions of audit_logs and their cold archive.
+# Each month lives in its own partition (audit_logs_yYYYYmMM); writes only touch
+# the current one. A background thread keeps AUDIT_PARTITIONS_AHEAD months created
+# in advance and moves partitions older than AUDIT_HOT_MONTHS out of the database:
+# detach, COPY to a gzip CSV under AUDIT_ARCHIVE_DIR (export columns, newest first),
+# verify the row count, record it in audit_archives and drop the table.
+# routers/audit reads the archives back on request (include_archived=true).
+HOT_MONTHS = int(os.getenv("AUDIT_HOT_MONTHS", "12")) # 0 keeps every month in the database
+MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "2"))
+ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "archives/audit")
+MAINTENANCE_INTERVAL = int(os.getenv("AUDIT_MAINTENANCE_INTERVAL", "3600"))
+MAINTENANCE_ENABLED = os.getenv("AUDIT_MAINTENANCE_ENABLED", "true").lower() == "true"
+ADVISORY_LOCK_ID = 7345020 # one maintenance run at a time across workers
+
+# Same columns as the audit export. Fixed-width timestamps: the reader parses them with fromisoformat
+_COPY_SQL = """
+    COPY (
+        SELECT l.id, to_char(l.timestamp, 'YYYY-MM-DD"T"HH24:MI:SS.US') AS timestamp, l.user_id, u.full_name AS user_name,
+               l.action, l.resource_type, l.resource_id, l.details
+        FROM {table} l LEFT JOIN users u ON u.id = l.user_id
+        ORDER BY l.timestamp DESC, l.id DESC
+    ) TO STDOUT WITH (FORMAT csv, HEADER)
+"""
+_PARTITION_NAME = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+
+_lock = threading.Lock()
+_stats = {"runs": 0, "partitions_created": 0, "partitions_archived": 0, "rows_archived": 0, "last_run": None, "last_error": None}
+_scheduler: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def month_start(value) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"audit_logs_y{month.year:04d}m{month.month:02d}"
+
+def partition_month(name: str) -> Optional[datetime]:
+    match = _PARTITION_NAME.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def create_partition(conn: Connection, month: datetime) -> bool:
+    """
+    Creates the partition of `month` if missing. Returns True when it was created.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar() is not None:
+        return False
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return True
+
+def ensure_partitions(conn: Connection, since: Optional[datetime] = None, today: Optional[date] = None) -> List[str]:
+    """
+    Partitions from `since` (default: the current month) up to AUDIT_PARTITIONS_AHEAD
+    months ahead. Returns the names created.
+    """
+    current = month_start(today or datetime.utcnow())
+    month = month_start(since) if since and since < current else current
+    created = []
+    while month <= add_months(current, MONTHS_AHEAD):
+        if create_partition(conn, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+def list_partitions(conn: Connection) -> List[dict]:
+    """
+    Monthly tables still in the database, attached or not (oldest first).
+    """
+    rows = conn.execute(text("""
+        SELECT c.relname, c.relispartition, c.reltuples::bigint AS estimated_rows
+        FROM pg_class c
+        WHERE c.relkind = 'r' AND c.relname ~ '^audit_logs_y[0-9]{4}m[0-9]{2}$'
+        ORDER BY c.relname
+    """)).all()
+    return [
+        {
+            "partition": row.relname,
+            "range_start": partition_month(row.relname),
+            "range_end": add_months(partition_month(row.relname), 1),
+            "attached": row.relispartition,
+            "estimated_rows": max(row.estimated_rows, 0)
+        }
+        for row in rows
+    ]
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def archive_partition(engine: Engine, name: str) -> dict:
+    """
+    Moves one monthly partition to a gzip CSV and drops it. Safe to re-run after a
+    failure at any step: the table is only dropped once the file is verified and
+    cataloged (in the same transaction).
+    """
+    month = partition_month(name)
+    if month is None:
+        raise ValueError(f"Not an audit log partition: {name}")
+
+    # 1. Detach: from here on the rows are no longer visible through audit_logs
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        attached = conn.execute(text("SELECT relispartition FROM pg_class WHERE relname = :n AND relkind = 'r'"), {"n": name}).scalar()
+        if attached:
+            conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+
+    # 2. Export to a temporary file, renamed once complete
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, f"{name}.csv.gz")
+    tmp_path = path + ".tmp"
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        with gzip.open(tmp_path, "wt", encoding="utf-8", newline="") as out:
+            cursor.copy_expert(_COPY_SQL.format(table=name), out)
+        exported = cursor.rowcount
+        cursor.execute(f"SELECT count(*) FROM {name}")
+        expected = cursor.fetchone()[0]
+        raw.rollback()
+    finally:
+        raw.close()
+
+    # 3. Verify before anything is dropped
+    if exported != expected:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Archive of {name} wrote {exported} rows, table has {expected}")
+    os.replace(tmp_path, path)
+
+    # 4. Catalog and drop together
+    entry = {
+        "partition": name,
+        "range_start": month,
+        "range_end": add_months(month, 1),
+        "path": path,
+        "rows": exported,
+        "size_bytes": os.path.getsize(path),
+        "sha256": _sha256(path),
+        "archived_at": datetime.utcnow()
+    }
+    with engine.begin() as conn:
+        conn.execute(
+            pg_insert(models.AuditArchive).values(entry)
+            .on_conflict_do_update(index_elements=["partition"], set_={k: v for k, v in entry.items() if k != "partition"})
+        )
+        conn.execute(text(f"DROP TABLE {name}"))
+    return entry
+
+def expired(conn: Connection, today: Optional[date] = None) -> List[str]:
+    """
+    Partitions to archive: older than AUDIT_HOT_MONTHS, plus any detached leftover
+    of an interrupted run.
+    """
+    cutoff = add_months(month_start(today or datetime.utcnow()), -HOT_MONTHS)
+    return [
+        p["partition"] for p in list_partitions(conn)
+        if not p["attached"] or (HOT_MONTHS > 0 and p["range_end"] <= cutoff)
+    ]
+
+def maintain(engine: Optional[Engine] = None, today: Optional[date] = None) -> dict:
+    """
+    One maintenance run: create the upcoming partitions, archive the expired ones.
+    Skipped (returns None for both lists) while another worker holds the lock.
+    """
+    engine = engine or database.engine
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID}).scalar():
+            return {"created": None, "archived": None}
+        try:
+            with engine.begin() as conn:
+                created = ensure_partitions(conn, today=today)
+                candidates = expired(conn, today=today)
+            archived = [archive_partition(engine, name) for name in candidates]
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+    with _lock:
+        _stats["runs"] += 1
+        _stats["partitions_created"] += len(created)
+        _stats["partitions_archived"] += len(archived)
+        _stats["rows_archived"] += sum(a["rows"] for a in archived)
+        _stats["last_run"] = datetime.utcnow().isoformat()
+    return {"created": created, "archived": [a["partition"] for a in archived]}
+
+# --- Archive reader ---
+
+def _parse(row: dict) -> dict:
+    return {
+        "id": UUID(row["id"]),
+        "timestamp": datetime.fromisoformat(row["timestamp"]),
+        "user_id": UUID(row["user_id"]) if row["user_id"] else None,
+        "user_name": row["user_name"] or None,
+        "action": models.AuditAction(row["action"]),
+        "resource_type": models.AuditResourceType(row["resource_type"]),
+        "resource_id": row["resource_id"] or None,
+        "details": row["details"] or None
+    }
+
+def _matches(row: dict, filters: dict) -> bool:
+    for key in ("action", "resource_type", "resource_id", "user_id"):
+        if key in filters and row[key] != filters[key]:
+            return False
+    if "date_from" in filters and row["timestamp"] < filters["date_from"]:
+        return False
+    if "date_to" in filters and row["timestamp"] >= filters["date_to"]:
+        return False
+    return True
+
+def read_archived(filters: dict, before: Optional[tuple] = None) -> Iterator[dict]:
+    """
+    Archived rows matching `filters` (the AuditFilters keys), newest first, strictly
+    older than `before` = (timestamp, id). Only the files whose month overlaps the
+    requested range are opened; rows are parsed lazily.
+    """
+    Archive = models.AuditArchive
+    stmt = select(Archive.range_start, Archive.range_end, Archive.path).order_by(Archive.range_start.desc())
+    if filters.get("date_from"):
+        stmt = stmt.where(Archive.range_end > filters["date_from"])
+    if filters.get("date_to"):
+        stmt = stmt.where(Archive.range_start < filters["date_to"])
+    if before:
+        stmt = stmt.where(Archive.range_start <= before[0])
+    with database.engine.connect() as conn:
+        archives = conn.execute(stmt).all()
+
+    for archive in archives:
+        with gzip.open(archive.path, "rt", encoding="utf-8", newline="") as f:
+            for raw_row in csv.DictReader(f):
+                row = _parse(raw_row)
+                if before and (row["timestamp"], row["id"]) >= before:
+                    continue
+                if _matches(row, filters):
+                    yield row
+
+# --- Scheduler ---
+
+def _run():
+    while not _stop.is_set():
+        try:
+            maintain()
+        except Exception as e:
+            with _lock:
+                _stats["last_error"] = str(e)
+            print(f"Audit partition maintenance error: {e}")
+        _stop.wait(MAINTENANCE_INTERVAL)
+
+def start():
+    global _scheduler
+    if _scheduler is not None or not MAINTENANCE_ENABLED:
+        return
+    _stop.clear()
+    _scheduler = threading.Thread(target=_run, name="audit-partitions", daemon=True)
+    _scheduler.start()
+
+def stop():
+    global _scheduler
+    _stop.set()
+    if _scheduler is not None:
+        _scheduler.join(timeout=5)
+        _scheduler = None
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "hot_months": HOT_MONTHS, "months_ahead": MONTHS_AHEAD, "archive_dir": ARCHIVE_DIR}
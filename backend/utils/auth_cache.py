@@ -0,0 +1,91 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+import time
+import uuid
+import models
+
+# TTL/LRU cache of authenticated principals keyed by token subject (document_id).
+# Entries are detached copies of models.User; get_current_user merges them into
+# the request session without a SELECT.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+_lock = threading.Lock()
+_entries = OrderedDict() # subject -> (expires_at, user)
+_subjects_by_user_id = {}
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+def _detached_copy(user: models.User) -> models.User:
+    columns = inspect(models.User).column_attrs
+    copy = models.User(**{attr.key: getattr(user, attr.key) for attr in columns})
+    make_transient_to_detached(copy)
+    return copy
+
+def get(subject: str) -> Optional[models.User]:
+    with _lock:
+        entry = _entries.get(subject)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            _remove(subject)
+            _stats["expired"] += 1
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(subject)
+        _stats["hits"] += 1
+        return user
+
+def put(subject: str, user: models.User):
+    copy = _detached_copy(user)
+    with _lock:
+        _remove(subject)
+        _entries[subject] = (time.monotonic() + AUTH_CACHE_TTL, copy)
+        _subjects_by_user_id[copy.id] = subject
+        while len(_entries) > AUTH_CACHE_SIZE:
+            _, (_, evicted) = _entries.popitem(last=False)
+            _subjects_by_user_id.pop(evicted.id, None)
+            _stats["evictions"] += 1
+
+def _remove(subject: str):
+    entry = _entries.pop(subject, None)
+    if entry is not None:
+        _subjects_by_user_id.pop(entry[1].id, None)
+
+def invalidate(subject: str):
+    with _lock:
+        _remove(subject)
+        _stats["invalidations"] += 1
+
+def invalidate_user(user_id):
+    """
+    Drops the cached principal of a user by primary key (document_id may have changed).
+    """
+    if not isinstance(user_id, uuid.UUID):
+        user_id = uuid.UUID(str(user_id))
+    with _lock:
+        subject = _subjects_by_user_id.pop(user_id, None)
+        if subject is not None:
+            _entries.pop(subject, None)
+        _stats["invalidations"] += 1
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _subjects_by_user_id.clear()
+
+def stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "size": len(_entries),
+            "max_size": AUTH_CACHE_SIZE,
+            "ttl_seconds": AUTH_CACHE_TTL,
+            "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else 0.0
+        }
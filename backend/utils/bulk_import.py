@@ -0,0 +1,237 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional
+from datetime import datetime
+import csv
+import json
+import os
+import uuid
+import threading
+import multiprocessing
+
+import models, database, auth
+
+# Expected columns: Documento, Nombre Completo, Email, Cargo (Optional)
+REQUIRED_COLUMNS = ['Documento', 'Nombre Completo', 'Email']
+ALLOWED_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", str(os.cpu_count() or 2)))
+MAX_STORED_ERRORS = 1000
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn: forking a threaded API worker is not safe
+            _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False)
+            _hash_pool = None
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    # pbkdf2 is CPU bound: spread it over processes instead of the event loop/GIL
+    if len(passwords) < 8:
+        return [auth.get_password_hash(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    try:
+        return list(get_hash_pool().map(auth.get_password_hash, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM kill): recreate the pool on next use, hash this chunk inline
+        shutdown_hash_pool()
+        return [auth.get_password_hash(p) for p in passwords]
+
+def _iter_raw_rows(path: str) -> Iterator[tuple]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.reader(f):
+                yield tuple(row)
+    elif ext == '.xlsx':
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                yield row
+        finally:
+            wb.close()
+    else:
+        # Legacy .xls has no streaming reader, fall back to pandas
+        import pandas as pd
+        df = pd.read_excel(path, header=None, dtype=object)
+        for row in df.itertuples(index=False):
+            yield tuple(None if pd.isna(v) else v for v in row)
+
+def read_header(path: str) -> List[str]:
+    for row in _iter_raw_rows(path):
+        return [str(c).strip() if c is not None else "" for c in row]
+    return []
+
+def _cell_to_str(value) -> str:
+    if value is None:
+        return ""
+    # Excel stores numeric document ids as floats (e.g. 111222333.0)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def iter_rows(path: str) -> Iterator[dict]:
+    """
+    Streams the file row by row as dicts keyed by header.
+    Each dict carries `_row`, the spreadsheet row number used in error messages.
+    """
+    rows = _iter_raw_rows(path)
+    header = None
+    for index, raw in enumerate(rows):
+        if header is None:
+            header = [str(c).strip() if c is not None else "" for c in raw]
+            continue
+        if not raw or all(v is None or str(v).strip() == "" for v in raw):
+            continue
+        item = {col: _cell_to_str(raw[i]) if i < len(raw) else "" for i, col in enumerate(header)}
+        item["_row"] = index + 1
+        yield item
+
+def chunked(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def process_chunk(db: Session, chunk: List[dict], company_id: uuid.UUID, seen: set) -> tuple:
+    """
+    Validates and inserts one chunk of employees.
+    One duplicate lookup for the chunk, hashing in the process pool and one executemany insert.
+    Returns (created_count, errors).
+    """
+    errors = []
+    candidates = []
+    for row in chunk:
+        document_id = row.get('Documento', '')
+        full_name = row.get('Nombre Completo', '')
+        email = row.get('Email', '')
+        if not document_id or not full_name or not email:
+            errors.append(f"Row {row['_row']}: Missing required fields")
+            continue
+        if document_id in seen or email.lower() in seen:
+            errors.append(f"Row {row['_row']}: User {document_id} or {email} is duplicated in the file")
+            continue
+        seen.add(document_id)
+        seen.add(email.lower())
+        candidates.append((row['_row'], document_id, full_name, email))
+
+    if not candidates:
+        return 0, errors
+
+    # Set-based duplicate check against existing users
+    existing = db.query(models.User.document_id, models.User.email).filter(or_(
+        models.User.document_id.in_([c[1] for c in candidates]),
+        models.User.email.in_([c[3] for c in candidates])
+    )).all()
+    existing_docs = {e.document_id for e in existing}
+    existing_emails = {e.email.lower() for e in existing}
+
+    new_rows = []
+    for row_number, document_id, full_name, email in candidates:
+        if document_id in existing_docs or email.lower() in existing_emails:
+            errors.append(f"Row {row_number}: User {document_id} or {email} already exists")
+            continue
+        new_rows.append((row_number, document_id, full_name, email))
+
+    if not new_rows:
+        return 0, errors
+
+    # Default password is document_id
+    hashes = hash_passwords([r[1] for r in new_rows])
+    now = datetime.utcnow()
+    values = [{
+        "id": uuid.uuid4(),
+        "document_id": document_id,
+        "email": email,
+        "full_name": full_name,
+        "hashed_password": hashed,
+        "role": models.UserRole.STUDENT,
+        "company_id": company_id,
+        "is_active": True,
+        "created_at": now
+    } for (row_number, document_id, full_name, email), hashed in zip(new_rows, hashes)]
+
+    try:
+        db.execute(insert(models.User), values)
+        return len(values), errors
+    except IntegrityError:
+        # A concurrent signup took one of the keys: retry row by row in savepoints
+        db.rollback()
+        created = 0
+        for (row_number, document_id, _, email), value in zip(new_rows, values):
+            try:
+                with db.begin_nested():
+                    db.execute(insert(models.User), [value])
+                created += 1
+            except IntegrityError:
+                errors.append(f"Row {row_number}: User {document_id} or {email} already exists")
+        return created, errors
+
+def run_import_job(job_id: uuid.UUID, path: str):
+    """
+    Background task: streams the uploaded file in chunks, committing users and
+    job progress after each chunk so the status endpoint can be polled.
+    """
+    db = database.SessionLocal()
+    try:
+        job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+        if not job:
+            return
+        job.status = models.ImportJobStatus.RUNNING
+        db.commit()
+
+        errors = []
+        seen = set()
+        for chunk in chunked(iter_rows(path), CHUNK_SIZE):
+            try:
+                created, chunk_errors = process_chunk(db, chunk, job.company_id, seen)
+            except Exception as e:
+                db.rollback()
+                created = 0
+                chunk_errors = [f"Row {row['_row']}: {str(e)}" for row in chunk]
+
+            errors.extend(chunk_errors[:max(0, MAX_STORED_ERRORS - len(errors))])
+            job.processed_rows = (job.processed_rows or 0) + len(chunk)
+            job.created_count = (job.created_count or 0) + created
+            job.error_count = (job.error_count or 0) + len(chunk_errors)
+            job.errors = json.dumps(errors)
+            db.commit()
+
+        job.status = models.ImportJobStatus.COMPLETED
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Import job {job_id} failed: {e}")
+        job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+        if job:
+            job.status = models.ImportJobStatus.FAILED
+            job.errors = json.dumps([f"Error processing file: {str(e)}"])
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,56 @@
+from typing import Optional
+import hashlib
+import os
+import threading
+import time
+
+# In-process cache of the serialized public course catalog.
+# Invalidated explicitly on course/module/enrollment writes; the TTL bounds
+# staleness when a write lands on another worker process.
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "30"))
+
+class CachedCatalog:
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.created = time.monotonic()
+
+_lock = threading.Lock()
+_version = 0
+_cached: Optional[CachedCatalog] = None
+
+def version() -> int:
+    return _version
+
+def get() -> Optional[CachedCatalog]:
+    cached = _cached
+    if cached is None or time.monotonic() - cached.created > CATALOG_CACHE_TTL:
+        return None
+    return cached
+
+def store(built_version: int, body: bytes) -> CachedCatalog:
+    """
+    Caches the body unless an invalidation happened while it was being built.
+    """
+    global _cached
+    entry = CachedCatalog(built_version, body)
+    with _lock:
+        if built_version == _version:
+            _cached = entry
+    return entry
+
+def invalidate():
+    global _version, _cached
+    with _lock:
+        _version += 1
+        _cached = None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, the header may carry several tags
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [c[2:] if c.startswith("W/") else c for c in candidates]
@@ -0,0 +1,128 @@
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives import serialization
+from cryptography.exceptions import InvalidSignature
+from datetime import datetime
+from typing import Optional
+import base64
+import hashlib
+import os
+import threading
+
+# Offline-verifiable certificate payloads.
+# A token is "<payload>.<signature>" (both base64url, no padding) where payload is
+#   1|<kid>|<certificate_code>|<holder document>|<course>|<issue YYYYMMDD>|<expiry YYYYMMDD>
+# signed with Ed25519. Clients verify it with the public key from
+# GET /certificates/public-key and the cached revocation list, without calling the API.
+SIGNING_KEY_FILE = os.getenv("CERT_SIGNING_KEY_FILE", "keys/certificate_signing.key")
+PAYLOAD_VERSION = "1"
+MAX_COURSE_LENGTH = 60 # keeps the QR small
+
+_lock = threading.Lock()
+_private_key: Optional[Ed25519PrivateKey] = None
+
+class SignatureError(ValueError):
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _load_or_create_key() -> Ed25519PrivateKey:
+    # CERT_SIGNING_KEY (base64 raw 32 byte seed) wins over the key file
+    seed = os.getenv("CERT_SIGNING_KEY")
+    if seed:
+        return Ed25519PrivateKey.from_private_bytes(_b64decode(seed.strip()))
+
+    if not os.path.exists(SIGNING_KEY_FILE):
+        os.makedirs(os.path.dirname(SIGNING_KEY_FILE) or ".", exist_ok=True)
+        key = Ed25519PrivateKey.generate()
+        raw = key.private_bytes(serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption())
+        try:
+            # O_EXCL: concurrent workers starting at once keep a single key
+            fd = os.open(SIGNING_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(_b64encode(raw))
+        except FileExistsError:
+            pass
+
+    with open(SIGNING_KEY_FILE) as f:
+        return Ed25519PrivateKey.from_private_bytes(_b64decode(f.read().strip()))
+
+def private_key() -> Ed25519PrivateKey:
+    global _private_key
+    with _lock:
+        if _private_key is None:
+            _private_key = _load_or_create_key()
+        return _private_key
+
+def public_key() -> Ed25519PublicKey:
+    return private_key().public_key()
+
+def _public_raw() -> bytes:
+    return public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+def key_id() -> str:
+    return hashlib.sha256(_public_raw()).hexdigest()[:8]
+
+def public_key_info() -> dict:
+    return {
+        "kid": key_id(),
+        "alg": "Ed25519",
+        "public_key": _b64encode(_public_raw()),
+        "pem": public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode(),
+        "format": "base64url(payload).base64url(signature); payload = 1|kid|code|document|course|issue YYYYMMDD|expiry YYYYMMDD"
+    }
+
+def sign(data: bytes) -> str:
+    return _b64encode(private_key().sign(data))
+
+def verify(data: bytes, signature: str) -> bool:
+    try:
+        public_key().verify(_b64decode(signature), data)
+        return True
+    except (InvalidSignature, ValueError):
+        return False
+
+def _date(value: Optional[datetime]) -> str:
+    return value.strftime("%Y%m%d") if value else ""
+
+def sign_certificate(certificate_code: str, document_id: str, course: str, issue_date: Optional[datetime], expiration_date: datetime) -> str:
+    """
+    Returns the compact signed token embedded in the certificate QR.
+    """
+    fields = [PAYLOAD_VERSION, key_id(), certificate_code, document_id, course[:MAX_COURSE_LENGTH], _date(issue_date), _date(expiration_date)]
+    # "|" is the separator: strip it from free text
+    payload = "|".join(f.replace("|", "/") for f in fields).encode()
+    return f"{_b64encode(payload)}.{sign(payload)}"
+
+def verify_certificate(token: str) -> dict:
+    """
+    Checks the signature only (no DB access) and returns the decoded fields.
+    Raises SignatureError for malformed tokens or bad signatures.
+    """
+    try:
+        encoded_payload, signature = token.strip().split(".")
+        payload = _b64decode(encoded_payload)
+        fields = payload.decode().split("|")
+    except (ValueError, UnicodeDecodeError):
+        raise SignatureError("Malformed certificate token")
+    if len(fields) != 7 or fields[0] != PAYLOAD_VERSION:
+        raise SignatureError("Unsupported certificate token version")
+    if fields[1] != key_id():
+        raise SignatureError("Certificate signed with an unknown key")
+    if not verify(payload, signature):
+        raise SignatureError("Invalid certificate signature")
+
+    _, kid, code, document_id, course, issue, expiry = fields
+    return {
+        "kid": kid,
+        "certificate_code": code,
+        "student_document_id": document_id,
+        "course_name": course,
+        "issue_date": datetime.strptime(issue, "%Y%m%d") if issue else None,
+        "expiration_date": datetime.strptime(expiry, "%Y%m%d")
+    }
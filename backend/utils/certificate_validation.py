@@ -0,0 +1,247 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select, literal, exists, DateTime
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime
+from uuid import UUID
+import os
+import threading
+import time
+import models
+from utils import rate_limit
+
+# Public certificate validation read path.
+# certificate_validations holds one denormalized row per certificate (refreshed on
+# writes, like the expiration matrix) and an in-process LRU sits in front of it.
+# Unknown codes/documents are cached too (negative entries, shorter TTL) so repeated
+# scans of a bad QR do not reach Postgres.
+VALIDATION_CACHE_SIZE = int(os.getenv("VALIDATION_CACHE_SIZE", "50000"))
+VALIDATION_CACHE_TTL = int(os.getenv("VALIDATION_CACHE_TTL", "300"))
+NEGATIVE_CACHE_TTL = int(os.getenv("VALIDATION_NEGATIVE_TTL", "30"))
+
+# Per client; a site gate scanning ~1k QR codes/minute stays under the default
+VALIDATION_RATE_PER_MINUTE = int(os.getenv("VALIDATION_RATE_PER_MINUTE", "1200"))
+VALIDATION_BURST = int(os.getenv("VALIDATION_BURST", "300"))
+limiter = rate_limit.RateLimiter(VALIDATION_RATE_PER_MINUTE, VALIDATION_BURST)
+
+Record = models.CertificateValidation
+
+_lock = threading.Lock()
+_entries = OrderedDict() # ("code", code) | ("doc", document_id) -> (expires_at, value)
+_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0}
+
+# --- Read model maintenance (no commit, the caller commits with its write) ---
+
+def _source_select():
+    # Revoked codes stay out of every refresh/rebuild (revoke_certificate deletes their row)
+    return select(
+        models.Certification.id,
+        models.Certification.certificate_code,
+        models.User.id,
+        models.Course.id,
+        models.User.document_id,
+        models.User.full_name,
+        models.Course.name,
+        models.Certification.issue_date,
+        models.Certification.expiration_date,
+        models.Certification.pdf_url,
+        models.Certification.created_at,
+        literal(datetime.utcnow(), DateTime)
+    ).join(models.User, models.User.id == models.Certification.user_id)\
+     .join(models.Course, models.Course.id == models.Certification.course_id)\
+     .where(~exists().where(models.CertificateRevocation.certificate_code == models.Certification.certificate_code))
+
+_RECORD_COLUMNS = [
+    "certification_id", "certificate_code", "user_id", "course_id", "document_id", "student_name",
+    "course_name", "issue_date", "expiration_date", "pdf_url", "created_at", "refreshed_at"
+]
+
+def refresh_certification(db: Session, cert: models.Certification, user: models.User, course: models.Course):
+    db.merge(Record(
+        certification_id=cert.id,
+        certificate_code=cert.certificate_code,
+        user_id=user.id,
+        course_id=course.id,
+        document_id=user.document_id,
+        student_name=user.full_name,
+        course_name=course.name,
+        issue_date=cert.issue_date,
+        expiration_date=cert.expiration_date,
+        pdf_url=cert.pdf_url,
+        created_at=cert.created_at,
+        refreshed_at=datetime.utcnow()
+    ))
+
+def refresh_certifications(db: Session, certification_ids: List[UUID]):
+    if not certification_ids:
+        return
+    db.query(Record).filter(Record.certification_id.in_(certification_ids)).delete(synchronize_session=False)
+    db.execute(insert(Record).from_select(
+        _RECORD_COLUMNS,
+        _source_select().where(models.Certification.id.in_(certification_ids))
+    ))
+
+def refresh_user(db: Session, user_id: UUID):
+    """
+    Re-materializes the rows of a user (name or document changed).
+    """
+    db.query(Record).filter(Record.user_id == user_id).delete(synchronize_session=False)
+    db.execute(insert(Record).from_select(
+        _RECORD_COLUMNS,
+        _source_select().where(models.User.id == user_id)
+    ))
+
+def refresh_course_name(db: Session, course_id: UUID, name: str):
+    db.query(Record).filter(Record.course_id == course_id)\
+        .update({Record.course_name: name}, synchronize_session=False)
+
+def set_pdf_url(db: Session, certification_id: UUID, pdf_url: str) -> Optional[tuple]:
+    """
+    Returns (certificate_code, document_id) of the updated row for cache invalidation.
+    """
+    row = db.query(Record.certificate_code, Record.document_id).filter(
+        Record.certification_id == certification_id
+    ).first()
+    if not row:
+        return None
+    db.query(Record).filter(Record.certification_id == certification_id)\
+        .update({Record.pdf_url: pdf_url}, synchronize_session=False)
+    return row.certificate_code, row.document_id
+
+def rebuild(db: Session) -> int:
+    """
+    Full set-based rebuild, used to backfill certificates created outside the API.
+    """
+    db.query(Record).delete(synchronize_session=False)
+    result = db.execute(insert(Record).from_select(_RECORD_COLUMNS, _source_select()))
+    return result.rowcount
+
+# --- Cache ---
+
+def _as_dict(record: models.CertificateValidation) -> dict:
+    # Same shape as schemas.CertificationResponse
+    return {
+        "id": record.certification_id,
+        "user_id": record.user_id,
+        "course_id": record.course_id,
+        "issue_date": record.issue_date,
+        "expiration_date": record.expiration_date,
+        "certificate_code": record.certificate_code,
+        "pdf_url": record.pdf_url,
+        "created_at": record.created_at,
+        "course_name": record.course_name,
+        "student_name": record.student_name,
+        "student_document_id": record.document_id
+    }
+
+def _get(key: tuple):
+    # Returns (found, value)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            _stats["misses"] += 1
+            return False, None
+        _entries.move_to_end(key)
+        value = entry[1]
+        if value is None or value == []:
+            _stats["negative_hits"] += 1
+        else:
+            _stats["hits"] += 1
+        return True, value
+
+def _put(key: tuple, value):
+    ttl = NEGATIVE_CACHE_TTL if value is None or value == [] else VALIDATION_CACHE_TTL
+    with _lock:
+        _entries[key] = (time.monotonic() + ttl, value)
+        _entries.move_to_end(key)
+        while len(_entries) > VALIDATION_CACHE_SIZE:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+def _cached(kind: str, keys: Iterable[str]) -> tuple:
+    # Returns (results found in cache, keys to load)
+    results = {}
+    missing = []
+    for key in keys:
+        found, value = _get((kind, key))
+        if found:
+            results[key] = value
+        else:
+            missing.append(key)
+    return results, missing
+
+def _codes_query(missing: List[str]):
+    return select(Record).where(Record.certificate_code.in_(missing))
+
+def _documents_query(missing: List[str]):
+    return select(Record).where(Record.document_id.in_(missing)).order_by(Record.issue_date)
+
+def _store_codes(results: dict, missing: List[str], records) -> dict:
+    rows = {r.certificate_code: _as_dict(r) for r in records}
+    for code in missing:
+        value = rows.get(code)
+        _put(("code", code), value)
+        results[code] = value
+    return results
+
+def _store_documents(results: dict, missing: List[str], records) -> dict:
+    grouped = {document_id: [] for document_id in missing}
+    for record in records:
+        grouped[record.document_id].append(_as_dict(record))
+    for document_id, value in grouped.items():
+        _put(("doc", document_id), value)
+        results[document_id] = value
+    return results
+
+def lookup_codes(db: Session, codes: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """
+    Validates certificate codes: cache first, one IN query for the misses.
+    """
+    results, missing = _cached("code", codes)
+    if missing:
+        _store_codes(results, missing, db.execute(_codes_query(missing)).scalars())
+    return results
+
+def lookup_documents(db: Session, document_ids: Iterable[str]) -> Dict[str, List[dict]]:
+    """
+    Certificates per holder document: cache first, one IN query for the misses.
+    """
+    results, missing = _cached("doc", document_ids)
+    if missing:
+        _store_documents(results, missing, db.execute(_documents_query(missing)).scalars())
+    return results
+
+async def lookup_codes_async(db: AsyncSession, codes: Iterable[str]) -> Dict[str, Optional[dict]]:
+    results, missing = _cached("code", codes)
+    if missing:
+        _store_codes(results, missing, (await db.execute(_codes_query(missing))).scalars())
+    return results
+
+async def lookup_documents_async(db: AsyncSession, document_ids: Iterable[str]) -> Dict[str, List[dict]]:
+    results, missing = _cached("doc", document_ids)
+    if missing:
+        _store_documents(results, missing, (await db.execute(_documents_query(missing))).scalars())
+    return results
+
+def invalidate(codes: Iterable[str] = (), document_ids: Iterable[str] = ()):
+    with _lock:
+        for code in codes:
+            _entries.pop(("code", code), None)
+        for document_id in document_ids:
+            _entries.pop(("doc", document_id), None)
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+def stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["negative_hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "size": len(_entries),
+            "max_size": VALIDATION_CACHE_SIZE,
+            "hit_ratio": round((_stats["hits"] + _stats["negative_hits"]) / lookups, 4) if lookups else 0.0,
+            "rate_limit": limiter.stats()
+        }
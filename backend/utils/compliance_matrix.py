@@ -0,0 +1,161 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, and_, exists, literal
+from typing import List, Optional, Tuple
+from functools import lru_cache
+from uuid import UUID
+import json
+import models, schemas
+
+DEFAULT_REQUIRED_TYPES = ["ID_CARD", "SOCIAL_SECURITY", "MEDICAL_CONCEPT"]
+
+# Allowed values for the `sort` parameter (prefix with "-" for descending)
+SORT_FIELDS = {
+    "enrollment_date": models.Enrollment.created_at,
+    "full_name": models.User.full_name,
+    "document_id": models.User.document_id,
+    "course_name": models.Course.name,
+    "status": models.Enrollment.status,
+}
+
+@lru_cache(maxsize=1024)
+def _parse_required_types(raw: Optional[str]) -> Tuple[str, ...]:
+    if not raw:
+        return tuple(DEFAULT_REQUIRED_TYPES)
+    try:
+        return tuple(json.loads(raw))
+    except (ValueError, TypeError):
+        return tuple(DEFAULT_REQUIRED_TYPES)
+
+def parse_required_types(raw: Optional[str]) -> List[str]:
+    """
+    Parses Course.required_documents, falling back to the default requirements.
+    Courses share a handful of distinct values so the parse is memoized.
+    """
+    return list(_parse_required_types(raw))
+
+def _requires_type(doc_type: str):
+    # Course.required_documents is a JSON list stored as text, so match the quoted value
+    condition = models.Course.required_documents.like(f'%"{doc_type}"%')
+    if doc_type in DEFAULT_REQUIRED_TYPES:
+        condition = or_(
+            condition,
+            models.Course.required_documents.is_(None),
+            models.Course.required_documents == ""
+        )
+    return condition
+
+def _matrix_query(
+    db: Session,
+    course_id: Optional[UUID] = None,
+    status: Optional[models.EnrollmentStatus] = None,
+    missing_type: Optional[models.DocumentType] = None
+):
+    query = db.query(
+        models.Enrollment.id.label("enrollment_id"),
+        models.Enrollment.user_id,
+        models.Enrollment.status,
+        models.Enrollment.created_at,
+        models.User.full_name,
+        models.User.document_id,
+        models.Course.name.label("course_name"),
+        models.Course.required_documents
+    ).join(models.User, models.User.id == models.Enrollment.user_id)\
+     .join(models.Course, models.Course.id == models.Enrollment.course_id)\
+     .filter(models.User.role == models.UserRole.STUDENT)\
+     .filter(models.User.deleted_at.is_(None), models.Course.deleted_at.is_(None))
+
+    if course_id:
+        query = query.filter(models.Enrollment.course_id == course_id)
+
+    if status:
+        query = query.filter(models.Enrollment.status == status)
+
+    if missing_type:
+        has_document = exists().where(
+            models.Document.enrollment_id == models.Enrollment.id,
+            models.Document.user_id == models.Enrollment.user_id,
+            models.Document.type == missing_type
+        )
+        query = query.filter(and_(_requires_type(missing_type.value), ~has_document))
+
+    return query
+
+def build_compliance_matrix(
+    db: Session,
+    course_id: Optional[UUID] = None,
+    status: Optional[models.EnrollmentStatus] = None,
+    missing_type: Optional[models.DocumentType] = None,
+    sort: str = "-enrollment_date",
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> Tuple[List[schemas.DocumentMatrixItem], int]:
+    """
+    Builds the compliance matrix page with one query for the enrollment rows
+    (the total count rides along as a window function) and one query for the
+    documents linked to those enrollments.
+    Returns (items, total).
+    """
+    descending = sort.startswith("-")
+    sort_key = sort.lstrip("-")
+    if sort_key not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort field. Allowed: {list(SORT_FIELDS)}")
+
+    sort_column = SORT_FIELDS[sort_key]
+    order = sort_column.desc() if descending else sort_column.asc()
+
+    base = _matrix_query(db, course_id, status, missing_type)
+    page_query = base.add_columns(func.count(literal(1)).over().label("total"))\
+        .order_by(order, models.Enrollment.id)\
+        .offset(skip)
+    if limit is not None:
+        page_query = page_query.limit(limit)
+
+    rows = page_query.all()
+
+    if rows:
+        total = rows[0].total
+    elif skip:
+        # Page past the end, the window count is not available
+        total = base.count()
+    else:
+        total = 0
+
+    # Documents LINKED to the enrollments of this page
+    docs_by_enrollment = {}
+    enrollment_ids = [row.enrollment_id for row in rows]
+    if enrollment_ids:
+        docs = db.query(models.Document)\
+            .filter(models.Document.enrollment_id.in_(enrollment_ids))\
+            .order_by(models.Document.created_at.desc())\
+            .all()
+        for doc in docs:
+            docs_by_enrollment.setdefault(doc.enrollment_id, []).append(doc)
+
+    matrix = []
+    for row in rows:
+        required_types = parse_required_types(row.required_documents)
+
+        # Latest document per type uploaded by the enrolled student
+        latest = {}
+        for doc in docs_by_enrollment.get(row.enrollment_id, []):
+            if doc.user_id == row.user_id:
+                latest.setdefault(doc.type.value, doc)
+
+        doc_map = {}
+        for dtype in required_types:
+            found = latest.get(dtype)
+            doc_map[dtype] = schemas.DocumentResponse.from_orm(found) if found else None
+
+        matrix.append(schemas.DocumentMatrixItem(
+            user_id=row.user_id,
+            enrollment_id=row.enrollment_id,
+            enrollment_status=row.status.value if row.status else "ENROLLED",
+            enrollment_date=row.created_at,
+            full_name=row.full_name,
+            document_id=row.document_id,
+            course_name=row.course_name,
+            required_types=required_types,
+            documents=doc_map
+        ))
+
+    return matrix, total
@@ -0,0 +1,100 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, NamedTuple, Optional
+import os
+import uuid
+import models
+
+# Curriculum templates and course cloning.
+# A curriculum (ordered modules with their quiz questions) is copied between
+# courses and templates with one INSERT ... SELECT statement per copy, whatever
+# the number of target courses: new module ids are drawn once in a CTE that maps
+# each (source module, target) pair, and both the modules and their questions are
+# inserted from that mapping. Nothing is committed here; callers commit the copy
+# together with the rows that own it.
+MAX_INSTANCES = int(os.getenv("CURRICULUM_MAX_INSTANCES", "200")) # courses per instantiate/clone call
+
+class _Layout(NamedTuple):
+    modules: str
+    owner_column: str
+    questions: str
+    question_owner_column: str
+
+COURSE = _Layout("modules", "course_id", "questions", "module_id")
+TEMPLATE = _Layout("curriculum_template_modules", "template_id", "curriculum_template_questions", "template_module_id")
+
+_MODULE_COLUMNS = "title, description, content_url, min_duration_seconds, order_index, has_quiz, passing_score"
+_QUESTION_COLUMNS = "text, options, correct_option_index"
+
+_COPY_SQL = """
+    WITH mapping AS MATERIALIZED (
+        SELECT gen_random_uuid() AS new_id, src.id AS source_id, target.owner_id
+        FROM {src.modules} src
+        CROSS JOIN unnest(CAST(:target_ids AS uuid[])) AS target(owner_id)
+        WHERE src.{src.owner_column} = :source_id
+    ),
+    new_modules AS (
+        INSERT INTO {dst.modules} (id, {dst.owner_column}, {module_columns})
+        SELECT m.new_id, m.owner_id, {src_module_columns}
+        FROM mapping m JOIN {src.modules} src ON src.id = m.source_id
+        RETURNING 1
+    ),
+    new_questions AS (
+        INSERT INTO {dst.questions} (id, {dst.question_owner_column}, {question_columns})
+        SELECT gen_random_uuid(), m.new_id, {src_question_columns}
+        FROM mapping m JOIN {src.questions} q ON q.{src.question_owner_column} = m.source_id
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM new_modules) AS modules, (SELECT count(*) FROM new_questions) AS questions
+"""
+
+def _prefixed(alias: str, columns: str) -> str:
+    return ", ".join(f"{alias}.{c.strip()}" for c in columns.split(","))
+
+def copy_curriculum(db: Session, src: _Layout, source_id: uuid.UUID, dst: _Layout, target_ids: List[uuid.UUID]) -> dict:
+    """
+    Copies the modules and questions of one course/template into every target
+    course/template. Returns the number of rows inserted.
+    """
+    if not target_ids:
+        return {"modules": 0, "questions": 0}
+    sql = _COPY_SQL.format(
+        src=src, dst=dst,
+        module_columns=_MODULE_COLUMNS, src_module_columns=_prefixed("src", _MODULE_COLUMNS),
+        question_columns=_QUESTION_COLUMNS, src_question_columns=_prefixed("q", _QUESTION_COLUMNS)
+    )
+    row = db.execute(text(sql), {"source_id": source_id, "target_ids": [str(t) for t in target_ids]}).first()
+    return {"modules": row.modules, "questions": row.questions}
+
+def instantiate(db: Session, template_id: uuid.UUID, course_ids: List[uuid.UUID]) -> dict:
+    return copy_curriculum(db, TEMPLATE, template_id, COURSE, course_ids)
+
+def clone_modules(db: Session, source_course_id: uuid.UUID, course_ids: List[uuid.UUID]) -> dict:
+    return copy_curriculum(db, COURSE, source_course_id, COURSE, course_ids)
+
+def capture(db: Session, course_id: uuid.UUID, template_id: uuid.UUID) -> dict:
+    return copy_curriculum(db, COURSE, course_id, TEMPLATE, [template_id])
+
+def match_template(db: Session, course_name: str) -> Optional[models.CurriculumTemplate]:
+    """
+    Template for a new course by name: the first (by priority) whose keywords
+    appear in it, else the fallback template.
+    """
+    name = course_name.upper()
+    templates = db.query(models.CurriculumTemplate).order_by(
+        models.CurriculumTemplate.priority, models.CurriculumTemplate.name
+    ).all()
+    for template in templates:
+        keywords = [k.strip().upper() for k in (template.match_keywords or "").split(",") if k.strip()]
+        if any(k in name for k in keywords):
+            return template
+    return next((t for t in templates if t.is_fallback), None)
+
+def delete_template(db: Session, template_id: uuid.UUID):
+    # Set-based, children first (no cascades on the FKs)
+    modules = db.query(models.TemplateModule.id).filter(models.TemplateModule.template_id == template_id)
+    db.query(models.TemplateQuestion).filter(
+        models.TemplateQuestion.template_module_id.in_(modules.scalar_subquery())
+    ).delete(synchronize_session=False)
+    db.query(models.TemplateModule).filter(models.TemplateModule.template_id == template_id).delete(synchronize_session=False)
+    db.query(models.CurriculumTemplate).filter(models.CurriculumTemplate.id == template_id).delete(synchronize_session=False)
@@ -0,0 +1,76 @@
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy import exc
+from typing import Dict
+import bisect
+import threading
+import time
+
+# Connection pool instrumentation.
+# The pool classes below time every checkout (waiting for a free connection or
+# opening a new one) into a per-pool histogram, so queueing on the pool shows
+# up in /system/db-pool instead of as unexplained request latency.
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Histogram:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, ms: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"le_{b}ms" for b in BUCKETS_MS] + ["gt_%dms" % BUCKETS_MS[-1]]
+            return {
+                "checkouts": self.total,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.sum_ms / self.total, 3) if self.total else 0.0,
+                "max_wait_ms": round(self.max_ms, 3),
+                "buckets": dict(zip(labels, self.counts))
+            }
+
+_histograms: Dict[str, Histogram] = {}
+
+def histogram(name: str) -> Histogram:
+    return _histograms.setdefault(name, Histogram())
+
+class _TimedCheckout:
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            histogram(self.metrics_name).timeout()
+            raise
+        histogram(self.metrics_name).observe((time.perf_counter() - started) * 1000)
+        return connection
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = "sync"
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+def pool_status(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0), # connections opened beyond pool_size
+        "timeout_seconds": pool.timeout()
+    }
@@ -0,0 +1,171 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, and_, exists, literal, DateTime
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from uuid import UUID
+import models
+
+Entry = models.CertificateExpirationEntry
+
+EXPIRING_SOON_DAYS = 30
+STATUSES = ["ACTIVE", "EXPIRING_SOON", "EXPIRED"]
+
+def _status_conditions(now: datetime) -> dict:
+    # Same buckets as the original per-row computation:
+    # days_remaining < 0 -> EXPIRED, <= 30 -> EXPIRING_SOON, otherwise ACTIVE
+    soon_limit = now + timedelta(days=EXPIRING_SOON_DAYS + 1)
+    return {
+        "EXPIRED": Entry.expiration_date < now,
+        "EXPIRING_SOON": and_(Entry.expiration_date >= now, Entry.expiration_date < soon_limit),
+        "ACTIVE": Entry.expiration_date >= soon_limit,
+    }
+
+def status_for(expiration_date: datetime, now: datetime) -> Tuple[str, int]:
+    days_until_expiry = (expiration_date - now).days
+    if days_until_expiry < 0:
+        return "EXPIRED", days_until_expiry
+    if days_until_expiry <= EXPIRING_SOON_DAYS:
+        return "EXPIRING_SOON", days_until_expiry
+    return "ACTIVE", days_until_expiry
+
+def live_entries():
+    # Rows of tombstoned users/courses stay in the table until the purge worker deletes them.
+    # Anti-joins against the partial ix_*_tombstoned indexes (only pending tombstones)
+    return and_(
+        ~exists().where(models.User.id == Entry.user_id, models.User.deleted_at.isnot(None)),
+        ~exists().where(models.Course.id == Entry.course_id, models.Course.deleted_at.isnot(None))
+    )
+
+def _source_select():
+    # Certifications of company employees, shaped like the matrix table.
+    # Revoked codes stay out of every refresh/rebuild (revoke_certificate deletes their row)
+    return select(
+        models.Certification.id,
+        models.User.company_id,
+        models.User.id,
+        models.Course.id,
+        models.User.full_name,
+        models.User.document_id,
+        models.Course.name,
+        models.Certification.issue_date,
+        models.Certification.expiration_date,
+        literal(datetime.utcnow(), DateTime)
+    ).join(models.User, models.User.id == models.Certification.user_id)\
+     .join(models.Course, models.Course.id == models.Certification.course_id)\
+     .where(models.User.company_id.isnot(None))\
+     .where(~exists().where(models.CertificateRevocation.certificate_code == models.Certification.certificate_code))
+
+_ENTRY_COLUMNS = [
+    "certification_id", "company_id", "user_id", "course_id", "employee_name",
+    "document_id", "course_name", "issue_date", "expiration_date", "refreshed_at"
+]
+
+def refresh_certification(db: Session, cert: models.Certification, user: models.User, course: models.Course):
+    """
+    Incrementally refreshes the matrix row of a single certificate.
+    Does not commit, the caller commits together with the certificate.
+    """
+    if not user.company_id:
+        db.query(Entry).filter(Entry.certification_id == cert.id).delete(synchronize_session=False)
+        return
+
+    db.merge(Entry(
+        certification_id=cert.id,
+        company_id=user.company_id,
+        user_id=user.id,
+        course_id=course.id,
+        employee_name=user.full_name,
+        document_id=user.document_id,
+        course_name=course.name,
+        issue_date=cert.issue_date,
+        expiration_date=cert.expiration_date,
+        refreshed_at=datetime.utcnow()
+    ))
+
+def refresh_user(db: Session, user_id: UUID):
+    """
+    Re-materializes every row of a user (company link, name or document changed).
+    """
+    db.query(Entry).filter(Entry.user_id == user_id).delete(synchronize_session=False)
+    db.execute(insert(Entry).from_select(
+        _ENTRY_COLUMNS,
+        _source_select().where(models.User.id == user_id)
+    ))
+
+def refresh_certifications(db: Session, certification_ids: List[UUID]):
+    """
+    Set-based refresh for many new certificates (cohort issuance).
+    """
+    if not certification_ids:
+        return
+    db.query(Entry).filter(Entry.certification_id.in_(certification_ids)).delete(synchronize_session=False)
+    db.execute(insert(Entry).from_select(
+        _ENTRY_COLUMNS,
+        _source_select().where(models.Certification.id.in_(certification_ids))
+    ))
+
+def refresh_course_name(db: Session, course_id: UUID, name: str):
+    db.query(Entry).filter(Entry.course_id == course_id)\
+        .update({Entry.course_name: name}, synchronize_session=False)
+
+def rebuild_company(db: Session, company_id: Optional[UUID] = None) -> int:
+    """
+    Full set-based rebuild for one company (or every company when None).
+    Used to backfill certificates created outside the API.
+    """
+    source = _source_select()
+    delete_query = db.query(Entry)
+    if company_id:
+        source = source.where(models.User.company_id == company_id)
+        delete_query = delete_query.filter(Entry.company_id == company_id)
+
+    delete_query.delete(synchronize_session=False)
+    result = db.execute(insert(Entry).from_select(_ENTRY_COLUMNS, source))
+    return result.rowcount
+
+def get_company_matrix(
+    db: Session,
+    company_id: UUID,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> Tuple[List[dict], int]:
+    now = datetime.utcnow()
+    query = db.query(Entry).filter(Entry.company_id == company_id, live_entries())
+    if status:
+        query = query.filter(_status_conditions(now)[status])
+
+    total = query.count()
+
+    page_query = query.order_by(Entry.expiration_date, Entry.employee_name).offset(skip)
+    if limit is not None:
+        page_query = page_query.limit(limit)
+
+    matrix_data = []
+    for entry in page_query.all():
+        status_code, days_remaining = status_for(entry.expiration_date, now)
+        matrix_data.append({
+            "employee_name": entry.employee_name,
+            "document_id": entry.document_id,
+            "course_name": entry.course_name,
+            "issue_date": entry.issue_date,
+            "expiration_date": entry.expiration_date,
+            "status": status_code,
+            "days_remaining": days_remaining
+        })
+
+    return matrix_data, total
+
+def get_company_counts(db: Session, company_id: UUID) -> dict:
+    # Single index range scan over (company_id, expiration_date)
+    now = datetime.utcnow()
+    conditions = _status_conditions(now)
+    row = db.query(
+        func.count(Entry.certification_id),
+        *[func.count(Entry.certification_id).filter(conditions[s]) for s in STATUSES]
+    ).filter(Entry.company_id == company_id, live_entries()).one()
+
+    counts = {"total": row[0]}
+    for idx, s in enumerate(STATUSES):
+        counts[s] = row[idx + 1]
+    return counts
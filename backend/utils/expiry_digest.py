@@ -0,0 +1,157 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List, Optional
+from datetime import datetime, date, timedelta
+import os
+import threading
+import models, database
+from utils import mailer, expiration_matrix
+
+# Daily expiry reminders for companies.
+# One query over the expiration matrix picks every certificate that expires exactly
+# 30, 15 or 7 days from today, grouped by company. Each company gets a single digest
+# written to email_outbox (dedup key per company and day, so re-runs and several
+# workers are harmless) and utils/mailer delivers it.
+REMINDER_THRESHOLDS = (30, 15, 7)
+DIGEST_HOUR_UTC = int(os.getenv("DIGEST_HOUR_UTC", "12")) # 7:00 in Bogotá
+DIGEST_CHECK_INTERVAL = int(os.getenv("DIGEST_CHECK_INTERVAL", "300"))
+DIGEST_SCHEDULER_ENABLED = os.getenv("DIGEST_SCHEDULER_ENABLED", "true").lower() == "true"
+
+Entry = models.CertificateExpirationEntry
+
+_lock = threading.Lock()
+_stats = {"runs": 0, "digests_written": 0, "certificates_reported": 0, "last_run_date": None}
+_scheduler: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def _window(day: date, threshold: int):
+    start = datetime.combine(day + timedelta(days=threshold), datetime.min.time())
+    return and_(Entry.expiration_date >= start, Entry.expiration_date < start + timedelta(days=1))
+
+def collect(db: Session, day: date) -> Dict:
+    """
+    Returns {company_id: {"company": Company, "items": {threshold: [entries]}}}.
+    Revoked certificates and those of deleted users/courses are left out.
+    """
+    revoked = exists().where(models.CertificateRevocation.certification_id == Entry.certification_id)
+    rows = db.query(Entry, models.Company)\
+        .join(models.Company, models.Company.id == Entry.company_id)\
+        .filter(or_(*[_window(day, t) for t in REMINDER_THRESHOLDS]), ~revoked, expiration_matrix.live_entries())\
+        .order_by(Entry.company_id, Entry.expiration_date, Entry.employee_name)\
+        .all()
+
+    grouped = {}
+    for entry, company in rows:
+        threshold = (entry.expiration_date.date() - day).days
+        company_digest = grouped.setdefault(company.id, {"company": company, "items": {t: [] for t in REMINDER_THRESHOLDS}})
+        company_digest["items"][threshold].append(entry)
+    return grouped
+
+def render(company: models.Company, items: Dict[int, List], day: date) -> tuple:
+    total = sum(len(entries) for entries in items.values())
+    subject = f"NexorAlturas: {total} certificado(s) por vencer - {company.name}"
+    lines = [
+        f"Hola {company.name},",
+        "",
+        f"Estas son las certificaciones de sus trabajadores próximas a vencer (corte {day.isoformat()}).",
+    ]
+    for threshold in REMINDER_THRESHOLDS:
+        entries = items[threshold]
+        if not entries:
+            continue
+        lines += ["", f"Vencen en {threshold} días:"]
+        for entry in entries:
+            lines.append(
+                f"  - {entry.employee_name} ({entry.document_id}): {entry.course_name}, "
+                f"vence el {entry.expiration_date.strftime('%Y-%m-%d')}"
+            )
+    lines += ["", "Programe el reentrenamiento desde el portal corporativo para evitar suspensiones.", "", "NEXOR ALTURAS S.A.S"]
+    return subject, "\n".join(lines)
+
+def build_digests(db: Session, day: Optional[date] = None) -> dict:
+    """
+    Writes one outbox row per company with certificates in a reminder window.
+    Commits; safe to call several times for the same day.
+    """
+    day = day or datetime.utcnow().date()
+    grouped = collect(db, day)
+
+    rows = []
+    reported = 0
+    for company_id, digest in grouped.items():
+        company = digest["company"]
+        if not company.contact_email:
+            continue
+        subject, body = render(company, digest["items"], day)
+        rows.append({
+            "kind": "EXPIRY_DIGEST",
+            "dedup_key": f"expiry-digest:{company_id}:{day.isoformat()}",
+            "company_id": company_id,
+            "recipient": company.contact_email,
+            "subject": subject,
+            "body": body,
+            "status": models.OutboxStatus.PENDING,
+            "attempts": 0,
+            "created_at": datetime.utcnow()
+        })
+        reported += sum(len(entries) for entries in digest["items"].values())
+
+    written = 0
+    if rows:
+        result = db.execute(
+            pg_insert(models.EmailOutbox).values(rows).on_conflict_do_nothing(index_elements=["dedup_key"])
+        )
+        written = result.rowcount
+    db.commit()
+
+    with _lock:
+        _stats["runs"] += 1
+        _stats["digests_written"] += written
+        _stats["certificates_reported"] += reported
+        _stats["last_run_date"] = day.isoformat()
+    return {"date": day.isoformat(), "companies": len(rows), "digests_written": written, "certificates": reported}
+
+# --- Scheduler ---
+
+def _due(now: datetime) -> bool:
+    with _lock:
+        last_run = _stats["last_run_date"]
+    return now.hour >= DIGEST_HOUR_UTC and last_run != now.date().isoformat()
+
+def _tick():
+    if _due(datetime.utcnow()):
+        db = database.SessionLocal()
+        try:
+            build_digests(db)
+        finally:
+            db.close()
+    # Also retries mail left PENDING by an unreachable SMTP server
+    mailer.deliver_pending()
+
+def _run():
+    while not _stop.is_set():
+        try:
+            _tick()
+        except Exception as e:
+            print(f"Expiry digest scheduler error: {e}")
+        _stop.wait(DIGEST_CHECK_INTERVAL)
+
+def start():
+    global _scheduler
+    if _scheduler is not None or not DIGEST_SCHEDULER_ENABLED:
+        return
+    _stop.clear()
+    _scheduler = threading.Thread(target=_run, name="expiry-digest-scheduler", daemon=True)
+    _scheduler.start()
+
+def stop():
+    global _scheduler
+    _stop.set()
+    if _scheduler is not None:
+        _scheduler.join(timeout=5)
+        _scheduler = None
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "thresholds": list(REMINDER_THRESHOLDS), "hour_utc": DIGEST_HOUR_UTC, "mailer": mailer.stats()}
@@ -0,0 +1,120 @@
+from email.message import EmailMessage
+from datetime import datetime
+import os
+import smtplib
+import threading
+import models, database
+
+# Delivers rows of the email_outbox table over SMTP.
+# Producers only insert into the outbox (in their own transaction); this module
+# claims PENDING rows with SKIP LOCKED so several workers never send the same mail.
+# In development SMTP_HOST points at the mailhog container from docker-compose.
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "10"))
+MAIL_FROM = os.getenv("MAIL_FROM", "notificaciones@nexoralturas.com")
+DELIVERY_BATCH = int(os.getenv("MAIL_DELIVERY_BATCH", "50"))
+MAX_ATTEMPTS = 5
+
+_lock = threading.Lock()
+_stats = {"sent": 0, "failed": 0, "retried": 0, "connection_errors": 0}
+
+def _connect() -> smtplib.SMTP:
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_STARTTLS:
+        smtp.starttls()
+    if SMTP_USER:
+        smtp.login(SMTP_USER, SMTP_PASSWORD or "")
+    return smtp
+
+def _message(row: models.EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = row.recipient
+    message["Subject"] = row.subject
+    message.set_content(row.body)
+    return message
+
+def _count(key: str, amount: int = 1):
+    with _lock:
+        _stats[key] += amount
+
+def _deliver_batch(db, tried: set) -> dict:
+    query = db.query(models.EmailOutbox).filter(
+        models.EmailOutbox.status == models.OutboxStatus.PENDING
+    )
+    if tried:
+        # Rows that failed earlier in this run wait for the next one
+        query = query.filter(models.EmailOutbox.id.notin_(tried))
+    rows = query.order_by(models.EmailOutbox.created_at)\
+     .limit(DELIVERY_BATCH)\
+     .with_for_update(skip_locked=True)\
+     .all()
+    if not rows:
+        return {"sent": 0, "failed": 0, "claimed": 0}
+    tried.update(row.id for row in rows)
+
+    try:
+        smtp = _connect()
+    except (OSError, smtplib.SMTPException) as e:
+        # Server unreachable: leave the rows PENDING for the next run
+        db.rollback()
+        _count("connection_errors")
+        print(f"SMTP connection failed: {e}")
+        return {"sent": 0, "failed": 0, "claimed": len(rows), "error": str(e)}
+
+    sent = failed = 0
+    try:
+        for row in rows:
+            row.attempts = (row.attempts or 0) + 1
+            try:
+                smtp.send_message(_message(row))
+                row.status = models.OutboxStatus.SENT
+                row.sent_at = datetime.utcnow()
+                row.error = None
+                sent += 1
+            except smtplib.SMTPException as e:
+                row.error = str(e)[:500]
+                if row.attempts >= MAX_ATTEMPTS:
+                    row.status = models.OutboxStatus.FAILED
+                    failed += 1
+                else:
+                    _count("retried")
+    finally:
+        try:
+            smtp.quit()
+        except (OSError, smtplib.SMTPException):
+            pass
+    db.commit()
+
+    _count("sent", sent)
+    _count("failed", failed)
+    return {"sent": sent, "failed": failed, "claimed": len(rows)}
+
+def deliver_pending(max_batches: int = 20) -> dict:
+    """
+    Sends pending outbox mail in batches of DELIVERY_BATCH (own session).
+    """
+    totals = {"sent": 0, "failed": 0}
+    tried = set()
+    db = database.SessionLocal()
+    try:
+        for _ in range(max_batches):
+            result = _deliver_batch(db, tried)
+            totals["sent"] += result["sent"]
+            totals["failed"] += result["failed"]
+            if "error" in result:
+                totals["error"] = result["error"]
+                break
+            if result["claimed"] < DELIVERY_BATCH:
+                break
+    finally:
+        db.close()
+    return totals
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "smtp": f"{SMTP_HOST}:{SMTP_PORT}"}
@@ -1,13 +1,74 @@
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.pdfgen import canvas
+from reportlab.graphics.barcode import qr
+from reportlab.graphics.shapes import Drawing
+from reportlab.graphics import renderPDF
 from datetime import datetime
-import uuid
+import os
 
-def generate_certificate_pdf(user, course, cert_code):
+CERTIFICATE_DIR = "certificates"
+
+if not os.path.exists(CERTIFICATE_DIR):
+    os.makedirs(CERTIFICATE_DIR)
+
+def generate_certificate_pdf(user, course, cert_code, issue_date=None, expiration_date=None, signed_payload=None):
     """
-    Simulates PDF generation.
-    In a real implementation, this would use reportlab or weasyprint.
+    Renders the course certificate with reportlab and returns the file path.
+    Runs inside the utils/pdf_renderer process pool.
     """
-    # For now, return a mock URL or a local file path if we were actually saving files.
-    # We'll assume the frontend handles this or we serve static files.
-    
-    # Mock URL
-    return f"https://nexor-certs.s3.amazonaws.com/{cert_code}.pdf"
+    filename = f"certificate_{cert_code}.pdf"
+    filepath = os.path.join(CERTIFICATE_DIR, filename)
+    issue_date = issue_date or datetime.utcnow()
+
+    c = canvas.Canvas(filepath, pagesize=landscape(letter))
+    width, height = landscape(letter)
+
+    # Border
+    c.setLineWidth(3)
+    c.rect(30, 30, width - 60, height - 60)
+
+    # Header
+    c.setFont("Helvetica-Bold", 22)
+    c.drawCentredString(width / 2, height - 90, "NEXOR ALTURAS S.A.S")
+    c.setFont("Helvetica", 12)
+    c.drawCentredString(width / 2, height - 110, "NIT: 900.123.456-7")
+
+    c.setFont("Helvetica-Bold", 28)
+    c.drawCentredString(width / 2, height - 170, "CERTIFICADO DE APROBACIÓN")
+
+    # Student
+    c.setFont("Helvetica", 14)
+    c.drawCentredString(width / 2, height - 220, "Certifica que")
+    c.setFont("Helvetica-Bold", 20)
+    c.drawCentredString(width / 2, height - 250, user.full_name)
+    c.setFont("Helvetica", 12)
+    c.drawCentredString(width / 2, height - 270, f"Documento: {user.document_id}")
+
+    # Course
+    c.setFont("Helvetica", 14)
+    c.drawCentredString(width / 2, height - 310, "aprobó satisfactoriamente el curso")
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(width / 2, height - 335, course.name)
+    c.setFont("Helvetica", 12)
+    c.drawCentredString(width / 2, height - 355, f"Intensidad horaria: {course.required_hours} horas")
+
+    # Dates and code
+    c.setFont("Helvetica", 11)
+    c.drawString(70, 90, f"Fecha de emisión: {issue_date.strftime('%Y-%m-%d')}")
+    if expiration_date:
+        c.drawString(70, 75, f"Fecha de vencimiento: {expiration_date.strftime('%Y-%m-%d')}")
+    c.drawRightString(width - 70, 90, f"Código: {cert_code}")
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawRightString(width - 70, 75, "Verifique la autenticidad en /certificates/validate/<código>")
+
+    # Signed QR: verifiable offline with the published public key
+    if signed_payload:
+        size = 110
+        widget = qr.QrCodeWidget(signed_payload)
+        x1, y1, x2, y2 = widget.getBounds()
+        drawing = Drawing(size, size, transform=[size / (x2 - x1), 0, 0, size / (y2 - y1), 0, 0])
+        drawing.add(widget)
+        renderPDF.draw(drawing, c, width - 70 - size, 100)
+
+    c.save()
+    return filepath
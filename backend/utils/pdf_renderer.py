@@ -0,0 +1,317 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from types import SimpleNamespace
+from typing import List, Optional
+from datetime import datetime, timedelta
+import json
+import os
+import threading
+import uuid
+import multiprocessing
+
+import models, database
+from utils import certificate_validation
+
+# Shared PDF rendering service (invoices, work permits, certificates).
+# Requests only insert a RenderJob row; a dispatcher thread claims PENDING rows
+# with SKIP LOCKED (safe with several API workers), renders them in a process pool
+# and writes the file path back to the job and to the rendered resource.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+POLL_INTERVAL = float(os.getenv("RENDER_POLL_INTERVAL", "2"))
+JOB_TIMEOUT = int(os.getenv("RENDER_JOB_TIMEOUT", "300"))
+MAX_ATTEMPTS = 3
+
+# Where the finished file path is stored for each kind
+_TARGETS = {
+    models.RenderKind.INVOICE: (models.Payment, "invoice_url"),
+    models.RenderKind.PERMIT: (models.WorkPermit, "pdf_url"),
+    models.RenderKind.CERTIFICATE: (models.Certification, "pdf_url"),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_lock = threading.Lock()
+_in_flight = set()
+_stats = {"enqueued": 0, "completed": 0, "failed": 0, "retried": 0, "requeued_stale": 0}
+
+_dispatcher: Optional[threading.Thread] = None
+_stop = threading.Event()
+_wake = threading.Event()
+
+# --- Payload snapshots (built in the request, rendered in another process) ---
+
+def invoice_payload(payment: models.Payment, user: models.User, course_name: str) -> dict:
+    return {
+        "payment_id": str(payment.id),
+        "amount": payment.amount,
+        "user": {"full_name": user.full_name, "document_id": user.document_id, "email": user.email},
+        "course_name": course_name
+    }
+
+def permit_payload(permit: models.WorkPermit, user: models.User) -> dict:
+    return {
+        "permit_id": str(permit.id),
+        "created_at": permit.created_at.isoformat(),
+        "location": permit.location,
+        "task_description": permit.task_description,
+        "hazards": permit.hazards,
+        "precautions": permit.precautions,
+        "user": {"full_name": user.full_name, "document_id": user.document_id}
+    }
+
+def certificate_payload(
+    user: models.User,
+    course: models.Course,
+    cert_code: str,
+    issue_date: datetime,
+    expiration_date: datetime,
+    signed_payload: Optional[str] = None
+) -> dict:
+    return {
+        "certificate_code": cert_code,
+        "signed_payload": signed_payload,
+        "issue_date": issue_date.isoformat() if issue_date else None,
+        "expiration_date": expiration_date.isoformat() if expiration_date else None,
+        "user": {"full_name": user.full_name, "document_id": user.document_id},
+        "course": {"name": course.name, "required_hours": course.required_hours}
+    }
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def render(kind: str, payload: dict) -> str:
+    """
+    Runs in a pool process: renders one PDF from its payload and returns the file path.
+    """
+    user = SimpleNamespace(**payload["user"])
+    if kind == models.RenderKind.INVOICE.value:
+        from utils.invoice_generator import generate_invoice_pdf
+        payment = SimpleNamespace(id=uuid.UUID(payload["payment_id"]), amount=payload["amount"])
+        return generate_invoice_pdf(payment, user, payload["course_name"])
+    if kind == models.RenderKind.PERMIT.value:
+        from utils.permit_generator import generate_permit_pdf
+        permit = SimpleNamespace(
+            id=uuid.UUID(payload["permit_id"]),
+            created_at=_parse_datetime(payload["created_at"]),
+            location=payload["location"],
+            task_description=payload["task_description"],
+            hazards=payload["hazards"],
+            precautions=payload["precautions"]
+        )
+        return generate_permit_pdf(permit, user)
+    if kind == models.RenderKind.CERTIFICATE.value:
+        from utils.pdf_generator import generate_certificate_pdf
+        return generate_certificate_pdf(
+            user,
+            SimpleNamespace(**payload["course"]),
+            payload["certificate_code"],
+            issue_date=_parse_datetime(payload["issue_date"]),
+            expiration_date=_parse_datetime(payload["expiration_date"]),
+            signed_payload=payload.get("signed_payload")
+        )
+    raise ValueError(f"Unknown render kind {kind}")
+
+# --- Queue ---
+
+def enqueue(
+    db: Session,
+    kind: models.RenderKind,
+    resource_id: uuid.UUID,
+    payload: dict,
+    owner_id: Optional[uuid.UUID] = None,
+    batch_id: Optional[uuid.UUID] = None
+) -> models.RenderJob:
+    """
+    Adds a render job to the request session (committed by the caller).
+    Call wake() after the commit so the dispatcher picks it up immediately.
+    """
+    job = models.RenderJob(
+        id=uuid.uuid4(),
+        kind=kind,
+        resource_id=resource_id,
+        owner_id=owner_id,
+        batch_id=batch_id,
+        status=models.RenderJobStatus.PENDING,
+        payload=json.dumps(payload),
+        attempts=0,
+        created_at=datetime.utcnow()
+    )
+    db.add(job)
+    with _lock:
+        _stats["enqueued"] += 1
+    return job
+
+def wake():
+    _wake.set()
+
+def batch_progress(db: Session, batch_id: uuid.UUID) -> dict:
+    # One grouped count over the batch index
+    counts = {status.value: 0 for status in models.RenderJobStatus}
+    rows = db.query(models.RenderJob.status, func.count()).filter(
+        models.RenderJob.batch_id == batch_id
+    ).group_by(models.RenderJob.status).all()
+    for status, count in rows:
+        counts[status.value] = count
+    return counts
+
+def download_url(job: models.RenderJob) -> Optional[str]:
+    if job.status != models.RenderJobStatus.COMPLETED:
+        return None
+    return f"/renders/{job.id}/file"
+
+# --- Dispatcher ---
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded API worker is not safe
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _shutdown_pool(wait: bool):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
+
+def _requeue_stale(db: Session):
+    # RUNNING rows left behind by a crashed/restarted worker
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_TIMEOUT)
+    count = db.query(models.RenderJob).filter(
+        models.RenderJob.status == models.RenderJobStatus.RUNNING,
+        models.RenderJob.started_at < cutoff
+    ).update({"status": models.RenderJobStatus.PENDING}, synchronize_session=False)
+    db.commit()
+    if count:
+        with _lock:
+            _stats["requeued_stale"] += count
+
+def _claim(db: Session, limit: int) -> List[tuple]:
+    jobs = db.query(models.RenderJob).filter(
+        models.RenderJob.status == models.RenderJobStatus.PENDING
+    ).order_by(models.RenderJob.created_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    now = datetime.utcnow()
+    claimed = []
+    for job in jobs:
+        job.status = models.RenderJobStatus.RUNNING
+        job.started_at = now
+        job.attempts = (job.attempts or 0) + 1
+        claimed.append((job.id, job.kind, json.loads(job.payload)))
+    db.commit()
+    return claimed
+
+def _finish(job_id: uuid.UUID, kind: models.RenderKind, path: Optional[str], error: Optional[str]):
+    db = database.SessionLocal()
+    try:
+        job = db.query(models.RenderJob).filter(models.RenderJob.id == job_id).first()
+        if not job:
+            return
+        validation_keys = None
+        if error is None:
+            job.status = models.RenderJobStatus.COMPLETED
+            job.output_path = path
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            model, column = _TARGETS[kind]
+            db.query(model).filter(model.id == job.resource_id).update({column: path}, synchronize_session=False)
+            if kind == models.RenderKind.CERTIFICATE:
+                validation_keys = certificate_validation.set_pdf_url(db, job.resource_id, path)
+        elif job.attempts < MAX_ATTEMPTS:
+            job.status = models.RenderJobStatus.PENDING
+            job.error = error
+        else:
+            job.status = models.RenderJobStatus.FAILED
+            job.error = error
+            job.finished_at = datetime.utcnow()
+        db.commit()
+        if validation_keys:
+            certificate_validation.invalidate(codes=[validation_keys[0]], document_ids=[validation_keys[1]])
+        with _lock:
+            if error is None:
+                _stats["completed"] += 1
+            elif job.status == models.RenderJobStatus.PENDING:
+                _stats["retried"] += 1
+            else:
+                _stats["failed"] += 1
+    except Exception as e:
+        db.rollback()
+        print(f"Error finishing render job {job_id}: {e}")
+    finally:
+        db.close()
+        with _lock:
+            _in_flight.discard(job_id)
+
+def _on_done(job_id: uuid.UUID, kind: models.RenderKind, future):
+    path, error = None, None
+    try:
+        path = future.result()
+    except BrokenProcessPool as e:
+        # A worker died (e.g. OOM kill): recreate the pool on next dispatch
+        _shutdown_pool(wait=False)
+        error = f"Render worker crashed: {e}"
+    except Exception as e:
+        error = str(e)
+    _finish(job_id, kind, path, error)
+    wake() # A slot is free
+
+def _dispatch_once() -> int:
+    with _lock:
+        capacity = RENDER_WORKERS * 2 - len(_in_flight)
+    if capacity <= 0:
+        return 0
+
+    db = database.SessionLocal()
+    try:
+        _requeue_stale(db)
+        claimed = _claim(db, capacity)
+    finally:
+        db.close()
+
+    for job_id, kind, payload in claimed:
+        with _lock:
+            _in_flight.add(job_id)
+        try:
+            future = get_pool().submit(render, kind.value, payload)
+        except (BrokenProcessPool, RuntimeError) as e:
+            _shutdown_pool(wait=False)
+            _finish(job_id, kind, None, f"Render pool unavailable: {e}")
+            continue
+        future.add_done_callback(partial(_on_done, job_id, kind))
+    return len(claimed)
+
+def _run():
+    while not _stop.is_set():
+        _wake.clear()
+        try:
+            _dispatch_once()
+        except Exception as e:
+            print(f"Render dispatcher error: {e}")
+        _wake.wait(POLL_INTERVAL)
+
+def start():
+    global _dispatcher
+    if _dispatcher is not None:
+        return
+    _stop.clear()
+    _dispatcher = threading.Thread(target=_run, name="pdf-render-dispatcher", daemon=True)
+    _dispatcher.start()
+
+def stop():
+    global _dispatcher
+    _stop.set()
+    _wake.set()
+    if _dispatcher is not None:
+        _dispatcher.join(timeout=POLL_INTERVAL + 1)
+        _dispatcher = None
+    # Lets in-flight renders finish; anything left RUNNING is requeued after JOB_TIMEOUT
+    _shutdown_pool(wait=True)
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "in_flight": len(_in_flight), "workers": RENDER_WORKERS}
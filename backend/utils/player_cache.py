@@ -0,0 +1,68 @@
+from typing import Dict, Optional
+import os
+import threading
+import time
+import uuid
+
+# In-process cache of the static part of the course player: the course with its
+# trainer and ordered modules, serialized once per course. The per-user state
+# (enrollment, progress, quiz results) is read on every request and merged on top
+# (routers/courses.get_course_player).
+# Invalidated on course/module/trainer edits; the TTL bounds staleness when a write
+# lands on another worker process.
+PLAYER_CACHE_TTL = int(os.getenv("PLAYER_CACHE_TTL", "300"))
+MAX_COURSES = int(os.getenv("PLAYER_CACHE_MAX_COURSES", "500"))
+
+class CachedStructure:
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.module_ids = [m["id"] for m in payload["modules"]]
+        self.created = time.monotonic()
+
+_lock = threading.Lock()
+_cached: Dict[uuid.UUID, CachedStructure] = {}
+_version = 0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def version() -> int:
+    return _version
+
+def get(course_id: uuid.UUID) -> Optional[CachedStructure]:
+    with _lock:
+        cached = _cached.get(course_id)
+        if cached is None or time.monotonic() - cached.created > PLAYER_CACHE_TTL:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        return cached
+
+def store(built_version: int, course_id: uuid.UUID, payload: dict) -> CachedStructure:
+    """
+    Caches the structure unless an invalidation happened while it was being built.
+    """
+    entry = CachedStructure(payload)
+    with _lock:
+        if built_version == _version:
+            if len(_cached) >= MAX_COURSES and course_id not in _cached:
+                _cached.pop(next(iter(_cached)))
+            _cached[course_id] = entry
+    return entry
+
+def invalidate(course_id: Optional[uuid.UUID] = None):
+    """
+    Drops one course (module edits) or every course (trainer or bulk changes).
+    """
+    global _version
+    with _lock:
+        _version += 1
+        if course_id is None:
+            _cached.clear()
+        else:
+            if not isinstance(course_id, uuid.UUID):
+                course_id = uuid.UUID(str(course_id))
+            _cached.pop(course_id, None)
+        _stats["invalidations"] += 1
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "cached_courses": len(_cached), "ttl_seconds": PLAYER_CACHE_TTL}
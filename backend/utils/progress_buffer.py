@@ -0,0 +1,273 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import anyio
+import functools
+import os
+import threading
+import time
+import uuid
+import models, database
+
+# Write-coalescing buffer for module progress heartbeats.
+# Keeps only the latest status/seconds per (user, module) and flushes them as one
+# batched upsert every PROGRESS_FLUSH_INTERVAL seconds, or immediately when a
+# module becomes COMPLETED. Reads go through overlay() to see pending writes.
+FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "5"))
+ENROLLMENT_CACHE_TTL = int(os.getenv("PROGRESS_ENROLLMENT_TTL", "300"))
+MAX_KNOWN_IDS = 100000
+
+Key = Tuple[uuid.UUID, uuid.UUID]
+
+_lock = threading.Lock()
+_pending: Dict[Key, dict] = {}
+_known_ids = OrderedDict() # (user_id, module_id) -> module_progress.id
+_enrollments = {} # (user_id, course_id) -> expires_at
+_stats = {"accepted": 0, "coalesced": 0, "flushes": 0, "flushed_rows": 0, "failed_rows": 0}
+
+_flusher: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def _enrollment_cached(key: Tuple[uuid.UUID, uuid.UUID]) -> bool:
+    with _lock:
+        expires_at = _enrollments.get(key)
+    return bool(expires_at and expires_at > time.monotonic())
+
+def _enrollment_query(user_id: uuid.UUID, course_id: uuid.UUID):
+    return select(models.Enrollment.id).where(
+        models.Enrollment.user_id == user_id,
+        models.Enrollment.course_id == course_id
+    ).limit(1)
+
+def _remember_enrollment(key: Tuple[uuid.UUID, uuid.UUID]):
+    with _lock:
+        _enrollments[key] = time.monotonic() + ENROLLMENT_CACHE_TTL
+
+def is_enrolled(db: Session, user_id: uuid.UUID, course_id: uuid.UUID) -> bool:
+    key = (user_id, course_id)
+    if _enrollment_cached(key):
+        return True
+
+    enrolled = db.execute(_enrollment_query(user_id, course_id)).first() is not None
+    if enrolled:
+        _remember_enrollment(key)
+    return enrolled
+
+async def is_enrolled_async(db: AsyncSession, user_id: uuid.UUID, course_id: uuid.UUID) -> bool:
+    key = (user_id, course_id)
+    if _enrollment_cached(key):
+        return True
+
+    enrolled = (await db.execute(_enrollment_query(user_id, course_id))).first() is not None
+    if enrolled:
+        _remember_enrollment(key)
+    return enrolled
+
+def forget_enrollment(user_id: uuid.UUID, course_id: uuid.UUID):
+    with _lock:
+        _enrollments.pop((user_id, course_id), None)
+
+def _known_row_id(key: Key) -> Optional[uuid.UUID]:
+    with _lock:
+        pending = _pending.get(key)
+        if pending:
+            return pending["id"]
+        return _known_ids.get(key)
+
+def _row_id_query(key: Key):
+    # First heartbeat of this (user, module) seen by this worker
+    return select(models.ModuleProgress.id).where(
+        models.ModuleProgress.user_id == key[0],
+        models.ModuleProgress.module_id == key[1]
+    ).limit(1)
+
+def _row_id(db: Session, key: Key) -> uuid.UUID:
+    row_id = _known_row_id(key)
+    if row_id:
+        return row_id
+    existing = db.execute(_row_id_query(key)).first()
+    return existing.id if existing else uuid.uuid4()
+
+async def _row_id_async(db: AsyncSession, key: Key) -> uuid.UUID:
+    row_id = _known_row_id(key)
+    if row_id:
+        return row_id
+    existing = (await db.execute(_row_id_query(key))).first()
+    return existing.id if existing else uuid.uuid4()
+
+def record(db: Session, user_id: uuid.UUID, module_id: uuid.UUID, status: str, seconds_spent: int) -> dict:
+    """
+    Accepts a heartbeat into the buffer and returns the progress snapshot.
+    COMPLETED transitions are flushed synchronously with the request session.
+    """
+    key = (user_id, module_id)
+    snapshot = _accept(key, _row_id(db, key), status, seconds_spent)
+    if status == "COMPLETED":
+        flush(db, keys=[key])
+    return snapshot
+
+async def record_async(db: AsyncSession, user_id: uuid.UUID, module_id: uuid.UUID, status: str, seconds_spent: int) -> dict:
+    """
+    record() for the async session. COMPLETED transitions are flushed before
+    returning, on a worker thread with their own session (they are rare).
+    """
+    key = (user_id, module_id)
+    snapshot = _accept(key, await _row_id_async(db, key), status, seconds_spent)
+    if status == "COMPLETED":
+        await anyio.to_thread.run_sync(functools.partial(flush, keys=[key]))
+    return snapshot
+
+def _accept(key: Key, row_id: uuid.UUID, status: str, seconds_spent: int) -> dict:
+    snapshot = {
+        "id": row_id,
+        "user_id": key[0],
+        "module_id": key[1],
+        "status": status,
+        "seconds_spent": seconds_spent,
+        "last_updated": datetime.utcnow()
+    }
+
+    with _lock:
+        if key in _pending:
+            _stats["coalesced"] += 1
+            # Same rule as the upsert: time spent never goes down
+            snapshot["seconds_spent"] = max(snapshot["seconds_spent"], _pending[key]["seconds_spent"])
+        _pending[key] = snapshot
+        _remember(key, snapshot["id"])
+        _stats["accepted"] += 1
+    return snapshot
+
+def _remember(key: Key, row_id: uuid.UUID):
+    _known_ids[key] = row_id
+    _known_ids.move_to_end(key)
+    while len(_known_ids) > MAX_KNOWN_IDS:
+        _known_ids.popitem(last=False)
+
+def overlay(user_id: uuid.UUID, rows: List[models.ModuleProgress]) -> List[dict]:
+    """
+    Merges persisted progress rows of a user with the pending (newer) heartbeats.
+    """
+    merged = {}
+    for row in rows:
+        merged[row.module_id] = {
+            "id": row.id,
+            "user_id": row.user_id,
+            "module_id": row.module_id,
+            "status": row.status,
+            "seconds_spent": row.seconds_spent,
+            "last_updated": row.last_updated
+        }
+    with _lock:
+        for (pending_user, module_id), snapshot in _pending.items():
+            if pending_user == user_id:
+                merged[module_id] = dict(snapshot)
+    return list(merged.values())
+
+def _upsert(db: Session, snapshots: List[dict]):
+    stmt = pg_insert(models.ModuleProgress).values(snapshots)
+    stmt = stmt.on_conflict_do_update(
+        # Natural key: two workers may each pick a fresh id for the same first heartbeat
+        index_elements=[models.ModuleProgress.user_id, models.ModuleProgress.module_id],
+        set_={
+            "status": stmt.excluded.status,
+            # Heartbeats from several workers may flush out of order
+            "seconds_spent": func.greatest(models.ModuleProgress.seconds_spent, stmt.excluded.seconds_spent),
+            "last_updated": stmt.excluded.last_updated
+        }
+    )
+    db.execute(stmt)
+
+def flush(db: Optional[Session] = None, keys: Optional[List[Key]] = None) -> int:
+    """
+    Writes pending heartbeats (all, or only `keys`) as one batched upsert.
+    With a caller's session, errors are raised to the caller (after requeueing
+    the batch) and its transaction is left for it to roll back.
+    """
+    with _lock:
+        if keys is None:
+            batch = list(_pending.values())
+            _pending.clear()
+        else:
+            batch = [_pending.pop(k) for k in keys if k in _pending]
+    if not batch:
+        return 0
+
+    if db is not None:
+        try:
+            _upsert(db, batch)
+            db.commit()
+        except Exception:
+            _requeue(batch)
+            raise
+        _count_flush(len(batch))
+        return len(batch)
+
+    db = database.SessionLocal()
+    written = 0
+    try:
+        try:
+            _upsert(db, batch)
+            db.commit()
+            written = len(batch)
+        except IntegrityError:
+            # e.g. the module/user was deleted meanwhile: write row by row and drop the bad ones
+            db.rollback()
+            for snapshot in batch:
+                try:
+                    with db.begin_nested():
+                        _upsert(db, [snapshot])
+                    written += 1
+                except IntegrityError:
+                    with _lock:
+                        _known_ids.pop((snapshot["user_id"], snapshot["module_id"]), None)
+                        _stats["failed_rows"] += 1
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        _requeue(batch)
+        print(f"Progress flush failed, will retry: {e}")
+    finally:
+        db.close()
+
+    _count_flush(written)
+    return written
+
+def _requeue(batch: List[dict]):
+    # Unless a newer heartbeat arrived meanwhile
+    with _lock:
+        for snapshot in batch:
+            _pending.setdefault((snapshot["user_id"], snapshot["module_id"]), snapshot)
+
+def _count_flush(written: int):
+    with _lock:
+        _stats["flushes"] += 1
+        _stats["flushed_rows"] += written
+
+def _run():
+    while not _stop.wait(FLUSH_INTERVAL):
+        flush()
+
+def start():
+    global _flusher
+    if _flusher is not None:
+        return
+    _stop.clear()
+    _flusher = threading.Thread(target=_run, name="progress-flusher", daemon=True)
+    _flusher.start()
+
+def stop():
+    global _flusher
+    _stop.set()
+    if _flusher is not None:
+        _flusher.join(timeout=FLUSH_INTERVAL)
+        _flusher = None
+    flush()
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "pending": len(_pending), "flush_interval_seconds": FLUSH_INTERVAL}
@@ -0,0 +1,351 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, update, or_
+from typing import Callable, Optional
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+import uuid
+import models, database
+from utils import auth_cache, catalog_cache, certificate_validation, player_cache, progress_buffer, quiz_engine, revocations
+
+# Background cascade delete of users and courses.
+# The DELETE request only tombstones the row (deleted_at, hidden from reads) and
+# queues a PurgeJob. A worker thread claims jobs with SKIP LOCKED and walks the
+# entity's plan: each step deletes (or detaches) at most PURGE_BATCH_SIZE dependent
+# rows per statement, selected by id subquery, and commits the batch together with
+# the job progress. Locks stay short and a crashed worker resumes at the same step.
+BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+BATCH_PAUSE = float(os.getenv("PURGE_BATCH_PAUSE", "0.05")) # leaves room for foreground writes
+POLL_INTERVAL = float(os.getenv("PURGE_POLL_INTERVAL", "2"))
+JOB_TIMEOUT = int(os.getenv("PURGE_JOB_TIMEOUT", "300")) # RUNNING without a batch for this long: requeued
+MAX_ATTEMPTS = 3
+
+_lock = threading.Lock()
+_stats = {"requested": 0, "completed": 0, "failed": 0, "retried": 0, "requeued_stale": 0, "batches": 0, "deleted_rows": 0}
+
+_worker: Optional[threading.Thread] = None
+_stop = threading.Event()
+_wake = threading.Event()
+
+# --- Plans ---
+
+class _Delete:
+    """
+    Deletes up to BATCH_SIZE rows of `model` matching where(entity_id) per call.
+    on_rows receives the `returning` columns of the deleted rows.
+    """
+    def __init__(self, model, where: Callable, returning: tuple = (), on_rows: Optional[Callable] = None):
+        self.model = model
+        self.name = model.__tablename__
+        self.where = where
+        self.returning = returning
+        self.on_rows = on_rows
+
+    def _batch_ids(self, entity_id):
+        pk = self.model.__mapper__.primary_key[0]
+        return pk.in_(select(pk).where(self.where(entity_id)).limit(BATCH_SIZE).scalar_subquery())
+
+    def _statement(self, entity_id):
+        return delete(self.model).where(self._batch_ids(entity_id))
+
+    def run(self, db: Session, job: models.PurgeJob) -> int:
+        stmt = self._statement(job.entity_id)
+        if self.returning:
+            stmt = stmt.returning(*self.returning)
+        result = db.execute(stmt.execution_options(synchronize_session=False))
+        if self.returning:
+            rows = result.all()
+            if self.on_rows:
+                self.on_rows(rows)
+            return len(rows)
+        return result.rowcount
+
+class _Detach(_Delete):
+    # Clears a nullable reference instead of deleting the row
+    def __init__(self, column):
+        super().__init__(column.class_, lambda entity_id: column == entity_id)
+        self.name = f"{column.class_.__tablename__}.{column.key}"
+        self.column = column
+
+    def _statement(self, entity_id):
+        return update(self.model).where(self._batch_ids(entity_id)).values({self.column.key: None})
+
+class _Once:
+    # A set-based statement run once (it is idempotent)
+    def __init__(self, name: str, fn: Callable):
+        self.name = name
+        self.fn = fn
+
+    def run(self, db: Session, job: models.PurgeJob) -> int:
+        self.fn(db, job)
+        return 0
+
+def _forget_enrollments(rows):
+    for row in rows:
+        progress_buffer.forget_enrollment(row.user_id, row.course_id)
+
+def _enrollments_of(column):
+    return lambda entity_id: select(models.Enrollment.id).where(column == entity_id)
+
+def _user_plan() -> list:
+    M = models
+    user_enrollments = _enrollments_of(M.Enrollment.user_id)
+    return [
+        _Delete(M.AttendanceRecord, lambda u: M.AttendanceRecord.enrollment_id.in_(user_enrollments(u))),
+        _Delete(M.Document, lambda u: or_(M.Document.user_id == u, M.Document.enrollment_id.in_(user_enrollments(u)))),
+        _Delete(M.Enrollment, lambda u: M.Enrollment.user_id == u,
+                returning=(M.Enrollment.user_id, M.Enrollment.course_id), on_rows=_forget_enrollments),
+        _Delete(M.PracticeBooking, lambda u: M.PracticeBooking.student_id == u),
+        _Delete(M.CertificateExpirationEntry, lambda u: M.CertificateExpirationEntry.user_id == u),
+        _Delete(M.CertificateValidation, lambda u: M.CertificateValidation.user_id == u),
+        # Printed QR tokens stay verifiable offline: publish their codes as revoked
+        _Once("certificate_revocations", lambda db, job: revocations.revoke_where(
+            db, M.Certification.user_id == job.entity_id, "Holder deleted", job.requested_by)),
+        _Delete(M.Certification, lambda u: M.Certification.user_id == u),
+        _Delete(M.EmergencyAlert, lambda u: M.EmergencyAlert.user_id == u),
+        _Delete(M.Survey, lambda u: M.Survey.user_id == u),
+        _Delete(M.PQRSF, lambda u: M.PQRSF.user_id == u),
+        _Delete(M.WorkPermit, lambda u: M.WorkPermit.user_id == u),
+        _Delete(M.QuizSession, lambda u: M.QuizSession.user_id == u),
+        _Delete(M.QuizAttempt, lambda u: M.QuizAttempt.user_id == u),
+        _Delete(M.ModuleProgress, lambda u: M.ModuleProgress.user_id == u),
+        _Delete(M.Payment, lambda u: M.Payment.user_id == u),
+        _Delete(M.Inspection, lambda u: M.Inspection.inspector_id == u),
+        _Detach(M.Course.trainer_id),
+        _Detach(M.PracticeSession.trainer_id),
+        _Detach(M.ImportJob.created_by),
+        _Detach(M.RenderJob.owner_id),
+        # Audit logs are kept: the trail outlives the user (no FK on audit_logs.user_id)
+        _Delete(M.User, lambda u: M.User.id == u),
+    ]
+
+def _course_plan() -> list:
+    M = models
+    course_enrollments = _enrollments_of(M.Enrollment.course_id)
+    course_sessions = lambda c: select(M.PracticeSession.id).where(M.PracticeSession.course_id == c)
+    course_modules = lambda c: select(M.Module.id).where(M.Module.course_id == c)
+    return [
+        _Delete(M.CertificateExpirationEntry, lambda c: M.CertificateExpirationEntry.course_id == c),
+        _Delete(M.CertificateValidation, lambda c: M.CertificateValidation.course_id == c),
+        _Once("certificate_revocations", lambda db, job: revocations.revoke_where(
+            db, M.Certification.course_id == job.entity_id, "Course deleted", job.requested_by)),
+        _Delete(M.Certification, lambda c: M.Certification.course_id == c),
+        _Delete(M.Survey, lambda c: M.Survey.course_id == c),
+        _Delete(M.PracticeBooking, lambda c: M.PracticeBooking.session_id.in_(course_sessions(c))),
+        _Delete(M.PracticeSession, lambda c: M.PracticeSession.course_id == c),
+        _Delete(M.AttendanceRecord, lambda c: M.AttendanceRecord.enrollment_id.in_(course_enrollments(c))),
+        _Delete(M.Document, lambda c: M.Document.enrollment_id.in_(course_enrollments(c))),
+        _Delete(M.Enrollment, lambda c: M.Enrollment.course_id == c,
+                returning=(M.Enrollment.user_id, M.Enrollment.course_id), on_rows=_forget_enrollments),
+        _Delete(M.QuizSession, lambda c: M.QuizSession.module_id.in_(course_modules(c))),
+        _Delete(M.QuizAttempt, lambda c: M.QuizAttempt.module_id.in_(course_modules(c))),
+        _Delete(M.ModuleProgress, lambda c: M.ModuleProgress.module_id.in_(course_modules(c))),
+        _Delete(M.Question, lambda c: M.Question.module_id.in_(course_modules(c))),
+        _Delete(M.Module, lambda c: M.Module.course_id == c),
+        _Delete(M.Course, lambda c: M.Course.id == c),
+    ]
+
+PLANS = {
+    models.PurgeEntity.USER: _user_plan(),
+    models.PurgeEntity.COURSE: _course_plan(),
+}
+
+# --- Requests ---
+
+def _active_job(db: Session, entity: models.PurgeEntity, entity_id) -> Optional[models.PurgeJob]:
+    return db.query(models.PurgeJob).filter(
+        models.PurgeJob.entity == entity,
+        models.PurgeJob.entity_id == entity_id,
+        models.PurgeJob.status.in_([models.PurgeJobStatus.PENDING, models.PurgeJobStatus.RUNNING])
+    ).first()
+
+def request_purge(db: Session, target, requested_by: Optional[uuid.UUID] = None) -> models.PurgeJob:
+    """
+    Tombstones a User or Course and queues its purge (commits).
+    A second request for the same entity returns the job already queued.
+    The caller invalidates the caches that show the entity.
+    """
+    entity = models.PurgeEntity.USER if isinstance(target, models.User) else models.PurgeEntity.COURSE
+    job = _active_job(db, entity, target.id)
+    if job is None:
+        job = models.PurgeJob(
+            id=uuid.uuid4(),
+            entity=entity,
+            entity_id=target.id,
+            label=target.full_name if entity == models.PurgeEntity.USER else target.name,
+            status=models.PurgeJobStatus.PENDING,
+            step=0,
+            deleted_rows=0,
+            attempts=0,
+            requested_by=requested_by,
+            created_at=datetime.utcnow()
+        )
+        db.add(job)
+        with _lock:
+            _stats["requested"] += 1
+    if target.deleted_at is None:
+        target.deleted_at = datetime.utcnow()
+    db.commit()
+    wake()
+    return job
+
+def progress(job: models.PurgeJob) -> dict:
+    plan = PLANS[job.entity]
+    running = job.status in (models.PurgeJobStatus.PENDING, models.PurgeJobStatus.RUNNING)
+    return {
+        "id": job.id,
+        "entity": job.entity.value,
+        "entity_id": job.entity_id,
+        "label": job.label,
+        "status": job.status.value,
+        "step": job.step,
+        "total_steps": len(plan),
+        "current_step": plan[job.step].name if running and job.step < len(plan) else None,
+        "deleted_rows": job.deleted_rows,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at
+    }
+
+def wake():
+    _wake.set()
+
+# --- Worker ---
+
+def _requeue_stale(db: Session):
+    # RUNNING jobs left behind by a crashed/restarted worker
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_TIMEOUT)
+    count = db.query(models.PurgeJob).filter(
+        models.PurgeJob.status == models.PurgeJobStatus.RUNNING,
+        models.PurgeJob.heartbeat_at < cutoff
+    ).update({"status": models.PurgeJobStatus.PENDING}, synchronize_session=False)
+    db.commit()
+    if count:
+        with _lock:
+            _stats["requeued_stale"] += count
+
+def _claim(db: Session) -> Optional[models.PurgeJob]:
+    job = db.query(models.PurgeJob).filter(
+        models.PurgeJob.status == models.PurgeJobStatus.PENDING
+    ).order_by(models.PurgeJob.created_at).limit(1).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.commit()
+        return None
+    now = datetime.utcnow()
+    job.status = models.PurgeJobStatus.RUNNING
+    job.started_at = job.started_at or now
+    job.heartbeat_at = now
+    db.commit()
+    return job
+
+def _finish(job: models.PurgeJob):
+    # Every cache that may still hold the purged rows
+    if job.entity == models.PurgeEntity.USER:
+        auth_cache.invalidate_user(job.entity_id)
+    else:
+        quiz_engine.invalidate()
+    player_cache.invalidate() # the course itself, or the courses its trainer was detached from
+    catalog_cache.invalidate()
+    certificate_validation.clear()
+    revocations.invalidate()
+
+def run_job(db: Session, job: models.PurgeJob) -> bool:
+    """
+    Runs the plan from job.step, one committed batch at a time. Returns False when
+    interrupted by stop() (the job stays RUNNING and is resumed later).
+    """
+    plan = PLANS[job.entity]
+    while job.step < len(plan):
+        if _stop.is_set():
+            return False
+        count = plan[job.step].run(db, job)
+        # A step is done once it finds nothing left to delete
+        if count == 0:
+            job.step += 1
+        job.deleted_rows += count
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+        with _lock:
+            _stats["batches"] += 1
+            _stats["deleted_rows"] += count
+        if count and BATCH_PAUSE:
+            time.sleep(BATCH_PAUSE)
+
+    job.status = models.PurgeJobStatus.COMPLETED
+    job.error = None
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    _finish(job)
+    with _lock:
+        _stats["completed"] += 1
+    return True
+
+def _fail(db: Session, job_id: uuid.UUID, error: Exception):
+    db.rollback()
+    job = db.get(models.PurgeJob, job_id)
+    job.attempts = (job.attempts or 0) + 1
+    job.error = str(error)[:2000]
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = models.PurgeJobStatus.FAILED
+        job.finished_at = datetime.utcnow()
+        with _lock:
+            _stats["failed"] += 1
+    else:
+        # Rows written after their step had finished (e.g. during the tombstone race)
+        # make a later step fail: the retry walks the whole plan again (cheap when empty)
+        job.step = 0
+        job.status = models.PurgeJobStatus.PENDING
+        with _lock:
+            _stats["retried"] += 1
+    db.commit()
+
+def _tick() -> bool:
+    db = database.SessionLocal()
+    try:
+        _requeue_stale(db)
+        job = _claim(db)
+        if job is None:
+            return False
+        try:
+            if not run_job(db, job):
+                # Shutting down: hand the job back for the next start (or another worker)
+                job.status = models.PurgeJobStatus.PENDING
+                db.commit()
+        except Exception as e:
+            print(f"Purge of {job.entity.value} {job.entity_id} failed at step {job.step}: {e}")
+            _fail(db, job.id, e)
+        return True
+    finally:
+        db.close()
+
+def _run():
+    while not _stop.is_set():
+        try:
+            busy = _tick()
+        except Exception as e:
+            print(f"Purge worker error: {e}")
+            busy = False
+        if not busy:
+            _wake.wait(POLL_INTERVAL)
+            _wake.clear()
+
+def start():
+    global _worker
+    if _worker is not None:
+        return
+    _stop.clear()
+    _worker = threading.Thread(target=_run, name="purge-worker", daemon=True)
+    _worker.start()
+
+def stop():
+    global _worker
+    _stop.set()
+    _wake.set()
+    if _worker is not None:
+        _worker.join(timeout=10)
+        _worker = None
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "batch_size": BATCH_SIZE}
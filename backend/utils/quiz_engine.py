@@ -0,0 +1,163 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import json
+import os
+import random
+import threading
+import time
+import uuid
+import models
+
+# Module quizzes served from an in-process question bank.
+# The bank of a module (questions with parsed options and the answer key) is
+# loaded once and reused by every attempt until a question/module edit calls
+# invalidate(); QUIZ_BANK_TTL bounds staleness for edits made on another worker.
+# Serving a quiz stores the drawn question ids in quiz_sessions (one open session
+# per user and module); grading consumes that row and checks each answer against
+# the cached key, so neither step reloads the questions.
+QUESTIONS_PER_QUIZ = int(os.getenv("QUIZ_QUESTIONS_PER_ATTEMPT", "5"))
+QUIZ_BANK_TTL = int(os.getenv("QUIZ_BANK_TTL", "300"))
+QUIZ_SESSION_TTL = int(os.getenv("QUIZ_SESSION_TTL", "7200"))
+
+class Question:
+    __slots__ = ("id", "text", "options", "option_count", "correct_option_index")
+
+    def __init__(self, row: models.Question, option_count: int):
+        self.id = row.id
+        self.text = row.text
+        self.options = row.options # JSON string, as served to the player
+        self.option_count = option_count
+        self.correct_option_index = row.correct_option_index
+
+class QuestionBank:
+    def __init__(self, module: models.Module, questions: List[Question]):
+        self.module_id = module.id
+        self.course_id = module.course_id
+        self.has_quiz = module.has_quiz
+        self.passing_score = module.passing_score
+        self.min_duration_seconds = module.min_duration_seconds or 0
+        self.questions: Dict[uuid.UUID, Question] = {q.id: q for q in questions}
+        self.question_ids = [q.id for q in questions]
+        self.created = time.monotonic()
+
+_lock = threading.Lock()
+_banks: Dict[uuid.UUID, QuestionBank] = {}
+_versions: Dict[uuid.UUID, int] = {}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "served": 0, "graded": 0, "stale_submissions": 0, "skipped_questions": 0}
+
+# --- Question bank ---
+
+def option_count(raw: str) -> Optional[int]:
+    try:
+        options = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    return len(options) if isinstance(options, list) else None
+
+def _load(db: Session, module_id: uuid.UUID) -> Optional[QuestionBank]:
+    module = db.query(models.Module).filter(models.Module.id == module_id).first()
+    if module is None:
+        return None
+    questions = []
+    for row in db.query(models.Question).filter(models.Question.module_id == module_id).order_by(models.Question.id):
+        count = option_count(row.options)
+        if count is None:
+            # Unparseable options cannot be answered: left out of the quiz
+            with _lock:
+                _stats["skipped_questions"] += 1
+            continue
+        questions.append(Question(row, count))
+    return QuestionBank(module, questions)
+
+def get_bank(db: Session, module_id: uuid.UUID) -> Optional[QuestionBank]:
+    with _lock:
+        bank = _banks.get(module_id)
+        if bank is not None and time.monotonic() - bank.created <= QUIZ_BANK_TTL:
+            _stats["hits"] += 1
+            return bank
+        _stats["misses"] += 1
+        built_version = _versions.get(module_id, 0)
+
+    bank = _load(db, module_id)
+    if bank is not None:
+        with _lock:
+            # Skip caching if an edit happened while loading
+            if _versions.get(module_id, 0) == built_version:
+                _banks[module_id] = bank
+    return bank
+
+def invalidate(module_id: Optional[uuid.UUID] = None):
+    """
+    Drops the bank of a module (after question or quiz settings edits), or all of them.
+    """
+    with _lock:
+        if module_id is None:
+            for key in list(_versions):
+                _versions[key] += 1
+            _banks.clear()
+        else:
+            if not isinstance(module_id, uuid.UUID):
+                module_id = uuid.UUID(str(module_id))
+            _versions[module_id] = _versions.get(module_id, 0) + 1
+            _banks.pop(module_id, None)
+        _stats["invalidations"] += 1
+
+# --- Sessions ---
+
+def serve(db: Session, bank: QuestionBank, user_id: uuid.UUID) -> tuple:
+    """
+    Draws the questions of a new attempt and records them as the user's open
+    session for the module, replacing any previous one (commits).
+    Returns (session_id, questions).
+    """
+    drawn = random.sample(bank.question_ids, min(len(bank.question_ids), QUESTIONS_PER_QUIZ))
+    session_id = uuid.uuid4()
+    values = {"id": session_id, "user_id": user_id, "module_id": bank.module_id, "question_ids": drawn, "created_at": datetime.utcnow()}
+    stmt = pg_insert(models.QuizSession).values(values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.QuizSession.user_id, models.QuizSession.module_id],
+        set_={"id": stmt.excluded.id, "question_ids": stmt.excluded.question_ids, "created_at": stmt.excluded.created_at}
+    ))
+    db.commit()
+    with _lock:
+        _stats["served"] += 1
+    return session_id, [bank.questions[qid] for qid in drawn]
+
+def consume(db: Session, user_id: uuid.UUID, module_id: uuid.UUID, session_id: Optional[uuid.UUID] = None) -> Optional[List[uuid.UUID]]:
+    """
+    Takes the open session of the user for the module (single use: a second submit
+    finds nothing). Returns its question ids, or None when there is no valid session.
+    Not committed: the caller commits it with the attempt.
+    """
+    QuizSession = models.QuizSession
+    stmt = delete(QuizSession).where(QuizSession.user_id == user_id, QuizSession.module_id == module_id)
+    if session_id is not None:
+        stmt = stmt.where(QuizSession.id == session_id)
+    stmt = stmt.returning(QuizSession.question_ids, QuizSession.created_at).execution_options(synchronize_session=False)
+    row = db.execute(stmt).first()
+    if row is None or row.created_at < datetime.utcnow() - timedelta(seconds=QUIZ_SESSION_TTL):
+        with _lock:
+            _stats["stale_submissions"] += 1
+        return None
+    return row.question_ids
+
+def grade(bank: QuestionBank, question_ids: List[uuid.UUID], answers: List[int]) -> int:
+    """
+    Correct answers, answers[i] being the option chosen for question_ids[i].
+    Questions deleted since they were served count as wrong.
+    """
+    correct = 0
+    for question_id, answer in zip(question_ids, answers):
+        question = bank.questions.get(question_id)
+        if question is not None and 0 <= answer < question.option_count and answer == question.correct_option_index:
+            correct += 1
+    with _lock:
+        _stats["graded"] += 1
+    return correct
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "cached_banks": len(_banks), "questions_per_quiz": QUESTIONS_PER_QUIZ}
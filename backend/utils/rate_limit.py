@@ -0,0 +1,49 @@
+from fastapi import Request
+from collections import OrderedDict
+import os
+import threading
+import time
+
+# Only honour X-Forwarded-For behind a trusted reverse proxy, otherwise clients could spoof it
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+MAX_TRACKED_CLIENTS = 100000
+
+def client_key(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+class RateLimiter:
+    """
+    In-process token bucket per client: `rate_per_minute` sustained, `burst` at once.
+    """
+    def __init__(self, rate_per_minute: int, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict() # client -> (tokens, updated_at)
+        self.rejected = 0
+
+    def hit(self, key: str, cost: int = 1) -> float:
+        """
+        Consumes `cost` tokens. Returns 0 when allowed, otherwise seconds until retry.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                self._buckets.move_to_end(key)
+                while len(self._buckets) > MAX_TRACKED_CLIENTS:
+                    self._buckets.popitem(last=False)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (min(cost, self.burst) - tokens) / self.rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"clients": len(self._buckets), "rejected": self.rejected, "rate_per_minute": round(self.rate * 60), "burst": self.burst}
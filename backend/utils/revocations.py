@@ -0,0 +1,90 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, literal, DateTime, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+import hashlib
+import json
+import os
+import threading
+import time
+import models
+from utils import certificate_signing
+
+# Signed snapshot of revoked certificate codes, cached in-process.
+# Offline verifiers download it (ETag/Cache-Control) next to the public key and
+# check the signature with the same Ed25519 key as the certificate tokens.
+REVOCATION_CACHE_TTL = int(os.getenv("REVOCATION_CACHE_TTL", "60"))
+REVOCATION_MAX_AGE = int(os.getenv("REVOCATION_MAX_AGE", "300")) # Cache-Control for clients
+
+class Snapshot:
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.created = time.monotonic()
+
+_lock = threading.Lock()
+_version = 0
+_cached: Optional[Snapshot] = None
+
+def revoke(db: Session, cert: models.Certification, reason: Optional[str], revoked_by: Optional[UUID]):
+    # Does not commit, the caller commits with its write
+    stmt = pg_insert(models.CertificateRevocation).values(
+        certificate_code=cert.certificate_code,
+        certification_id=cert.id,
+        reason=reason,
+        revoked_by=revoked_by,
+        revoked_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=["certificate_code"])
+    db.execute(stmt)
+
+def revoke_where(db: Session, condition, reason: str, revoked_by: Optional[UUID] = None):
+    """
+    Set-based revocation of the certificates matching `condition` (before deleting them).
+    """
+    source = select(
+        models.Certification.certificate_code,
+        models.Certification.id,
+        literal(reason, String),
+        literal(revoked_by, models.CertificateRevocation.revoked_by.type),
+        literal(datetime.utcnow(), DateTime)
+    ).where(condition)
+    stmt = pg_insert(models.CertificateRevocation).from_select(
+        ["certificate_code", "certification_id", "reason", "revoked_by", "revoked_at"], source
+    ).on_conflict_do_nothing(index_elements=["certificate_code"])
+    db.execute(stmt)
+
+def _build(db: Session) -> bytes:
+    rows = db.query(models.CertificateRevocation.certificate_code)\
+        .order_by(models.CertificateRevocation.certificate_code).all()
+    content = {
+        "kid": certificate_signing.key_id(),
+        "generated_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+        "revoked": [r.certificate_code for r in rows]
+    }
+    # Canonical JSON of the content is what gets signed
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    content["signature"] = certificate_signing.sign(canonical)
+    return json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+
+def snapshot(db: Session) -> Snapshot:
+    global _cached
+    cached = _cached
+    if cached is not None and time.monotonic() - cached.created <= REVOCATION_CACHE_TTL:
+        return cached
+
+    built_version = _version
+    entry = Snapshot(built_version, _build(db))
+    with _lock:
+        # Skip caching if a revocation happened while building
+        if built_version == _version:
+            _cached = entry
+    return entry
+
+def invalidate():
+    global _version, _cached
+    with _lock:
+        _version += 1
+        _cached = None
@@ -0,0 +1,205 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.exc import ProgrammingError
+from typing import List, Optional, Tuple
+import importlib.util
+import os
+import re
+import time
+
+# Versioned schema migrations.
+# Each file in migrations/ is named <version>_<name>.py (e.g. 0003_document_type_values.py)
+# and defines upgrade(conn). Applied versions are recorded in schema_migrations.
+# Migrations run in a transaction unless the module sets TRANSACTIONAL = False,
+# which is required for CREATE INDEX CONCURRENTLY and ALTER TYPE ... ADD VALUE.
+# Non-transactional migrations must be idempotent: a failure half way is retried.
+#
+# The baseline creates missing tables from the current models, so on a fresh
+# database later steps find their columns/indexes already there: write every
+# step with IF NOT EXISTS (or an explicit check).
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+AUTO_MIGRATE = os.getenv("SCHEMA_AUTO_MIGRATE", "true").lower() == "true"
+# DDL waiting on a busy table would block every query queued behind it
+LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "10s")
+ADVISORY_LOCK_ID = 7345019 # serializes concurrent runners (several workers starting at once)
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+class Migration:
+    def __init__(self, version: str, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migrations.m{self.version}_{self.name}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+def discover() -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration versions in migrations/")
+    return migrations
+
+def head() -> Optional[str]:
+    migrations = discover()
+    return migrations[-1].version if migrations else None
+
+def current_version(engine: Engine) -> Optional[str]:
+    """
+    The single query run at startup. None when the table does not exist yet.
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT max(version) FROM schema_migrations")).scalar()
+    except ProgrammingError:
+        return None
+
+def _ensure_table(conn: Connection):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() at time zone 'utc'),
+            duration_ms INTEGER
+        )
+    """))
+
+def _applied(conn: Connection) -> set:
+    return {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def _record(conn: Connection, migration: Migration, started: float):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name, duration_ms) VALUES (:v, :n, :d)"),
+        {"v": migration.version, "n": migration.name, "d": int((time.perf_counter() - started) * 1000)}
+    )
+
+def _prepare(conn: Connection, local: bool):
+    # No statement timeout for migrations (index builds), but do not queue behind long locks
+    scope = "LOCAL " if local else ""
+    conn.execute(text(f"SET {scope}statement_timeout = 0"))
+    conn.execute(text(f"SET {scope}lock_timeout = '{LOCK_TIMEOUT}'"))
+
+def upgrade(engine: Engine, target: Optional[str] = None, log=print) -> List[str]:
+    """
+    Applies pending migrations up to `target` (default: all). Returns the applied versions.
+    """
+    applied_now = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            _ensure_table(lock_conn)
+            applied = _applied(lock_conn)
+            for migration in discover():
+                if migration.version in applied or (target and migration.version > target):
+                    continue
+                log(f"Applying migration {migration.version}_{migration.name}...")
+                started = time.perf_counter()
+                if migration.transactional:
+                    with engine.begin() as conn:
+                        _prepare(conn, local=True)
+                        migration.module.upgrade(conn)
+                        _record(conn, migration, started)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        _prepare(conn, local=False)
+                        migration.module.upgrade(conn)
+                        _record(conn, migration, started)
+                        # Pooled connection: restore the engine defaults
+                        conn.execute(text("RESET statement_timeout"))
+                        conn.execute(text("RESET lock_timeout"))
+                applied_now.append(migration.version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+    return applied_now
+
+def status(engine: Engine) -> List[Tuple[str, str, bool]]:
+    with engine.connect() as conn:
+        try:
+            applied = _applied(conn)
+        except ProgrammingError:
+            applied = set()
+    return [(m.version, m.name, m.version in applied) for m in discover()]
+
+def ensure_current(engine: Engine):
+    """
+    Startup check: one query when the schema is up to date. Otherwise upgrades
+    (SCHEMA_AUTO_MIGRATE=true, the default) or refuses to start.
+    """
+    current, latest = current_version(engine), head()
+    if current == latest:
+        return
+    if not AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at {current or 'no version'}, code expects {latest}. Run: python migrate.py upgrade"
+        )
+    upgrade(engine)
+
+# --- Helpers for migration modules ---
+
+def column_exists(conn: Connection, table: str, column: str) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = :t AND column_name = :c"
+    ), {"t": table, "c": column}).first() is not None
+
+def constraint_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_constraint WHERE conname = :n"), {"n": name}).first() is not None
+
+def unique_index_on(conn: Connection, table: str, column: str) -> bool:
+    # Any valid single-column unique index (or UNIQUE constraint) on table(column)
+    return conn.execute(text("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+        WHERE t.relname = :t AND a.attname = :c AND i.indisunique AND i.indnatts = 1 AND i.indisvalid
+    """), {"t": table, "c": column}).first() is not None
+
+def create_index_concurrently(conn: Connection, name: str, table: str, columns: str, unique: bool = False, where: Optional[str] = None):
+    """
+    Online index build (no write lock on the table). Needs a non-transactional
+    migration. An INVALID leftover of an interrupted build is dropped first.
+    Partitioned tables cannot build concurrently: their index is created plainly
+    (it cascades to every partition).
+    """
+    partitioned = conn.execute(text("SELECT 1 FROM pg_class WHERE relname = :t AND relkind = 'p'"), {"t": table}).first()
+    invalid = conn.execute(text("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :n AND NOT i.indisvalid
+    """), {"n": name}).first()
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    predicate = f" WHERE {where}" if where else ""
+    concurrently = "" if partitioned else "CONCURRENTLY "
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({columns}){predicate}"
+    ))
+
+def drop_index_concurrently(conn: Connection, name: str):
+    # Indexes of partitioned tables (relkind 'I') can only be dropped plainly
+    partitioned = conn.execute(text("SELECT 1 FROM pg_class WHERE relname = :n AND relkind = 'I'"), {"n": name}).first()
+    conn.execute(text(f"DROP INDEX {'' if partitioned else 'CONCURRENTLY '}IF EXISTS {name}"))
+
+def add_unique_constraint_online(conn: Connection, name: str, table: str, columns: str):
+    """
+    UNIQUE constraint without blocking writes for the whole build: the index is
+    built concurrently, then attached (a short lock). Needs a non-transactional migration.
+    """
+    if constraint_exists(conn, name):
+        return
+    create_index_concurrently(conn, name, table, columns, unique=True)
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}"))
@@ -0,0 +1,179 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+import base64
+import binascii
+import hashlib
+import io
+import os
+import threading
+
+# Signature ingestion: chunked base64 decode + content hashing, deduplicated
+# storage keyed by sha256 and file writes on a writer pool. Callers wait for the
+# write (PendingSignature.result) before committing the URL, so a stored row
+# never points at a missing file.
+SIGNATURE_DIR = "uploads/signatures"
+SIGNATURE_URL_PREFIX = "/uploads/signatures"
+MAX_SIGNATURE_BYTES = int(os.getenv("MAX_SIGNATURE_BYTES", str(2 * 1024 * 1024)))
+DECODE_CHUNK = 64 * 1024 # multiple of 4 base64 chars
+
+# Optional re-encoding ("webp" needs Pillow, otherwise signatures are stored as received)
+SIGNATURE_FORMAT = os.getenv("SIGNATURE_FORMAT", "original").lower()
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+os.makedirs(SIGNATURE_DIR, exist_ok=True)
+
+_MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+]
+
+_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="signature-writer")
+_lock = threading.Lock()
+_stored = set() # hashes known to be on disk
+_pending: Dict[str, Future] = {} # hash -> write in progress (shared by identical signatures)
+_stats = {"received": 0, "deduplicated": 0, "written": 0, "write_errors": 0, "pending_writes": 0}
+
+class SignatureError(ValueError):
+    pass
+
+class SignatureStorageError(Exception):
+    # The file could not be written: nothing referencing it may be committed
+    pass
+
+class DecodedSignature:
+    def __init__(self, data: bytes, digest: str, extension: str):
+        self.data = data
+        self.digest = digest
+        self.extension = extension
+
+def _detect_extension(head: bytes) -> str:
+    for magic, extension in _MAGIC:
+        if head.startswith(magic):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    raise SignatureError("Unsupported signature image format")
+
+def decode(signature_base64: str) -> DecodedSignature:
+    """
+    Decodes a (data URL) base64 signature chunk by chunk, hashing as it goes and
+    failing early on invalid input or when MAX_SIGNATURE_BYTES is exceeded.
+    """
+    # Expected format: "data:image/png;base64,iVBORw0KGgo..."
+    start = signature_base64.find(",") + 1 if signature_base64.startswith("data:") else 0
+    if any(ch.isspace() for ch in signature_base64[start:start + 128]):
+        signature_base64 = "".join(signature_base64[start:].split())
+        start = 0
+
+    digest = hashlib.sha256()
+    out = io.BytesIO()
+    size = 0
+    for offset in range(start, len(signature_base64), DECODE_CHUNK):
+        chunk = signature_base64[offset:offset + DECODE_CHUNK]
+        try:
+            data = base64.b64decode(chunk, validate=True)
+        except (binascii.Error, ValueError):
+            raise SignatureError("Invalid base64 signature")
+        size += len(data)
+        if size > MAX_SIGNATURE_BYTES:
+            raise SignatureError(f"Signature exceeds {MAX_SIGNATURE_BYTES} bytes")
+        digest.update(data)
+        out.write(data)
+
+    data = out.getvalue()
+    if not data:
+        raise SignatureError("Empty signature")
+    return DecodedSignature(data, digest.hexdigest(), _detect_extension(data[:16]))
+
+def _stored_extension(signature: DecodedSignature) -> str:
+    if SIGNATURE_FORMAT == "webp" and Image is not None:
+        return "webp"
+    return signature.extension
+
+def _reencode(data: bytes) -> bytes:
+    # Signatures are strokes on a transparent canvas: lossless WEBP keeps them exact
+    with Image.open(io.BytesIO(data)) as img:
+        out = io.BytesIO()
+        img.save(out, format="WEBP", lossless=True, method=6)
+        return out.getvalue()
+
+def _write(path: str, signature: DecodedSignature, extension: str):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        data = signature.data
+        if extension != signature.extension:
+            data = _reencode(data)
+        # Atomic: readers never see a half written file
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with _lock:
+            _stored.add(signature.digest)
+            _stats["written"] += 1
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _lock:
+            _stats["write_errors"] += 1
+        raise
+    finally:
+        with _lock:
+            _pending.pop(signature.digest, None)
+            _stats["pending_writes"] -= 1
+
+class PendingSignature:
+    def __init__(self, url: str, write: Optional[Future]):
+        self.url = url
+        self._write = write
+
+    def result(self) -> str:
+        """
+        Waits for the file and returns its public URL.
+        Raises SignatureStorageError if it could not be written.
+        """
+        if self._write is not None:
+            try:
+                self._write.result()
+            except Exception as e:
+                print(f"Error writing signature {self.url}: {e}")
+                raise SignatureStorageError("Could not store signature")
+        return self.url
+
+def submit(signature: DecodedSignature) -> PendingSignature:
+    """
+    Queues the write of the signature unless an identical one is already stored
+    (or being written, then that write is shared).
+    """
+    extension = _stored_extension(signature)
+    filename = f"{signature.digest}.{extension}"
+    path = os.path.join(SIGNATURE_DIR, filename)
+
+    with _lock:
+        _stats["received"] += 1
+        write = _pending.get(signature.digest)
+        duplicate = write is not None or signature.digest in _stored or os.path.exists(path)
+        if duplicate:
+            _stats["deduplicated"] += 1
+        else:
+            _stats["pending_writes"] += 1
+            write = _writer.submit(_write, path, signature, extension)
+            _pending[signature.digest] = write
+
+    return PendingSignature(f"{SIGNATURE_URL_PREFIX}/{filename}", write)
+
+def store(signature: DecodedSignature) -> str:
+    """
+    Writes the signature (once per content) and returns its public URL.
+    """
+    return submit(signature).result()
+
+def shutdown():
+    # Waits for queued writes
+    _writer.shutdown(wait=True)
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "reencode": "webp" if SIGNATURE_FORMAT == "webp" and Image is not None else None}
@@ -0,0 +1,132 @@
+from fastapi import UploadFile
+from typing import Dict, Optional, Tuple
+import anyio
+import hashlib
+import os
+import threading
+import uuid
+
+# Uploaded file storage for async endpoints.
+# The copy runs on a worker thread (never on the event loop): the upload is read
+# in UPLOAD_CHUNK_BYTES chunks, hashed (sha256) and written to a temporary file in
+# the target directory, then renamed into place, so a failed or rejected upload
+# leaves no partial file. The declared type and size are checked before anything
+# is written; the first chunk must carry the magic bytes of the declared type and
+# the size limit is enforced again while copying.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+_PDF = ((b"%PDF-",), (".pdf",))
+_JPEG = ((b"\xff\xd8\xff",), (".jpg", ".jpeg"))
+_PNG = ((b"\x89PNG\r\n\x1a\n",), (".png",))
+_OOXML = ((b"PK\x03\x04",), (".docx", ".xlsx", ".pptx"))
+_OLE = ((b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",), (".doc", ".xls", ".ppt"))
+
+# Content type -> (accepted magic prefixes, accepted extensions; the first is the default)
+DOCUMENT_TYPES: Dict[str, Tuple[tuple, tuple]] = {
+    "application/pdf": _PDF,
+    "image/jpeg": _JPEG,
+    "image/png": _PNG,
+}
+SGC_TYPES: Dict[str, Tuple[tuple, tuple]] = {
+    **DOCUMENT_TYPES,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": _OOXML,
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": _OOXML,
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": _OOXML,
+    "application/msword": _OLE,
+    "application/vnd.ms-excel": _OLE,
+    "application/vnd.ms-powerpoint": _OLE,
+}
+
+_lock = threading.Lock()
+_stats = {"stored": 0, "bytes": 0, "rejected_type": 0, "rejected_size": 0, "errors": 0}
+
+class UploadError(ValueError):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+class StoredUpload:
+    def __init__(self, path: str, sha256: str, size: int, content_type: str):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+
+def _reject(kind: str, message: str, status_code: int):
+    with _lock:
+        _stats[kind] += 1
+    raise UploadError(message, status_code)
+
+def _extension(filename: Optional[str], extensions: tuple) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension in extensions else extensions[0]
+
+def _copy(source, directory: str, name: str, magic: tuple, max_bytes: int) -> Tuple[str, str, int]:
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        source.seek(0)
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(magic):
+                    _reject("rejected_type", "File content does not match its type", 400)
+                size += len(chunk)
+                if size > max_bytes:
+                    _reject("rejected_size", f"File exceeds {max_bytes} bytes", 413)
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        if size == 0:
+            _reject("rejected_size", "Empty file", 400)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, digest.hexdigest(), size
+
+async def store(
+    file: UploadFile,
+    directory: str,
+    stem: str,
+    allowed: Dict[str, Tuple[tuple, tuple]] = DOCUMENT_TYPES,
+    max_bytes: Optional[int] = None
+) -> StoredUpload:
+    """
+    Saves the upload as <directory>/<stem><extension>. Raises UploadError (with
+    the HTTP status to answer) when the type or size is not accepted.
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    if content_type not in allowed:
+        _reject("rejected_type", f"Invalid file type. Allowed: {', '.join(sorted(allowed))}", 400)
+    # Known once the multipart body is parsed: reject before copying anything
+    if file.size is not None and file.size > max_bytes:
+        _reject("rejected_size", f"File exceeds {max_bytes} bytes", 413)
+
+    magic, extensions = allowed[content_type]
+    name = f"{stem}{_extension(file.filename, extensions)}"
+    try:
+        path, sha256, size = await anyio.to_thread.run_sync(_copy, file.file, directory, name, magic, max_bytes)
+    except UploadError:
+        raise
+    except Exception:
+        with _lock:
+            _stats["errors"] += 1
+        raise
+
+    with _lock:
+        _stats["stored"] += 1
+        _stats["bytes"] += size
+    return StoredUpload(path, sha256, size, content_type)
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "max_upload_bytes": MAX_UPLOAD_BYTES}
@@ -60,7 +60,18 @@ const CorporateEmployees: React.FC = () => {
                     'Content-Type': 'multipart/form-data',
                 },
             });
-            setUploadResult(response.data);
+            // The import runs in the background: poll the job until it finishes
+            let job = response.data;
+            while (job.status === 'PENDING' || job.status === 'RUNNING') {
+                await new Promise((resolve) => setTimeout(resolve, 1500));
+                const jobResponse = await api.get(`/corporate/employees/upload/${job.id}`);
+                job = jobResponse.data;
+            }
+            if (job.status === 'FAILED') {
+                setError(job.errors[0] || 'Error al cargar el archivo.');
+            } else {
+                setUploadResult(job);
+            }
             fetchEmployees(); // Refresh list
         } catch (err: any) {
             console.error("Upload error", err);
@@ -82,7 +93,7 @@ const CorporateEmployees: React.FC = () => {
                 <div className="relative">
                     <input
                         type="file"
-                        accept=".xlsx, .xls"
+                        accept=".xlsx, .xls, .csv"
                         onChange={handleFileUpload}
                         className="hidden"
                         id="file-upload"
@@ -13,10 +13,20 @@ interface Module {
     has_quiz: boolean;
 }
 
+interface ModuleState {
+    module_id: string;
+    status: string | null;
+    seconds_spent: number;
+    best_score: number | null;
+    quiz_passed: boolean;
+    quiz_attempts: number;
+}
+
 interface Course {
     id: string;
     name: string;
     modules: Module[];
+    progress: ModuleState[];
 }
 
 interface ModuleProgress {
@@ -90,20 +100,30 @@ const CoursePlayer: React.FC = () => {
             const response = await api.get(`/courses/${courseId}/player`);
             setCourse(response.data);
 
-            // Mock progress for now (In real app, fetch from backend)
-            // For demo: First module unlocked, others locked
+            // The payload carries the saved progress of every module (same order as modules):
+            // completed modules stay open, the first pending one is resumed, the rest are locked
             const initialProgress: Record<string, ModuleProgress> = {};
+            let resumeModule: Module | null = null;
             response.data.modules.forEach((m: Module, index: number) => {
+                const state: ModuleState | undefined = response.data.progress[index];
+                const completed = state?.status === 'COMPLETED';
+                let status: ModuleProgress['status'] = 'LOCKED';
+                if (completed) {
+                    status = 'COMPLETED';
+                } else if (!resumeModule) {
+                    status = 'IN_PROGRESS';
+                    resumeModule = m;
+                }
                 initialProgress[m.id] = {
                     module_id: m.id,
-                    status: index === 0 ? 'IN_PROGRESS' : 'LOCKED',
-                    seconds_spent: 0
+                    status,
+                    seconds_spent: state?.seconds_spent ?? 0
                 };
             });
             setProgressMap(initialProgress);
 
             if (response.data.modules.length > 0) {
-                loadModule(response.data.modules[0], initialProgress);
+                loadModule(resumeModule ?? response.data.modules[0], initialProgress);
             } else {
                 setError("El curso no tiene módulos disponibles.");
             }
@@ -200,6 +220,11 @@ const CoursePlayer: React.FC = () => {
         </div>
     );
 
+    const completedCount = Object.values(progressMap).filter(p => p.status === 'COMPLETED').length;
+    const completedPercent = course && course.modules.length > 0
+        ? Math.round((completedCount / course.modules.length) * 100)
+        : 0;
+
     if (!course || !activeModule) return <div className="min-h-screen flex items-center justify-center text-white bg-slate-900">Cargando curso...</div>;
 
     return (
@@ -213,9 +238,9 @@ const CoursePlayer: React.FC = () => {
                     </button>
                     <h2 className="font-bold text-lg leading-tight font-display text-white">{course.name}</h2>
                     <div className="mt-4 w-full bg-slate-800 rounded-full h-1.5">
-                        <div className="bg-accent h-1.5 rounded-full" style={{ width: '15%' }}></div>
+                        <div className="bg-accent h-1.5 rounded-full" style={{ width: `${completedPercent}%` }}></div>
                     </div>
-                    <p className="text-xs text-slate-500 mt-2">15% Completado</p>
+                    <p className="text-xs text-slate-500 mt-2">{completedPercent}% Completado</p>
                 </div>
 
                 <div className="flex-1 overflow-y-auto custom-scrollbar">
@@ -24,6 +24,7 @@ const QuizComponent: React.FC<QuizComponentProps> = ({ moduleId, onComplete }) =
     const [questions, setQuestions] = useState<Question[]>([]);
     const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0);
     const [answers, setAnswers] = useState<number[]>([]);
+    const [sessionId, setSessionId] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
     const [submitting, setSubmitting] = useState(false);
     const [result, setResult] = useState<QuizResult | null>(null);
@@ -39,6 +40,7 @@ const QuizComponent: React.FC<QuizComponentProps> = ({ moduleId, onComplete }) =
         try {
             const response = await api.get(`/courses/modules/${moduleId}/quiz`);
             setQuestions(response.data);
+            setSessionId(response.headers['x-quiz-session'] ?? null);
             setAnswers(new Array(response.data.length).fill(-1));
             setResult(null);
             setCurrentQuestionIndex(0);
@@ -68,15 +70,21 @@ const QuizComponent: React.FC<QuizComponentProps> = ({ moduleId, onComplete }) =
         setSubmitting(true);
         try {
             const response = await api.post(`/courses/modules/${moduleId}/quiz`, {
-                answers: answers
+                answers: answers,
+                session_id: sessionId
             });
             setResult(response.data);
             if (response.data.passed) {
                 onComplete(true);
             }
-        } catch (err) {
+        } catch (err: any) {
             console.error('Error submitting quiz:', err);
-            setError('Error al enviar respuestas. Intenta nuevamente.');
+            if (err.response?.status === 409) {
+                // The attempt expired or was already graded: a new one must be drawn
+                setError('La evaluación expiró. Vuelve a cargarla para intentarlo de nuevo.');
+            } else {
+                setError('Error al enviar respuestas. Intenta nuevamente.');
+            }
         } finally {
             setSubmitting(false);
         }
@@ -134,6 +134,7 @@ const SGCDocumentPanel: React.FC = () => {
                             <label className="block text-sm font-medium text-slate-700 mb-1">Archivo</label>
                             <input
                                 type="file"
+                                accept=".pdf,.jpg,.jpeg,.png,.docx,.xlsx,.pptx,.doc,.xls,.ppt"
                                 onChange={(e) => setFile(e.target.files ? e.target.files[0] : null)}
                                 className="w-full text-sm text-slate-500 file:mr-4 file:py-2 file:px-4 file:rounded-full file:border-0 file:text-xs file:font-semibold file:bg-accent/10 file:text-accent hover:file:bg-accent/20"
                                 required